@@ -0,0 +1,124 @@
+# ======= BharatPe Aggregation Kernel Benchmark =======
+#
+# Times the original per-row / per-group lambdas against the vectorized
+# kernels in bharatpe_analysis.aggregation on generated data and checks the
+# outputs are identical.
+# Usage: python benchmarks/bench_aggregation.py [--merchants 1000000] [--txn-per-merchant 4]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.aggregation import (
+    group_mode,
+    group_nunique,
+    product_combo_code,
+    product_combo_counts,
+    product_combo_labels,
+    status_flag
+)
+
+CATEGORIES = ['Food & Beverage', 'Services', 'Wholesale', 'Retail']
+METHODS = ['UPI', 'Card', 'QR', 'Cash', 'Wallet']
+STATUSES = ['Paid', 'Active', 'defaulted']
+
+
+def make_data(n_merchants, txn_per_merchant, seed=0):
+    rng = np.random.default_rng(seed)
+    merchant_ids = pd.Series([f"BPM{i}" for i in range(n_merchants)])
+    merchants = pd.DataFrame({
+        'merchant_id': merchant_ids,
+        'business_category': rng.choice(CATEGORIES, n_merchants),
+        'qr_displayed': rng.random(n_merchants) < 0.7,
+        'soundbox_adopted': rng.random(n_merchants) < 0.3,
+        'swipe_machine': rng.random(n_merchants) < 0.2,
+        'loan_taken_bool': rng.random(n_merchants) < 0.35,
+        'status': rng.choice(STATUSES, n_merchants, p=[0.6, 0.3, 0.1])
+    })
+    n_txn = n_merchants * txn_per_merchant
+    transactions = pd.DataFrame({
+        'merchant_id': merchant_ids.to_numpy()[rng.integers(0, n_merchants, n_txn)],
+        'payment_method': rng.choice(METHODS, n_txn, p=[0.4, 0.2, 0.2, 0.1, 0.1])
+    })
+    return merchants, transactions
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def combo_baseline(merchants):
+    combo = merchants.apply(
+        lambda x: f"QR: {'Y' if x['qr_displayed'] else 'N'}, "
+                  f"Sound: {'Y' if x['soundbox_adopted'] else 'N'}, "
+                  f"Swipe: {'Y' if x['swipe_machine'] else 'N'}, "
+                  f"Loan: {'Y' if x['loan_taken_bool'] else 'N'}",
+        axis=1
+    )
+    counts = combo.value_counts().reset_index()
+    counts.columns = ['combination', 'count']
+    return combo, counts
+
+
+def combo_kernel(merchants):
+    code = product_combo_code(merchants)
+    return product_combo_labels(code), product_combo_counts(code)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe aggregation kernel benchmark')
+    parser.add_argument('--merchants', type=int, default=1_000_000)
+    parser.add_argument('--txn-per-merchant', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    merchants, transactions = make_data(args.merchants, args.txn_per_merchant)
+    keys, methods = transactions['merchant_id'], transactions['payment_method']
+
+    cases = [
+        (
+            'product combo',
+            lambda: combo_baseline(merchants),
+            lambda: combo_kernel(merchants),
+            lambda a, b: (a[0].to_numpy() == b[0]).all() and a[1].equals(b[1])
+        ),
+        (
+            'default rate by category',
+            lambda: merchants.groupby('business_category')['status'].agg(lambda x: (x == 'defaulted').mean()),
+            lambda: merchants.assign(is_defaulted=status_flag(merchants['status'], 'defaulted'))
+                             .groupby('business_category')['is_defaulted'].mean(),
+            lambda a, b: np.allclose(a.to_numpy(), b.to_numpy())
+        ),
+        (
+            'primary payment method',
+            lambda: transactions.groupby('merchant_id')['payment_method'].agg(lambda x: x.value_counts().index[0]),
+            lambda: group_mode(keys, methods),
+            lambda a, b: (a.to_numpy() == b.to_numpy()).all()
+        ),
+        (
+            'payment methods used',
+            lambda: transactions.groupby('merchant_id')['payment_method'].agg(lambda x: x.nunique()),
+            lambda: group_nunique(keys, methods),
+            lambda a, b: (a.to_numpy() == b.to_numpy()).all()
+        ),
+    ]
+
+    print(f"{args.merchants:,} merchants, {len(transactions):,} transactions\n")
+    print(f"{'case':<28}{'lambda s':>10}{'kernel s':>10}{'speedup':>10}{'identical':>11}")
+    for name, baseline, kernel, same in cases:
+        base_s, expected = timed(baseline)
+        kernel_s, actual = timed(kernel)
+        print(f"{name:<28}{base_s:>10.3f}{kernel_s:>10.3f}{base_s / kernel_s:>9.1f}x{str(bool(same(expected, actual))):>11}")
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Aggregation Kernel Benchmark =======
@@ -0,0 +1,174 @@
+# ======= BharatPe Analysis Scaling Benchmark =======
+#
+# Generates synthetic data at each requested merchant count (reused when the
+# directory already holds data for the same parameters), then runs each of
+# the four analyses in its own subprocess so peak RSS is per analysis, and
+# records load time, analysis time and peak memory as JSON. With --compare,
+# any timing or memory more than --tolerance above the baseline file is
+# reported and the exit status is 1, so it can gate a CI job.
+# Usage: python benchmarks/bench_analyses.py [--scales 10000 100000] [--txn-per-merchant 20]
+#        [--work-dir bench_data] [--json results.json] [--compare baseline.json --tolerance 0.25]
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+ANALYSES = {
+    'churn': ['merchants', 'interactions'],
+    'product_adoption': ['merchants'],
+    'loan_performance': ['merchants', 'loans', 'transactions'],
+    'feature_usage': ['merchants', 'transactions']
+}
+METRICS = ['load_s', 'analysis_s', 'peak_rss_mb']
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_one(name, data_root):
+    # Child process: load the inputs, run one analysis, print one JSON line
+    from bharatpe_analysis import analysis, loader
+    from bharatpe_analysis.output import ReportWriter
+
+    t0 = time.perf_counter()
+    frames = {table: loader.read_dataset(table, data_root) for table in ANALYSES[name]}
+    load_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory(prefix='bharatpe_bench_') as out:
+        t0 = time.perf_counter()
+        if name == 'churn':
+            analysis.churn_analysis(frames['merchants'], frames['interactions'], verbose=False)
+        elif name == 'product_adoption':
+            with ReportWriter(out, echo=False) as writer:
+                analysis.product_adoption_analysis(frames['merchants'], None, writer=writer)
+        elif name == 'loan_performance':
+            with ReportWriter(out, echo=False) as writer:
+                analysis.loan_performance_analysis(frames['merchants'], frames['loans'], frames['transactions'],
+                                                   writer=writer)
+        else:
+            analysis.feature_usage_analysis(frames['merchants'], frames['transactions'])
+        analysis_s = time.perf_counter() - t0
+
+    print(json.dumps({'load_s': round(load_s, 4), 'analysis_s': round(analysis_s, 4),
+                      'peak_rss_mb': round(peak_rss_mb(), 1)}))
+
+
+def ensure_data(work_dir, n_merchants, txn_per_merchant, seed):
+    from bharatpe_analysis.synthetic import generate_dataset
+
+    data_root = os.path.join(work_dir, f'merchants_{n_merchants}')
+    manifest_path = os.path.join(data_root, 'generator.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if (manifest['n_merchants'], manifest['txn_per_merchant'], manifest['seed']) == (n_merchants, txn_per_merchant, seed):
+            return data_root, manifest
+    print(f"Generating {n_merchants:,} merchants into {data_root}")
+    manifest = generate_dataset(data_root, n_merchants, txn_per_merchant, seed, verbose=False)
+
+    # Build the typed binary cache now so every run measures warm loads
+    from bharatpe_analysis import loader
+    for table in manifest['rows']:
+        loader.read_dataset(table, data_root)
+    return data_root, manifest
+
+
+def measure(name, data_root):
+    # Fresh interpreter per analysis: peak RSS and import state are not shared
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-one', name, '--data-root', data_root],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    regressions = []
+    for scale, analyses in results['scales'].items():
+        for name, metrics in analyses.items():
+            before = baseline.get('scales', {}).get(scale, {}).get(name, {})
+            for metric in METRICS:
+                if metric in metrics and before.get(metric):
+                    change = metrics[metric] / before[metric] - 1
+                    # Sub-threshold timings are mostly noise
+                    small = metric.endswith('_s') and metrics[metric] - before[metric] < min_seconds
+                    if change > tolerance and not small:
+                        regressions.append((scale, name, metric, before[metric], metrics[metric], change))
+    return regressions
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe analysis scaling benchmark')
+    parser.add_argument('--scales', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--txn-per-merchant', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--analyses', nargs='+', default=list(ANALYSES), choices=list(ANALYSES))
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'bharatpe_bench_data'))
+    parser.add_argument('--json', default=None, help='write results here')
+    parser.add_argument('--compare', default=None, help='baseline results JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='ignore slowdowns smaller than this')
+    parser.add_argument('--run-one', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--data-root', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        run_one(args.run_one, args.data_root)
+        return 0
+
+    results = {'environment': environment(), 'txn_per_merchant': args.txn_per_merchant, 'seed': args.seed,
+               'scales': {}}
+    print(f"{'merchants':>10}  {'analysis':<18}{'load s':>9}{'run s':>9}{'peak MB':>10}")
+    for n_merchants in args.scales:
+        data_root, manifest = ensure_data(args.work_dir, n_merchants, args.txn_per_merchant, args.seed)
+        scale = results['scales'][str(n_merchants)] = {'rows': manifest['rows']}
+        for name in args.analyses:
+            metrics = scale[name] = measure(name, data_root)
+            if 'error' in metrics:
+                print(f"{n_merchants:>10,}  {name:<18}failed: {metrics['error']}")
+            else:
+                print(f"{n_merchants:>10,}  {name:<18}{metrics['load_s']:>9.2f}{metrics['analysis_s']:>9.2f}"
+                      f"{metrics['peak_rss_mb']:>10.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        for scale, name, metric, before, after, change in regressions:
+            print(f"REGRESSION {scale} {name} {metric}: {before} -> {after} (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ======= End of BharatPe Analysis Scaling Benchmark =======
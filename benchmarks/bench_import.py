@@ -0,0 +1,57 @@
+# ======= BharatPe Import / Startup Time Benchmark =======
+#
+# Each measurement runs in a fresh interpreter so module caches don't hide
+# the real cost. Usage: python benchmarks/bench_import.py [--repeat 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    'import bharatpe_analysis': "import bharatpe_analysis",
+    'import BharatPe_pythoncode': "import BharatPe_pythoncode",
+    'first access (pandas import)': "import bharatpe_analysis; bharatpe_analysis.churn_analysis",
+    'first dataset load (merchants)': "import bharatpe_analysis; bharatpe_analysis.get_dataset('merchants')",
+}
+
+TIMER = """
+import time
+_t0 = time.perf_counter()
+{stmt}
+print((time.perf_counter() - _t0) * 1000)
+"""
+
+
+def time_case(stmt):
+    out = subprocess.run(
+        [sys.executable, '-c', TIMER.format(stmt=stmt)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe import time benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<34}{'median ms':>12}{'min ms':>12}")
+    for name, stmt in CASES.items():
+        timings = [time_case(stmt) for _ in range(args.repeat)]
+        print(f"{name:<34}{statistics.median(timings):>12.2f}{min(timings):>12.2f}")
+
+    loaded = subprocess.run(
+        [sys.executable, '-c', "import sys, bharatpe_analysis; print(sorted(m for m in ('pandas', 'numpy', 'sklearn') if m in sys.modules))"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    print(f"\nheavy modules loaded by 'import bharatpe_analysis': {loaded}")
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Import / Startup Time Benchmark =======
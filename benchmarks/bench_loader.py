@@ -0,0 +1,80 @@
+# ======= BharatPe Loader Benchmark =======
+#
+# Compares the old untyped load (pd.read_csv + pd.to_datetime afterwards)
+# with the typed loader reading CSV and reading its binary cache. Memory is
+# the deep in-memory size of the resulting frame.
+# Usage: python benchmarks/bench_loader.py [--data-root DIR] [--repeat 3]
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bharatpe_analysis import loader
+from bharatpe_analysis.config import dataset_path, get_data_root
+from bharatpe_analysis.schema import SCHEMAS
+
+TABLES = ['merchants', 'feature_usage', 'loans', 'interactions', 'transactions']
+
+
+def untyped_load(name, data_root):
+    df = pd.read_csv(dataset_path(name, data_root))
+    for col in SCHEMAS[name]['dates']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), result
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe loader benchmark')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data_root = args.data_root or get_data_root()
+    cache_root = tempfile.mkdtemp(prefix='bharatpe_cache_')
+    os.environ[loader.CACHE_DIR_ENV] = cache_root
+
+    print(f"{'table':<16}{'csv ms':>10}{'typed ms':>10}{'cache ms':>10}{'speedup':>9}"
+          f"{'csv MB':>9}{'typed MB':>10}{'ratio':>7}")
+    try:
+        for name in TABLES:
+            if not os.path.exists(dataset_path(name, data_root)):
+                continue
+            csv_ms, raw = best_of(lambda: untyped_load(name, data_root), args.repeat)
+            typed_ms, _ = best_of(lambda: loader.read_dataset(name, data_root, use_cache=False), args.repeat)
+
+            loader.invalidate_cache(name, data_root)
+            loader.read_dataset(name, data_root)
+            cache_ms, typed = best_of(lambda: loader.read_dataset(name, data_root), args.repeat)
+
+            print(f"{name:<16}{csv_ms:>10.1f}{typed_ms:>10.1f}{cache_ms:>10.1f}{csv_ms / cache_ms:>8.1f}x"
+                  f"{frame_mb(raw):>9.2f}{frame_mb(typed):>10.2f}{frame_mb(typed) / frame_mb(raw):>7.2f}")
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Loader Benchmark =======
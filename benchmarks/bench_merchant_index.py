@@ -0,0 +1,120 @@
+# ======= BharatPe Merchant Index Latency Benchmark =======
+#
+# Builds the merchant profile index from the loader and reports p50 / p99 /
+# max latency of point lookups, hash-index finds and pin_code range finds:
+# in process, over HTTP on localhost and over a Unix socket (one keep-alive
+# connection each), next to the pandas boolean-mask scans they replace.
+# Usage: python benchmarks/bench_merchant_index.py [--data-root DIR] [--queries 5000]
+
+import argparse
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bharatpe_analysis import loader
+from bharatpe_analysis.merchant_index import MerchantIndex, make_server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def percentiles(timings):
+    micros = np.asarray(timings) * 1e6
+    return np.percentile(micros, 50), np.percentile(micros, 99), micros.max()
+
+
+def timed(fn, args_list):
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def http_get(connection, path):
+    connection.request('GET', path)
+    response = connection.getresponse()
+    body = response.read()
+    if response.status not in (200, 404):
+        raise RuntimeError(f"{path}: HTTP {response.status} {body[:200]}")
+    return body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe merchant index latency benchmark')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--pandas-queries', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    merchants = loader.read_dataset('merchants', args.data_root)
+    index = MerchantIndex.from_loader(args.data_root)
+    summary = index.summary()
+    print(f"{len(index):,} merchants indexed in {summary['built_s']:.2f}s: {summary['nbytes'] / 1e6:.1f} MB "
+          f"(pandas frame {merchants.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+
+    rng = np.random.default_rng(0)
+    ids = merchants['merchant_id'].to_numpy()[rng.integers(0, len(merchants), args.queries)]
+    districts = merchants['district'].astype(str).to_numpy()[rng.integers(0, len(merchants), args.queries)]
+    pins = merchants['pin_code'].to_numpy()[rng.integers(0, len(merchants), args.queries)]
+    workloads = {
+        'get merchant_id': (lambda m: index.get(m), [(m,) for m in ids],
+                            lambda m: merchants[merchants['merchant_id'] == m], '/merchant/{}'),
+        'find district (20)': (lambda d: index.find(district=d, limit=20), [(d,) for d in districts],
+                               lambda d: merchants[merchants['district'] == d].head(20), '/merchants?district={}&limit=20'),
+        'pin_code range (20)': (lambda p: index.find(pin_code=(p, p + 500), limit=20), [(p,) for p in pins],
+                                lambda p: merchants[merchants['pin_code'].between(p, p + 500)].head(20),
+                                '/merchants?pin_code={}&limit=20')
+    }
+
+    with tempfile.TemporaryDirectory(prefix='bharatpe_index_') as tmp:
+        servers = {'http': make_server(index, port=0), 'unix': make_server(index, unix_socket=os.path.join(tmp, 'index.sock'))}
+        for server in servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        connections = {
+            'http': http.client.HTTPConnection('127.0.0.1', servers['http'].server_address[1]),
+            'unix': UnixHTTPConnection(os.path.join(tmp, 'index.sock'))
+        }
+
+        print(f"\n{'query':<22}{'mode':<10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+        for name, (query, query_args, scan, template) in workloads.items():
+            def as_path(value, template=template, name=name):
+                return template.format(f"{value}-{value + 500}" if name.startswith('pin_code') else quote(str(value)))
+            rows = [('index', timed(query, query_args)),
+                    ('pandas', timed(scan, query_args[:args.pandas_queries]))]
+            for mode, connection in connections.items():
+                rows.append((mode, timed(lambda path, c=connection: http_get(c, path),
+                                         [(as_path(value),) for (value,) in query_args])))
+            for mode, timings in rows:
+                p50, p99, worst = percentiles(timings)
+                print(f"{name:<22}{mode:<10}{p50:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+
+        for connection in connections.values():
+            connection.close()
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Merchant Index Latency Benchmark =======
@@ -0,0 +1,84 @@
+# ======= BharatPe Stage Profiler Benchmark =======
+#
+# Cost of the stage instrumentation: nanoseconds per stage() with no
+# profiler running, and each analysis timed with profiling off, with
+# memory='rss' and with memory='tracemalloc' (median of --repeat runs on
+# fresh shallow copies of the inputs).
+# Usage: python benchmarks/bench_profiling.py [--data-root DIR] [--repeat 5]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bharatpe_analysis import analysis, loader
+from bharatpe_analysis.output import ReportWriter
+from bharatpe_analysis.profiling import Profiler, stage
+
+
+def run_analysis(name, frames, out):
+    frames = {key: df.copy(deep=False) for key, df in frames.items()}
+    if name == 'churn':
+        analysis.churn_analysis(frames['merchants'], frames['interactions'], verbose=False)
+    elif name == 'product_adoption':
+        with ReportWriter(out, echo=False) as writer:
+            analysis.product_adoption_analysis(frames['merchants'], None, writer=writer)
+    elif name == 'loan_performance':
+        with ReportWriter(out, echo=False) as writer:
+            analysis.loan_performance_analysis(frames['merchants'], frames['loans'], frames['transactions'],
+                                               writer=writer)
+    else:
+        analysis.feature_usage_analysis(frames['merchants'], frames['transactions'])
+
+
+def median_s(fn, repeat, memory):
+    timings = []
+    for _ in range(repeat):
+        profiler = Profiler(memory=memory) if memory != 'off' else None
+        if profiler is not None:
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            fn()
+        finally:
+            timings.append(time.perf_counter() - start)
+            if profiler is not None:
+                profiler.stop()
+    return statistics.median(timings)
+
+
+def noop_stage():
+    with stage('noop', None):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe stage profiler benchmark')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    loops = 1_000_000
+    per_stage = timeit.timeit(noop_stage, number=loops) / loops
+    print(f"stage() with profiling off: {per_stage * 1e9:.0f} ns")
+
+    frames = {name: loader.read_dataset(name, args.data_root)
+              for name in ['merchants', 'interactions', 'loans', 'transactions']}
+    modes = ['off', 'rss', 'tracemalloc']
+    print(f"\n{'analysis':<18}" + ''.join(f"{mode + ' s':>15}" for mode in modes) + f"{'rss cost':>10}{'tm cost':>10}")
+    with tempfile.TemporaryDirectory(prefix='bharatpe_profile_') as out:
+        for name in ['churn', 'product_adoption', 'loan_performance', 'feature_usage']:
+            timings = [median_s(lambda: run_analysis(name, frames, out), args.repeat, mode) for mode in modes]
+            print(f"{name:<18}" + ''.join(f"{t:>15.4f}" for t in timings)
+                  + f"{timings[1] / timings[0] - 1:>10.1%}{timings[2] / timings[0] - 1:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Stage Profiler Benchmark =======
@@ -0,0 +1,72 @@
+# ======= BharatPe Review Warehouse Benchmark =======
+#
+# Loads the three review CSVs (--copies times over, with distinct review
+# ids, to get a bigger table) into a scratch warehouse, then counts the
+# reviews matching every pain-point keyword twice: with the SQL files'
+# LOWER(content) LIKE '%kw%' over the table, and through the trigram index.
+# Also times word_frequency against the same split done in pandas.
+# Usage: python benchmarks/bench_review_warehouse.py [--review-root DIR] [--copies 10]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bharatpe_analysis.config import REVIEW_FILES, review_path
+from bharatpe_analysis.review_warehouse import STOP_WORDS, ReviewWarehouse, split_words
+from bharatpe_analysis.reviews import ISSUE_CATEGORIES, read_reviews
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe review warehouse benchmark')
+    parser.add_argument('--review-root', default=None)
+    parser.add_argument('--copies', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    keywords = sorted({word for _, words in ISSUE_CATEGORIES for word in words})
+    with tempfile.TemporaryDirectory() as tmp:
+        warehouse = ReviewWarehouse(os.path.join(tmp, 'reviews.sqlite'))
+        frames = {}
+        start = time.perf_counter()
+        for app in REVIEW_FILES:
+            reviews = read_reviews(app, review_path(app, args.review_root))
+            frames[app] = pd.concat([reviews.assign(reviewId=reviews['reviewId'] + f'-{copy}')
+                                     for copy in range(args.copies)], ignore_index=True)
+            warehouse.load(app, frames[app])
+        print(f"Loaded {sum(len(frame) for frame in frames.values()):,} reviews in {time.perf_counter() - start:.2f}s")
+
+        for app, frame in frames.items():
+            start = time.perf_counter()
+            scanned = [warehouse.conn.execute("SELECT COUNT(*) FROM reviews WHERE app = ? AND LOWER(content) LIKE ?",
+                                              (app, f'%{keyword}%')).fetchone()[0] for keyword in keywords]
+            scan_time = time.perf_counter() - start
+            start = time.perf_counter()
+            indexed = [warehouse.count_matching(app, keyword) for keyword in keywords]
+            index_time = time.perf_counter() - start
+            mismatches = sum(a != b for a, b in zip(scanned, indexed))
+
+            start = time.perf_counter()
+            words = [(word, score) for content, score in zip(frame['content'].fillna(''), frame['score'])
+                     for word in split_words(content, 10) if len(word) > 3 and word not in STOP_WORDS]
+            pandas_words = pd.DataFrame(words, columns=['word', 'score']).groupby('word')['score'].size()
+            pandas_time = time.perf_counter() - start
+            start = time.perf_counter()
+            top = warehouse.word_frequency(app)
+            words_time = time.perf_counter() - start
+            agrees = (top.set_index('word')['frequency'] == pandas_words.reindex(top['word'])).all()
+
+            print(f"{app:<9} {len(keywords)} keywords: LIKE scan {scan_time * 1000:8.1f}ms, index {index_time * 1000:7.1f}ms "
+                  f"({scan_time / index_time:5.1f}x, {mismatches} mismatches) | word_frequency {words_time * 1000:6.1f}ms "
+                  f"vs pandas split {pandas_time * 1000:7.1f}ms (agrees: {agrees})")
+        warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Review Warehouse Benchmark =======
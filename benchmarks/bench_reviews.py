@@ -0,0 +1,77 @@
+# ======= BharatPe Review Classifier Benchmark =======
+#
+# Times the LIKE cascade (one substring scan per keyword, CASE order) and the
+# reviews x features join against the single-pass ReviewClassifier on the
+# scraped reviews, replicated to the requested size, and checks that both
+# give the same categories and feature mentions.
+# Usage: python benchmarks/bench_reviews.py [--app paytm] [--reviews 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.reviews import (
+    APP_FEATURES,
+    ISSUE_CATEGORIES,
+    OTHER_ISSUES,
+    ReviewClassifier,
+    read_reviews
+)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def like_baseline(content, features):
+    lowered = content.fillna('').str.lower()
+    issue = pd.Series(OTHER_ISSUES, index=content.index, dtype=object)
+    unassigned = np.ones(len(content), dtype=bool)
+    for category, words in ISSUE_CATEGORIES:
+        hit = np.zeros(len(content), dtype=bool)
+        for word in words:
+            hit |= lowered.str.contains(word, regex=False).to_numpy()
+        issue[unassigned & hit] = category
+        unassigned &= ~hit
+    mentions = pd.DataFrame({
+        feature: lowered.str.contains(feature.lower(), regex=False) for feature in features
+    })
+    return issue, mentions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', default='bharatpe', choices=sorted(APP_FEATURES))
+    parser.add_argument('--reviews', type=int, default=200_000)
+    args = parser.parse_args()
+
+    content = read_reviews(args.app)['content']
+    repeat = max(1, -(-args.reviews // len(content)))
+    content = pd.concat([content] * repeat, ignore_index=True).iloc[:args.reviews]
+    print(f"{len(content):,} {args.app} reviews")
+
+    compile_s, classifier = timed(lambda: ReviewClassifier(features=APP_FEATURES[args.app]))
+    baseline_s, (base_issue, base_mentions) = timed(lambda: like_baseline(content, APP_FEATURES[args.app]))
+    scan_s, (issue, mentions) = timed(lambda: classifier.classify(content))
+
+    assert (np.asarray(issue, dtype=object) == base_issue.to_numpy()).all(), "issue categories differ"
+    assert (mentions.to_numpy() == base_mentions.to_numpy()).all(), "feature mentions differ"
+
+    print(f"LIKE cascade + feature join: {baseline_s:8.3f}s")
+    print(f"Single-pass classifier:      {scan_s:8.3f}s  (compile {compile_s * 1000:.1f}ms)")
+    print(f"Speedup:                     {baseline_s / scan_s:8.1f}x")
+    print(f"Throughput:                  {len(content) / scan_s:,.0f} reviews/s")
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Review Classifier Benchmark =======
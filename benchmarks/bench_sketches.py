@@ -0,0 +1,96 @@
+# ======= BharatPe Sketch Benchmark =======
+#
+# Builds the resolution-time and active-merchant sketches from --partitions
+# slices of the data on a process pool, merges the serialized partials, and
+# compares the answers, run time and memory with the exact pandas versions
+# (groupby quantile / nunique over the full tables).
+# Usage: python benchmarks/bench_sketches.py [--data-root DIR] [--partitions 4]
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bharatpe_analysis import loader
+from bharatpe_analysis.rollups import merchant_labels
+from bharatpe_analysis.sketches import QUANTILES, ActiveMerchantSketches, ResolutionSketches, dumps, loads
+
+
+def build_partial(data_root, part, partitions):
+    interactions = loader.read_dataset('interactions', data_root)
+    transactions = loader.read_dataset('transactions', data_root)
+    merchants = loader.read_dataset('merchants', data_root)
+    resolution = ResolutionSketches().update(interactions.iloc[part::partitions])
+    active = ActiveMerchantSketches().update(transactions.iloc[part::partitions], merchants)
+    return dumps(resolution), dumps(active)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BharatPe sketch benchmark')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--partitions', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    interactions = loader.read_dataset('interactions', args.data_root)
+    transactions = loader.read_dataset('transactions', args.data_root)
+    merchants = loader.read_dataset('merchants', args.data_root)
+    print(f"{len(interactions):,} interactions, {len(transactions):,} transactions")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.partitions) as pool:
+        partials = list(pool.map(build_partial, [args.data_root] * args.partitions, range(args.partitions),
+                                 [args.partitions] * args.partitions))
+    resolution, active = (loads(blob) for blob in partials[0])
+    for resolution_blob, active_blob in partials[1:]:
+        resolution.merge(loads(resolution_blob))
+        active.merge(loads(active_blob))
+    sketch_s = time.perf_counter() - start
+    blob_bytes = sum(len(blob) for blobs in partials for blob in blobs)
+    print(f"Sketches: {args.partitions} partitions built and merged in {sketch_s:.2f}s, "
+          f"{blob_bytes / 1e6:.2f} MB serialized across partials")
+
+    start = time.perf_counter()
+    exact = {grouping: interactions.groupby(grouping, observed=True)['resolution_time_days']
+             .quantile(list(QUANTILES), interpolation='lower').unstack() for grouping in resolution.groups}
+    frame = transactions[['transaction_date', 'merchant_id']].assign(
+        state=merchant_labels(transactions, merchants, ['state'])['state'],
+        day=transactions['transaction_date'].dt.normalize()
+    )
+    exact_state = frame.groupby('state')['merchant_id'].nunique()
+    exact_day = frame.groupby('day')['merchant_id'].nunique()
+    exact_s = time.perf_counter() - start
+    print(f"Exact pandas answers in {exact_s:.2f}s")
+
+    worst = 0.0
+    for grouping, table in exact.items():
+        got = resolution.quantiles(grouping).set_index(grouping)
+        ranks = []
+        for key, row in table.iterrows():
+            values = np.sort(interactions.loc[interactions[grouping] == key, 'resolution_time_days'].dropna().to_numpy())
+            if len(values) == 0:
+                continue
+            for q, column in zip(QUANTILES, got.columns[2:]):
+                estimate = got.loc[str(key), column]
+                # Rank error: how far the estimate's rank band is from q
+                lo, hi = np.searchsorted(values, estimate, 'left'), np.searchsorted(values, estimate, 'right')
+                ranks.append(max(lo / len(values) - q, q - hi / len(values), 0.0))
+        worst = max(worst, max(ranks, default=0.0))
+    print(f"Resolution quantiles: worst rank error {worst:.4f}")
+
+    by_state = active.distinct(['state']).set_index('state')['distinct']
+    state_error = (by_state / exact_state.rename(index=str).reindex(by_state.index) - 1).abs()
+    by_day = active.distinct(['day']).set_index('day')['distinct']
+    day_error = (by_day.to_numpy() / exact_day.to_numpy() - 1)
+    print(f"Distinct merchants per state: mean error {state_error.mean():.2%}, worst {state_error.max():.2%}")
+    print(f"Daily active merchants: mean error {np.abs(day_error).mean():.2%}, worst {np.abs(day_error).max():.2%}")
+
+
+if __name__ == "__main__":
+    main()
+
+# ======= End of BharatPe Sketch Benchmark =======
@@ -0,0 +1,55 @@
+# ======= BharatPe Analysis Package =======
+#
+# Importing the package is cheap: pandas and the datasets are only pulled in
+# the first time one of the names below is actually used.
+
+import importlib
+
+from .config import get_data_root, set_data_root
+
+_LAZY_ATTRS = {
+    'churn_analysis': 'analysis',
+    'product_adoption_analysis': 'analysis',
+    'loan_performance_analysis': 'analysis',
+    'feature_usage_analysis': 'analysis',
+    'feature_adoption_analysis': 'feature_matrix',
+    'FeatureMatrix': 'feature_matrix',
+    'incremental_churn_analysis': 'incremental',
+    'IncrementalChurn': 'incremental',
+    'run_reports': 'runner',
+    'ResultCache': 'result_cache',
+    'RollupStore': 'rollups',
+    'MerchantIndex': 'merchant_index',
+    'ReviewStore': 'review_store',
+    'ReviewWarehouse': 'review_warehouse',
+    'LoanBook': 'loan_portfolio',
+    'KLLSketch': 'sketches',
+    'HyperLogLog': 'sketches',
+    'ResolutionSketches': 'sketches',
+    'ActiveMerchantSketches': 'sketches',
+    'ChurnFeatures': 'churn_model',
+    'churn_model_pipeline': 'churn_model',
+    'ReviewClassifier': 'reviews',
+    'read_reviews': 'reviews',
+    'review_keyword_analysis': 'reviews',
+    'get_dataset': 'loader',
+    'load_datasets': 'loader',
+    'clear_cache': 'loader',
+}
+
+__all__ = ['get_data_root', 'set_data_root'] + list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(f'.{_LAZY_ATTRS[name]}', __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+# ======= End of BharatPe Analysis Package =======
@@ -0,0 +1,111 @@
+# ======= BharatPe Vectorized Aggregation Kernels =======
+#
+# Replacements for the per-row apply() and per-group lambdas used by the
+# analyses. Everything here works on whole NumPy arrays: the product combo is
+# a 4-bit code, status rates are means over precomputed boolean columns and
+# group mode / nunique are sort-based kernels over factorized codes. Results
+# match what the lambdas produced, including how value_counts breaks ties.
+
+import numpy as np
+import pandas as pd
+
+COMBO_FLAGS = ['qr_displayed', 'soundbox_adopted', 'swipe_machine', 'loan_taken_bool']
+COMBO_NAMES = ['QR', 'Sound', 'Swipe', 'Loan']
+
+# Label for every 4-bit code, bit 3 = QR ... bit 0 = Loan
+COMBO_LABELS = np.array([
+    ', '.join(
+        f"{name}: {'Y' if code & (1 << (3 - bit)) else 'N'}"
+        for bit, name in enumerate(COMBO_NAMES)
+    )
+    for code in range(16)
+], dtype=object)
+
+
+def product_combo_code(df, flags=COMBO_FLAGS):
+    code = np.zeros(len(df), dtype=np.uint8)
+    for bit, col in enumerate(flags):
+        code |= df[col].to_numpy(dtype=bool, na_value=False).astype(np.uint8) << (len(flags) - 1 - bit)
+    return code
+
+
+def product_combo_labels(code):
+    return COMBO_LABELS.take(code)
+
+
+def product_combo_counts(code):
+    # Same ordering as value_counts() on the label strings
+    counts = pd.Series(code).value_counts()
+    return pd.DataFrame({
+        'combination': product_combo_labels(counts.index.to_numpy()),
+        'count': counts.to_numpy()
+    })
+
+
+def status_flag(series, value, case_sensitive=True):
+    if case_sensitive:
+        return (series == value).to_numpy(dtype=bool, na_value=False)
+    return (series.astype(str).str.lower() == value.lower()).to_numpy(dtype=bool, na_value=False)
+
+
+def _pair_counts(keys, values):
+    # Factorizes both columns and counts each (key, value) pair with one sort.
+    # Returns the key uniques, value uniques and per-pair key code, value
+    # code, count and first row position.
+    key_codes, key_uniques = pd.factorize(keys, sort=True)
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        val_codes = values.cat.codes.to_numpy()
+        val_uniques = values.cat.categories
+    else:
+        val_codes, val_uniques = pd.factorize(values)
+
+    valid = (key_codes >= 0) & (val_codes >= 0)
+    n_values = max(len(val_uniques), 1)
+    pair = key_codes[valid].astype(np.int64) * n_values + val_codes[valid]
+    position = np.flatnonzero(valid)
+
+    order = np.argsort(pair, kind='stable')
+    sorted_pair = pair[order]
+    starts = np.flatnonzero(np.r_[True, sorted_pair[1:] != sorted_pair[:-1]]) if len(sorted_pair) else np.array([], dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(sorted_pair)])
+    unique_pair = sorted_pair[starts]
+
+    return (
+        key_uniques,
+        val_uniques,
+        unique_pair // n_values,
+        unique_pair % n_values,
+        counts,
+        position[order][starts]
+    )
+
+
+def group_mode(keys, values):
+    # Equivalent to groupby(keys)[values].agg(lambda x: x.value_counts().index[0])
+    # on plain values: ties go to the value seen first. Categoricals get the
+    # same tie-break, although their own value_counts would order ties by
+    # category. Keys whose values are all missing come back as NaN instead of raising
+    key_uniques, val_uniques, pair_key, pair_val, counts, first_pos = _pair_counts(keys, values)
+    categorical = isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype)
+
+    order = np.lexsort((first_pos, -counts, pair_key))
+    sorted_keys = pair_key[order]
+    winners = order[np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]] if len(order) else order
+
+    # Keys whose values are all missing keep code -1
+    mode_codes = np.full(len(key_uniques), -1, dtype=np.int64)
+    mode_codes[pair_key[winners]] = pair_val[winners]
+
+    if categorical:
+        mode_values = pd.Categorical.from_codes(mode_codes, dtype=values.dtype)
+    else:
+        mode_values = pd.Index(val_uniques).take(mode_codes, allow_fill=True)
+    return pd.Series(mode_values, index=pd.Index(key_uniques))
+
+
+def group_nunique(keys, values):
+    # Equivalent to groupby(keys)[values].nunique()
+    key_uniques, _, pair_key, _, _, _ = _pair_counts(keys, values)
+    return pd.Series(np.bincount(pair_key, minlength=len(key_uniques)), index=pd.Index(key_uniques))
+
+# ======= End of BharatPe Vectorized Aggregation Kernels =======
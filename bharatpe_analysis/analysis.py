@@ -0,0 +1,561 @@
+from datetime import datetime
+
+import pandas as pd
+
+from .aggregation import (
+    group_mode,
+    group_nunique,
+    product_combo_code,
+    product_combo_counts,
+    product_combo_labels,
+    status_flag
+)
+from .cube import MerchantCube
+from .loan_activity import LOAN_WINDOWS, TransactionIndex, activity_around_first_loan, loan_activity_windows
+from .output import ReportWriter
+from .profiling import profiled, stage
+
+
+# ======= BharatPe Churn Analysis Data Processing =======
+
+CHURN_DIMENSIONS = ['business_category', 'state', 'tier', 'acquisition_channel']
+
+@profiled()
+def churn_analysis(merchants, interactions, verbose=True):
+    with stage('churn_flags', merchants):
+        current_date = merchants['last_transaction_date'].max()
+        merchants['days_since_last_txn'] = (current_date - pd.to_datetime(merchants['last_transaction_date'])).dt.days
+        merchants['is_churned'] = merchants['days_since_last_txn'] > 30
+
+    churn_rate = merchants['is_churned'].mean()
+    if verbose:
+        print(f"Overall churn rate: {churn_rate:.2%}")
+
+    # One scan; every breakdown (and any cross of them) is a slice of the cube
+    with stage('churn_cube', merchants) as s:
+        churn_cube = MerchantCube(merchants, CHURN_DIMENSIONS, {
+            'merchant_count': ('merchant_id', 'count'),
+            'churn_rate': ('is_churned', 'mean')
+        })
+        s.output(churn_cube.cells)
+
+    with stage('churn_rollups'):
+        churn_by_category = churn_cube.rollup(['business_category']).sort_values('churn_rate', ascending=False)
+        churn_by_state = churn_cube.rollup(['state']).sort_values('churn_rate', ascending=False)
+        churn_by_channel = churn_cube.rollup(['acquisition_channel']).sort_values('churn_rate', ascending=False)
+
+    with stage('interaction_groupby', interactions) as s:
+        merchant_interactions = s.output(interactions.groupby('merchant_id').agg(
+            num_interactions=('interaction_id', 'count'),
+            avg_resolution_time=('resolution_time_days', 'mean')
+        ).reset_index())
+
+    with stage('interaction_merge', merchants) as s:
+        merchants = s.output(merchants.merge(merchant_interactions, on='merchant_id', how='left'))
+        merchants[['num_interactions', 'avg_resolution_time']] = merchants[['num_interactions', 'avg_resolution_time']].fillna(0)
+
+    return {
+        'overall_churn_rate': churn_rate,
+        'churn_by_category': churn_by_category,
+        'churn_by_state': churn_by_state,
+        'churn_by_channel': churn_by_channel,
+        'merchant_interactions': merchant_interactions,
+        'churn_cube': churn_cube
+    }
+
+# ======= End of BharatPe Churn Analysis Data Processing =======
+
+
+# ======= BharatPe Product Adoption Analysis Data Processing =======
+
+ADOPTION_DIMENSIONS = [
+    'business_category', 'size_category', 'state', 'tier',
+    'qr_displayed', 'soundbox_adopted', 'swipe_machine'
+]
+ADOPTION_MEASURES = ['merchant_count', 'qr_displayed', 'soundbox_adopted', 'swipe_machine', 'loan_adoption_rate']
+IMPACT_MEASURES = ['merchant_count', 'monthly_transaction_count', 'monthly_transaction_value', 'active_rate']
+
+@profiled()
+def product_adoption_analysis(merchants, enriched_merchants, output_dir='product_adoption_output', writer=None):
+    # Without a writer the CSVs land directly in output_dir, as they always have
+    owns_writer = writer is None
+    if owns_writer:
+        writer = ReportWriter(output_dir, per_run=False)
+
+    try:
+        with stage('product_flags', merchants):
+            for col in ['qr_displayed', 'soundbox_adopted', 'swipe_machine']:
+                if not pd.api.types.is_bool_dtype(merchants[col]):
+                    merchants[col] = merchants[col].str.lower().map({'yes': True, 'no': False})
+        
+            merchants['loan_taken_bool'] = merchants['loans_taken'] > 0
+
+        adoption_rates = {
+            'QR Displayed': merchants['qr_displayed'].mean(),
+            'Soundbox Adopted': merchants['soundbox_adopted'].mean(),
+            'Swipe Machine': merchants['swipe_machine'].mean(),
+            'Loans Taken': merchants['loan_taken_bool'].mean()
+        }
+
+        writer.print("\n=== Overall Product Adoption Rates ===")
+        for product, rate in adoption_rates.items():
+            writer.print(f"{product}: {rate:.2%}")
+    
+        adoption_rates_df = pd.DataFrame(list(adoption_rates.items()), columns=['Product', 'Adoption_Rate'])
+        writer.write_frame('overall_adoption_rates', adoption_rates_df)
+
+        with stage('size_qcut', merchants):
+            merchants['size_category'] = pd.qcut(
+                merchants['monthly_transaction_value'],
+                4,
+                labels=['Small', 'Medium', 'Large', 'Very Large']
+            )
+
+        # One scan; every breakdown below (and any cross of them) is a slice of the cube
+        with stage('adoption_cube', merchants) as s:
+            adoption_cube = MerchantCube(merchants, ADOPTION_DIMENSIONS, {
+                'merchant_count': ('merchant_id', 'count'),
+                'qr_displayed': ('qr_displayed', 'mean'),
+                'soundbox_adopted': ('soundbox_adopted', 'mean'),
+                'swipe_machine': ('swipe_machine', 'mean'),
+                'loan_adoption_rate': ('loan_taken_bool', 'mean'),
+                'monthly_transaction_count': ('monthly_transaction_count', 'mean'),
+                'monthly_transaction_value': ('monthly_transaction_value', 'mean'),
+                'active_rate': (status_flag(merchants['active_status'], 'active', case_sensitive=False), 'mean')
+            })
+            s.output(adoption_cube.cells)
+
+        adoption_by_category = adoption_cube.rollup(['business_category'], ADOPTION_MEASURES).reset_index()
+        writer.write_frame('adoption_by_category', adoption_by_category)
+    
+        writer.print("\n=== Adoption by Business Category ===")
+        writer.print(adoption_by_category.head())
+
+        adoption_by_size = adoption_cube.rollup(['size_category'], ADOPTION_MEASURES).reset_index()
+        writer.write_frame('adoption_by_size', adoption_by_size)
+    
+        writer.print("\n=== Adoption by Merchant Size ===")
+        writer.print(adoption_by_size.head())
+
+        adoption_by_state = adoption_cube.rollup(['state'], ADOPTION_MEASURES).reset_index()
+        writer.write_frame('adoption_by_state', adoption_by_state)
+    
+        writer.print("\n=== Adoption by State (Top 5) ===")
+        writer.print(adoption_by_state.head())
+
+        with stage('product_combinations', merchants) as s:
+            combo_code = product_combo_code(merchants)
+            merchants['product_combo'] = product_combo_labels(combo_code)
+
+            product_combinations = s.output(product_combo_counts(combo_code))
+        product_combinations['percentage'] = product_combinations['count'] / product_combinations['count'].sum()
+        writer.write_frame('product_combinations', product_combinations)
+    
+        writer.print("\n=== Top 5 Product Combinations ===")
+        writer.print(product_combinations.head())
+
+        impact_analysis = adoption_cube.rollup(
+            ['qr_displayed', 'soundbox_adopted', 'swipe_machine'], IMPACT_MEASURES
+        ).reset_index()
+    
+        impact_analysis['product_count'] = impact_analysis[['qr_displayed', 'soundbox_adopted', 'swipe_machine']].sum(axis=1)
+        writer.write_frame('impact_analysis', impact_analysis)
+    
+        writer.print("\n=== Impact of Product Adoption on Merchant Metrics ===")
+        writer.print(impact_analysis.head())
+    finally:
+        if owns_writer:
+            # Also drains the queue when the analysis raised
+            with stage('write_outputs'):
+                writer.close()
+    writer.print(f"\nAll CSVs saved to folder: {writer.run_dir}\n")
+
+    return {
+        'adoption_rates': adoption_rates,
+        'adoption_by_category': adoption_by_category,
+        'adoption_by_size': adoption_by_size,
+        'adoption_by_state': adoption_by_state,
+        'product_combinations': product_combinations,
+        'impact_analysis': impact_analysis,
+        'adoption_cube': adoption_cube
+    }
+
+# ======= End of BharatPe Product Adoption Analysis Data Processing =======
+
+
+# ======= BharatPe Loan Performance Analysis Data Processing =======
+
+def merchant_activity_around_first_loan(transactions, merchant_first_loan, index=None):
+    # Binary searches over transactions sorted by (merchant, date) instead of
+    # joining every transaction to its merchant's first loan date
+    if index is None:
+        index = TransactionIndex.build(transactions, merchant_first_loan['merchant_id'])
+    return activity_around_first_loan(index, merchant_first_loan)
+
+
+def pivot_loan_activity(merchant_activity_after_loan):
+    merchant_activity_pivot = merchant_activity_after_loan.pivot_table(
+        index='merchant_id',
+        columns='is_after_loan',
+        values=['transaction_id', 'amount']
+    ).reset_index()
+    
+    merchant_activity_pivot.columns = [
+        f"{col[0]}_{col[1]}" if col[1] != "" else col[0] 
+        for col in merchant_activity_pivot.columns
+    ]
+    
+    for col in ['transaction_id_False', 'amount_False']:
+        if col in merchant_activity_pivot.columns:
+            merchant_activity_pivot[col] = merchant_activity_pivot[col].replace(0, float('nan'))
+    
+    if all(col in merchant_activity_pivot.columns for col in ['transaction_id_True', 'transaction_id_False']):
+        merchant_activity_pivot['txn_count_change'] = merchant_activity_pivot['transaction_id_True'] / merchant_activity_pivot['transaction_id_False'] - 1
+    if all(col in merchant_activity_pivot.columns for col in ['amount_True', 'amount_False']):
+        merchant_activity_pivot['txn_amount_change'] = merchant_activity_pivot['amount_True'] / merchant_activity_pivot['amount_False'] - 1
+    
+    return merchant_activity_pivot
+
+
+@profiled()
+def loan_performance_analysis(merchants, loans, transactions, output_dir='output', writer=None,
+                              activity_windows=LOAN_WINDOWS):
+    owns_writer = writer is None
+    if owns_writer:
+        writer = ReportWriter(output_dir, per_run=False)
+    
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_name = f"loan_analysis_report_{timestamp}.txt"
+        output_file = writer.path(report_name)
+
+        report = []
+        loan_metrics = {
+            'Total Loans': loans.shape[0],
+            'Total Loan Amount': float(loans['loan_amount'].sum()),
+            'Average Loan Amount': float(loans['loan_amount'].mean()),
+            'Default Rate': float((loans['status'] == 'defaulted').mean())
+        }
+    
+        report.append("Overall Loan Metrics:\n")
+        for metric, value in loan_metrics.items():
+            if 'Rate' in metric:
+                report.append(f"{metric}: {value:.2%}\n")
+            elif 'Amount' in metric:
+                report.append(f"{metric}: ₹{value:,.2f}\n")
+            else:
+                report.append(f"{metric}: {value:,}\n")
+        report.append("\n")
+    
+        writer.print("".join(report).rstrip("\n"))
+    
+        with stage('merchant_merge', loans) as s:
+            merchant_loans = s.output(pd.merge(
+                loans,
+                merchants[['merchant_id', 'business_category', 'state', 'tier', 
+                        'acquisition_channel', 'monthly_transaction_value']],
+                on='merchant_id',
+                how='left'
+            ))
+            merchant_loans['is_defaulted'] = status_flag(merchant_loans['status'], 'defaulted')
+    
+        with stage('loan_by_category', merchant_loans) as s:
+            loan_by_category = s.output(merchant_loans.groupby('business_category').agg({
+                'loan_id': 'count',
+                'loan_amount': 'mean',
+                'interest_rate': 'mean',
+                'is_defaulted': 'mean'
+            }).reset_index())
+    
+        loan_by_category.rename(columns={
+            'loan_id': 'loan_count',
+            'is_defaulted': 'default_rate'
+        }, inplace=True)
+    
+        report.append("Loan Performance by Business Category:\n")
+        report.append(loan_by_category.to_string(index=False))
+        report.append("\n\n")
+    
+        with stage('loan_by_type', merchant_loans) as s:
+            loan_by_type = s.output(merchant_loans.groupby('loan_type').agg({
+                'loan_id': 'count',
+                'loan_amount': 'mean',
+                'interest_rate': 'mean',
+                'is_defaulted': 'mean'
+            }).reset_index())
+    
+        loan_by_type.rename(columns={
+            'loan_id': 'loan_count',
+            'is_defaulted': 'default_rate'
+        }, inplace=True)
+    
+        report.append("Loan Performance by Loan Type:\n")
+        report.append(loan_by_type.to_string(index=False))
+        report.append("\n\n")
+    
+        try:
+            with stage('txn_volume_qcut', merchant_loans):
+                merchant_loans['txn_volume_category'] = pd.qcut(
+                    merchant_loans['monthly_transaction_value'],
+                    4,
+                    labels=['Low', 'Medium', 'High', 'Very High']
+                )
+        
+            with stage('loan_by_txn_volume', merchant_loans) as s:
+                loan_by_txn_volume = s.output(merchant_loans.groupby('txn_volume_category').agg({
+                    'loan_id': 'count',
+                    'loan_amount': 'mean',
+                    'interest_rate': 'mean',
+                    'is_defaulted': 'mean'
+                }).reset_index())
+        
+            loan_by_txn_volume.rename(columns={
+                'loan_id': 'loan_count',
+                'is_defaulted': 'default_rate'
+            }, inplace=True)
+        
+            report.append("Loan Performance by Transaction Volume:\n")
+            report.append(loan_by_txn_volume.to_string(index=False))
+            report.append("\n\n")
+        except Exception as e:
+            report.append(f"Error analyzing transaction volume data: {str(e)}\n\n")
+            loan_by_txn_volume = pd.DataFrame()
+    
+        index = None
+        try:
+            with stage('first_loan', loans) as s:
+                merchant_first_loan = s.output(loans.groupby('merchant_id').agg({
+                    'approval_date': 'min'
+                }).reset_index())
+        
+            merchant_first_loan.rename(columns={
+                'approval_date': 'first_loan_date'
+            }, inplace=True)
+        
+            if isinstance(transactions, pd.DataFrame):
+                with stage('transaction_index', transactions) as s:
+                    index = s.output(TransactionIndex.build(transactions, loans['merchant_id']))
+                with stage('activity_around_first_loan', merchant_first_loan) as s:
+                    merchant_activity_after_loan = s.output(merchant_activity_around_first_loan(
+                        transactions, merchant_first_loan, index=index
+                    ))
+            else:
+                from .streaming import stream_loan_activity
+                with stage('stream_loan_activity', merchant_first_loan) as s:
+                    merchant_activity_after_loan = s.output(stream_loan_activity(transactions, merchant_first_loan))
+        
+            with stage('pivot_loan_activity', merchant_activity_after_loan) as s:
+                merchant_activity_pivot = s.output(pivot_loan_activity(merchant_activity_after_loan))
+        
+            report.append("Merchant Activity Before and After Loan:\n")
+            report.append(merchant_activity_pivot.head(20).to_string())
+            report.append("\n\n")
+        
+            if 'txn_count_change' in merchant_activity_pivot.columns:
+                report.append("Transaction Count Change Summary:\n")
+                report.append(merchant_activity_pivot['txn_count_change'].describe().to_string())
+                report.append("\n\n")
+        
+            if 'txn_amount_change' in merchant_activity_pivot.columns:
+                report.append("Transaction Amount Change Summary:\n")
+                report.append(merchant_activity_pivot['txn_amount_change'].describe().to_string())
+                report.append("\n\n")
+        except Exception as e:
+            report.append(f"Error analyzing merchant activity data: {str(e)}\n\n")
+            merchant_activity_pivot = pd.DataFrame()
+    
+        # Every loan, not just the first: needs the in-memory transaction index
+        loan_windows = pd.DataFrame()
+        if activity_windows and index is not None:
+            try:
+                with stage('loan_activity_windows', loans) as s:
+                    loan_windows = s.output(loan_activity_windows(index, loans, **activity_windows))
+            
+                report.append(f"Activity Around Every Loan ({activity_windows['pre_days']} days before, "
+                              f"during the term, {activity_windows['post_days']} days after):\n")
+                report.append(loan_windows.groupby('loan_type', observed=True).agg({
+                    'loan_id': 'count',
+                    'pre_txn_count': 'mean',
+                    'during_txn_count': 'mean',
+                    'post_txn_count': 'mean',
+                    'during_vs_pre_txn_change': 'median',
+                    'post_vs_pre_txn_change': 'median'
+                }).rename(columns={'loan_id': 'loan_count'}).to_string())
+                report.append("\n\n")
+            except Exception as e:
+                report.append(f"Error analyzing loan window activity: {str(e)}\n\n")
+                loan_windows = pd.DataFrame()
+
+        writer.write_text(report_name, "".join(report))
+        writer.write_frame('loan_by_category', loan_by_category)
+        writer.write_frame('loan_by_type', loan_by_type)
+    
+        if not loan_by_txn_volume.empty:
+            writer.write_frame('loan_by_txn_volume', loan_by_txn_volume)
+    
+        if not merchant_activity_pivot.empty:
+            writer.write_frame('merchant_activity_pivot', merchant_activity_pivot)
+    
+        if not loan_windows.empty:
+            writer.write_frame('loan_activity_windows', loan_windows)
+    finally:
+        if owns_writer:
+            # Also drains the queue when the analysis raised
+            with stage('write_outputs'):
+                writer.close()
+    writer.print(f"\nAnalysis completed successfully. All results saved to {writer.run_dir} directory.")
+    writer.print(f"Main report saved to: {output_file}")
+    
+    return {
+        'loan_metrics': loan_metrics,
+        'loan_by_category': loan_by_category,
+        'loan_by_type': loan_by_type,
+        'loan_by_txn_volume': loan_by_txn_volume,
+        'merchant_activity_after_loan': merchant_activity_pivot,
+        'loan_activity_windows': loan_windows
+    }
+
+# ======= End of BharatPe Loan Performance Analysis Data Processing =======
+
+
+# ======= BharatPe Feature Usage Analysis Data Processing =======
+
+@profiled()
+def feature_usage_analysis(merchants, transactions):
+    if not isinstance(transactions, pd.DataFrame):
+        from .streaming import stream_feature_usage_aggregates
+        with stage('stream_aggregates'):
+            aggregates = stream_feature_usage_aggregates(transactions, merchants)
+        return summarize_feature_usage(merchants, *aggregates)
+    
+    with stage('payment_method_usage', transactions) as s:
+        payment_method_usage = s.output(transactions.groupby('payment_method').agg({
+            'transaction_id': 'count',
+            'amount': 'sum'
+        }).reset_index())
+    
+    with stage('daily_method_usage', transactions) as s:
+        transactions['transaction_date_only'] = transactions['transaction_date'].dt.date
+        daily_method_usage = s.output(transactions.groupby(['transaction_date_only', 'payment_method']).agg({
+            'transaction_id': 'count'
+        }).reset_index())
+    
+    with stage('merchant_merge', transactions) as s:
+        txn_with_merchant = s.output(pd.merge(
+            transactions,
+            merchants[['merchant_id', 'qr_displayed', 'soundbox_adopted', 'swipe_machine']],
+            on='merchant_id',
+            how='inner'
+        ))
+    
+    with stage('merchant_product_usage', txn_with_merchant) as s:
+        merchant_product_usage = txn_with_merchant.groupby('merchant_id').agg({
+            'transaction_id': 'count',
+            'amount': 'sum',
+            'qr_displayed': 'first',
+            'soundbox_adopted': 'first',
+            'swipe_machine': 'first'
+        })
+        merchant_product_usage.insert(
+            2, 'payment_method', group_mode(txn_with_merchant['merchant_id'], txn_with_merchant['payment_method'])
+            .reindex(merchant_product_usage.index).array
+        )
+        merchant_product_usage = s.output(merchant_product_usage.reset_index())
+    
+    with stage('merchant_usage_metrics', transactions) as s:
+        merchant_usage_metrics = transactions.groupby('merchant_id').agg({
+            'transaction_id': 'count',
+            'amount': 'sum'
+        })
+        merchant_usage_metrics['payment_method'] = group_nunique(
+            transactions['merchant_id'], transactions['payment_method']
+        ).reindex(merchant_usage_metrics.index, fill_value=0).to_numpy()
+        merchant_usage_metrics = s.output(merchant_usage_metrics.reset_index())
+    
+    return summarize_feature_usage(
+        merchants, payment_method_usage, daily_method_usage, merchant_product_usage, merchant_usage_metrics
+    )
+
+
+def summarize_feature_usage(merchants, payment_method_usage, daily_method_usage, merchant_product_usage, merchant_usage_metrics):
+    # Everything after the transaction-level aggregations; shared with the streaming engine
+    payment_method_usage['txn_share'] = payment_method_usage['transaction_id'] / payment_method_usage['transaction_id'].sum()
+    payment_method_usage['amount_share'] = payment_method_usage['amount'] / payment_method_usage['amount'].sum()
+    
+    with stage('daily_method_pivot', daily_method_usage) as s:
+        daily_method_pivot = s.output(daily_method_usage.pivot_table(
+            index='transaction_date_only',
+            columns='payment_method',
+            values='transaction_id',
+            fill_value=0
+        ).reset_index())
+        
+        for column in daily_method_pivot.columns:
+            if column != 'transaction_date_only':
+                daily_method_pivot[f"{column}_7d_ma"] = daily_method_pivot[column].rolling(7).mean()
+    
+    merchant_product_usage['primary_payment_method'] = merchant_product_usage['payment_method']
+    merchant_product_usage.drop('payment_method', axis=1, inplace=True)
+    
+    qr_alignment = merchant_product_usage.groupby(['qr_displayed', 'primary_payment_method']).agg({
+        'merchant_id': 'count',
+        'transaction_id': 'mean',
+        'amount': 'mean'
+    }).reset_index()
+    
+    swipe_alignment = merchant_product_usage.groupby(['swipe_machine', 'primary_payment_method']).agg({
+        'merchant_id': 'count',
+        'transaction_id': 'mean',
+        'amount': 'mean'
+    }).reset_index()
+    
+    merchant_usage_metrics.rename(columns={
+        'transaction_id': 'txn_count',
+        'amount': 'txn_amount',
+        'payment_method': 'payment_methods_used'
+    }, inplace=True)
+    
+    with stage('usage_qcut', merchant_usage_metrics):
+        merchant_usage_metrics['usage_frequency'] = pd.qcut(
+            merchant_usage_metrics['txn_count'], 
+            3, 
+            labels=['Low', 'Medium', 'High']
+        )
+        
+        merchant_usage_metrics['usage_diversity'] = pd.cut(
+            merchant_usage_metrics['payment_methods_used'],
+            bins=[0, 1, 2, 10],
+            labels=['Single Method', 'Two Methods', 'Multiple Methods']
+        )
+    
+    with stage('segment_merge', merchant_usage_metrics) as s:
+        merchant_segments = s.output(pd.merge(
+            merchant_usage_metrics,
+            merchants[['merchant_id', 'business_category', 'active_status']],
+            on='merchant_id',
+            how='inner'
+        ))
+    
+    with stage('segment_performance', merchant_segments) as s:
+        segment_performance = s.output(merchant_segments.assign(
+            active_status=status_flag(merchant_segments['active_status'], 'active')
+        ).groupby(['usage_frequency', 'usage_diversity']).agg({
+            'merchant_id': 'count',
+            'txn_amount': 'mean',
+            'active_status': 'mean'
+        }).reset_index())
+    
+    segment_performance.rename(columns={
+        'merchant_id': 'merchant_count',
+        'active_status': 'active_rate'
+    }, inplace=True)
+    
+    return {
+        'payment_method_usage': payment_method_usage,
+        'daily_method_usage': daily_method_pivot,
+        'qr_alignment': qr_alignment,
+        'swipe_alignment': swipe_alignment,
+        'segment_performance': segment_performance
+    }
+
+# ======= End of BharatPe Feature Usage Analysis Data Processing =======
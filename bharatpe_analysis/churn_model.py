@@ -0,0 +1,402 @@
+# ======= BharatPe Churn Risk Model =======
+#
+# ChurnFeatures keeps one float32 row per merchant, built from the merchant
+# record, their interactions, loans and feature usage. It is pickled between
+# runs and only the delta is applied on the next one: new or changed
+# merchants overwrite their own columns, interactions and loans not seen
+# before (by id) are added to running totals, and feature usage rows
+# overwrite their cells. Rows for merchants that are not known yet are held
+# back until the merchant arrives. The label
+# is the churn_analysis flag (no transaction in the 30 days before the latest
+# last_transaction_date), so active_status and last_transaction_date are kept
+# out of the features. Categoricals are stored as stable integer codes, which
+# is all the random forest needs.
+#
+#     result = churn_model_pipeline(merchants, interactions, loans, feature_usage,
+#                                   cache_path='state/churn_features.pkl',
+#                                   model_path='models/churn_rf.pkl')
+
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from .incremental import CHURN_DAYS, _NAT, _to_ns
+
+MERCHANT_NUMERIC = [
+    'monthly_transaction_count', 'monthly_transaction_value', 'avg_ticket_size', 'loans_taken'
+]
+MERCHANT_FLAGS = ['qr_displayed', 'soundbox_adopted', 'swipe_machine']
+MERCHANT_CODES = [
+    'business_category', 'state', 'tier', 'acquisition_channel', 'device_type', 'current_loan_status'
+]
+INTERACTION_COLUMNS = ['num_interactions', 'avg_resolution_time', 'unresolved_interactions']
+LOAN_COLUMNS = [
+    'loan_count', 'total_loan_amount', 'avg_interest_rate', 'defaulted_loans', 'active_loans', 'remaining_amount'
+]
+# Running totals behind the interaction and loan columns
+TOTALS = [
+    'num_interactions', 'unresolved_interactions', 'resolution_sum', 'resolution_n',
+    'loan_count', 'total_loan_amount', 'interest_sum', 'defaulted_loans', 'active_loans', 'remaining_amount'
+]
+BASE_COLUMNS = (
+    MERCHANT_NUMERIC + MERCHANT_FLAGS + ['onboarding_day'] + MERCHANT_CODES
+    + INTERACTION_COLUMNS + LOAN_COLUMNS
+)
+
+DEFAULT_BATCH_SIZE = 50_000
+_DAY_NS = 86_400 * 10**9
+
+
+def _flag(values):
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=np.float32)
+    return values.astype(str).str.lower().isin(['yes', 'true']).to_numpy(dtype=np.float32)
+
+
+class ChurnFeatures:
+    def __init__(self, churn_days=CHURN_DAYS):
+        self.churn_days = churn_days
+        self.columns = list(BASE_COLUMNS)
+        self.col = {name: i for i, name in enumerate(self.columns)}
+
+        self.rows = {}
+        self.ids = []
+        self.matrix = np.zeros((0, len(self.columns)), dtype=np.float32)
+        self.last_txn = np.zeros(0, dtype=np.int64)
+        self.levels = {name: {} for name in MERCHANT_CODES}
+        self.features = []
+
+        self.totals = np.zeros((0, len(TOTALS)), dtype=np.float64)
+        self.interaction_ids = set()
+        self.loan_ids = set()
+        self.pending = {}
+        self.pending_usage = {}
+
+    # ----- construction and persistence -----
+
+    @classmethod
+    def from_frames(cls, merchants, interactions=None, loans=None, feature_usage=None, churn_days=CHURN_DAYS):
+        return cls(churn_days).update(merchants, interactions, loans, feature_usage)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def update(self, merchants=None, interactions=None, loans=None, feature_usage=None):
+        # Applies whatever is new; safe to call with the full frames every run
+        if merchants is not None:
+            self.apply_merchants(merchants)
+        if interactions is not None:
+            self.apply_interactions(interactions)
+        if loans is not None:
+            self.apply_loans(loans)
+        if feature_usage is not None:
+            self.apply_feature_usage(feature_usage)
+        return self
+
+    # ----- deltas -----
+
+    def _grow(self, needed):
+        capacity = len(self.matrix)
+        if needed <= capacity:
+            return
+        extra = max(needed, 2 * capacity, 1024) - capacity
+        self.matrix = np.vstack([self.matrix, np.zeros((extra, len(self.columns)), dtype=np.float32)])
+        self.last_txn = np.r_[self.last_txn, np.full(extra, _NAT, dtype=np.int64)]
+        self.totals = np.vstack([self.totals, np.zeros((extra, len(TOTALS)))])
+
+    def _add_columns(self, names):
+        names = [name for name in names if name not in self.col]
+        if not names:
+            return
+        for name in names:
+            self.col[name] = len(self.columns)
+            self.columns.append(name)
+        self.matrix = np.hstack([self.matrix, np.zeros((len(self.matrix), len(names)), dtype=np.float32)])
+
+    def _lookup(self, merchant_ids):
+        # Row per id, -1 for merchants not seen yet (ignored, as in a left join)
+        return np.fromiter((self.rows.get(merchant_id, -1) for merchant_id in merchant_ids),
+                           dtype=np.int64, count=len(merchant_ids))
+
+    def _encode(self, name, values):
+        levels = self.levels[name]
+        codes = np.empty(len(values), dtype=np.float32)
+        for i, value in enumerate(values):
+            if pd.isna(value):
+                codes[i] = -1
+                continue
+            code = levels.get(value)
+            if code is None:
+                code = levels[value] = len(levels)
+            codes[i] = code
+        return codes
+
+    def apply_merchants(self, merchants):
+        # New merchants get a row; known ones have their merchant columns overwritten
+        merchants = merchants.drop_duplicates('merchant_id', keep='last')
+        ids = merchants['merchant_id'].tolist()
+        rows = self._lookup(ids)
+        new = np.flatnonzero(rows < 0)
+        if len(new):
+            self._grow(len(self.ids) + len(new))
+            rows[new] = np.arange(len(self.ids), len(self.ids) + len(new))
+            for position, row in zip(new.tolist(), rows[new].tolist()):
+                self.rows[ids[position]] = row
+                self.ids.append(ids[position])
+
+        for name in MERCHANT_NUMERIC:
+            self.matrix[rows, self.col[name]] = merchants[name].to_numpy(dtype=np.float32, na_value=np.nan)
+        for name in MERCHANT_FLAGS:
+            self.matrix[rows, self.col[name]] = _flag(merchants[name])
+        for name in MERCHANT_CODES:
+            self.matrix[rows, self.col[name]] = self._encode(name, merchants[name].tolist())
+
+        onboarding = _to_ns(merchants['onboarding_date'])
+        self.matrix[rows, self.col['onboarding_day']] = np.where(
+            onboarding == _NAT, np.nan, onboarding // _DAY_NS
+        ).astype(np.float32)
+        self.last_txn[rows] = _to_ns(merchants['last_transaction_date'])
+        if len(new) and (self.pending or self.pending_usage):
+            self._adopt_pending([ids[position] for position in new.tolist()], rows[new].tolist())
+        return self
+
+    def _add_totals(self, merchant_ids, deltas):
+        # deltas: one row of TOTALS per input row; merchants not seen yet are
+        # parked in pending and folded in when their merchant row arrives
+        if len(merchant_ids) == 0:
+            return
+        grouped = pd.DataFrame(deltas, columns=TOTALS).groupby(np.asarray(merchant_ids, dtype=object)).sum()
+        rows = self._lookup(grouped.index.tolist())
+        values = grouped.to_numpy()
+        known = rows >= 0
+        np.add.at(self.totals, rows[known], values[known])
+        for merchant_id, delta in zip(grouped.index[~known].tolist(), values[~known]):
+            self.pending[merchant_id] = self.pending.get(merchant_id, 0.0) + delta
+        self._refresh(np.unique(rows[known]))
+
+    def _refresh(self, rows):
+        totals = {name: self.totals[rows, i] for i, name in enumerate(TOTALS)}
+        for name in ['num_interactions', 'unresolved_interactions', 'loan_count', 'total_loan_amount',
+                     'defaulted_loans', 'active_loans', 'remaining_amount']:
+            self.matrix[rows, self.col[name]] = totals[name]
+        # 0 when unknown, like the fillna(0) in churn_analysis
+        self.matrix[rows, self.col['avg_resolution_time']] = np.where(
+            totals['resolution_n'] > 0, totals['resolution_sum'] / np.maximum(totals['resolution_n'], 1), 0.0
+        )
+        self.matrix[rows, self.col['avg_interest_rate']] = totals['interest_sum'] / np.maximum(totals['loan_count'], 1)
+
+    def _new_ids(self, df, column, seen):
+        # Interactions and loans are counted once, however often they are passed
+        # in. Ids repeat across merchants in the source data, so the key is
+        # (merchant_id, id).
+        keys = pd.Series(list(zip(df['merchant_id'].tolist(), df[column].tolist())), index=df.index)
+        fresh = ~keys.isin(seen) & ~keys.duplicated()
+        seen.update(keys[fresh].tolist())
+        return df[fresh.to_numpy()]
+
+    def apply_interactions(self, interactions):
+        interactions = self._new_ids(interactions, 'interaction_id', self.interaction_ids)
+        resolution = interactions['resolution_time_days'].to_numpy(dtype=np.float64, na_value=np.nan)
+        deltas = np.zeros((len(interactions), len(TOTALS)))
+        deltas[:, TOTALS.index('num_interactions')] = 1
+        deltas[:, TOTALS.index('unresolved_interactions')] = interactions['resolution_status'].astype(str) != 'Resolved'
+        deltas[:, TOTALS.index('resolution_sum')] = np.nan_to_num(resolution)
+        deltas[:, TOTALS.index('resolution_n')] = ~np.isnan(resolution)
+        self._add_totals(interactions['merchant_id'].tolist(), deltas)
+        return self
+
+    def apply_loans(self, loans):
+        loans = self._new_ids(loans, 'loan_id', self.loan_ids)
+        status = loans['status'].astype(str).str.lower().to_numpy()
+        deltas = np.zeros((len(loans), len(TOTALS)))
+        deltas[:, TOTALS.index('loan_count')] = 1
+        deltas[:, TOTALS.index('total_loan_amount')] = loans['loan_amount'].to_numpy(dtype=np.float64)
+        deltas[:, TOTALS.index('interest_sum')] = loans['interest_rate'].to_numpy(dtype=np.float64)
+        deltas[:, TOTALS.index('defaulted_loans')] = np.isin(status, ['default', 'defaulted'])
+        deltas[:, TOTALS.index('active_loans')] = status == 'active'
+        deltas[:, TOTALS.index('remaining_amount')] = loans['remaining_amount'].to_numpy(dtype=np.float64, na_value=0.0)
+        self._add_totals(loans['merchant_id'].tolist(), deltas)
+        return self
+
+    def apply_feature_usage(self, feature_usage):
+        # Usage rows are snapshots: the latest row for a (merchant, feature) wins
+        names = [str(feature) for feature in pd.unique(feature_usage['feature'].dropna())]
+        for feature in names:
+            if feature not in self.features:
+                self.features.append(feature)
+        self._add_columns([f'uses_{feature}' for feature in names] + [f'freq_{feature}' for feature in names])
+
+        merchant_ids = feature_usage['merchant_id'].tolist()
+        rows = self._lookup(merchant_ids)
+        features = feature_usage['feature'].astype(str).to_numpy()
+        used = _flag(feature_usage['is_used'])
+        frequency = feature_usage['monthly_frequency'].to_numpy(dtype=np.float32, na_value=0)
+        for i in np.flatnonzero(rows < 0).tolist():
+            self.pending_usage[(merchant_ids[i], features[i])] = (used[i], frequency[i])
+
+        known = rows >= 0
+        for feature in names:
+            mask = known & (features == feature)
+            self.matrix[rows[mask], self.col[f'uses_{feature}']] = used[mask]
+            self.matrix[rows[mask], self.col[f'freq_{feature}']] = frequency[mask]
+        return self
+
+    def _adopt_pending(self, merchant_ids, rows):
+        # Interactions, loans and usage that arrived before their merchant
+        rows_with_totals = []
+        for merchant_id, row in zip(merchant_ids, rows):
+            delta = self.pending.pop(merchant_id, None)
+            if delta is not None:
+                self.totals[row] += delta
+                rows_with_totals.append(row)
+        if rows_with_totals:
+            self._refresh(np.array(rows_with_totals, dtype=np.int64))
+
+        if self.pending_usage:
+            new = set(merchant_ids)
+            for key in [key for key in self.pending_usage if key[0] in new]:
+                used, frequency = self.pending_usage.pop(key)
+                row = self.rows[key[0]]
+                self.matrix[row, self.col[f'uses_{key[1]}']] = used
+                self.matrix[row, self.col[f'freq_{key[1]}']] = frequency
+
+    # ----- outputs -----
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def X(self, columns=None):
+        matrix = self.matrix[:self.size]
+        if columns is None:
+            return matrix
+        return matrix[:, [self.col[name] for name in columns]]
+
+    def labels(self):
+        last = self.last_txn[:self.size]
+        known = last != _NAT
+        if not known.any():
+            return np.zeros(len(last), dtype=bool)
+        days = (last[known].max() - np.where(known, last, last[known].max())) // _DAY_NS
+        return known & (days > self.churn_days)
+
+
+# ----- model -----
+
+def train_churn_model(features, n_estimators=200, max_depth=None, n_jobs=-1, test_size=0.25, random_state=42):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    X, y = features.X(), features.labels()
+    stratify = y if 0 < y.sum() < len(y) and min(y.sum(), len(y) - y.sum()) >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=stratify
+    )
+
+    model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, n_jobs=n_jobs,
+        random_state=random_state, class_weight='balanced'
+    )
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_s = time.perf_counter() - start
+
+    auc = float('nan')
+    if len(model.classes_) == 2 and len(np.unique(y_test)) == 2:
+        auc = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+    return {
+        'model': model,
+        'columns': list(features.columns),
+        'train_s': train_s,
+        'auc': auc,
+        'n_train': len(X_train),
+        'n_test': len(X_test),
+        'churn_rate': float(y.mean()) if len(y) else float('nan'),
+        'classification_report': classification_report(y_test, model.predict(X_test), zero_division=0)
+    }
+
+
+def save_model(trained, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(trained, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_model(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def score_merchants(trained, features, batch_size=DEFAULT_BATCH_SIZE):
+    # Fixed-size batches keep the per-tree prediction buffers bounded
+    model = trained['model']
+    X = features.X(trained['columns'])
+    positive = list(model.classes_).index(True) if True in model.classes_ else None
+    scores = np.zeros(len(X), dtype=np.float32)
+
+    start = time.perf_counter()
+    if positive is not None:
+        for begin in range(0, len(X), batch_size):
+            scores[begin:begin + batch_size] = model.predict_proba(X[begin:begin + batch_size])[:, positive]
+    score_s = time.perf_counter() - start
+
+    scored = pd.DataFrame({'merchant_id': features.ids, 'churn_probability': scores})
+    return scored, {
+        'score_s': score_s,
+        'merchants_per_s': len(X) / score_s if score_s else float('inf'),
+        'batches': -(-len(X) // batch_size)
+    }
+
+
+def churn_model_pipeline(merchants=None, interactions=None, loans=None, feature_usage=None,
+                         cache_path=None, model_path=None, n_estimators=200, n_jobs=-1,
+                         batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    start = time.perf_counter()
+    if cache_path and os.path.exists(cache_path):
+        features = ChurnFeatures.load(cache_path)
+    elif merchants is not None:
+        features = ChurnFeatures()
+    else:
+        raise FileNotFoundError(f"No feature cache at {cache_path} and no merchants to build it from")
+    features.update(merchants, interactions, loans, feature_usage)
+    if cache_path:
+        features.save(cache_path)
+    features_s = time.perf_counter() - start
+
+    trained = train_churn_model(features, n_estimators=n_estimators, n_jobs=n_jobs)
+    if model_path:
+        save_model(trained, model_path)
+    scores, scoring = score_merchants(trained, features, batch_size)
+
+    if verbose:
+        print(f"Feature matrix: {features.size:,} merchants x {len(features.columns)} features "
+              f"({features.X().nbytes / 1e6:.1f} MB float32) in {features_s:.2f}s")
+        print(f"Training: {trained['n_train']:,} merchants, {n_estimators} trees in {trained['train_s']:.2f}s")
+        print(f"Test AUC: {trained['auc']:.3f}")
+        print(f"Scoring: {scoring['merchants_per_s']:,.0f} merchants/s "
+              f"({scoring['batches']} batches of {batch_size:,})")
+
+    return {
+        'features': features,
+        'model': trained,
+        'scores': scores.sort_values('churn_probability', ascending=False, ignore_index=True),
+        'timings': {'features_s': features_s, 'train_s': trained['train_s'], **scoring},
+        'auc': trained['auc']
+    }
+
+# ======= End of BharatPe Churn Risk Model =======
@@ -0,0 +1,57 @@
+# ======= BharatPe Analysis Configuration =======
+
+import os
+
+DATA_ROOT_ENV = 'BHARATPE_DATA_ROOT'
+REVIEW_ROOT_ENV = 'BHARATPE_REVIEW_ROOT'
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_DATA_ROOT = os.path.join(REPO_ROOT, 'Synthetic BharatPe Data')
+
+DATASET_FILES = {
+    'merchants': 'merchants.csv',
+    'enriched_merchants': 'merchants_enriched.csv',
+    'transactions': 'transactions.csv',
+    'interactions': 'interactions.csv',
+    'loans': 'loans.csv',
+    'feature_usage': 'feature_usage.csv'
+}
+
+# Play Store review scrapes, one per app
+REVIEW_FILES = {
+    'bharatpe': 'bharatpe_reviews.csv',
+    'paytm': 'paytm_reviews.csv',
+    'phonepe': 'phonepe_reviews.csv'
+}
+
+_data_root = None
+
+
+def set_data_root(path):
+    global _data_root
+    _data_root = os.path.abspath(os.path.expanduser(path)) if path else None
+
+    # Anything already loaded came from the old root
+    from . import loader
+    loader.clear_cache()
+
+
+def get_data_root():
+    if _data_root is not None:
+        return _data_root
+    return os.environ.get(DATA_ROOT_ENV) or DEFAULT_DATA_ROOT
+
+
+def dataset_path(name, data_root=None):
+    if name not in DATASET_FILES:
+        raise KeyError(f"Unknown dataset: {name}")
+    return os.path.join(data_root or get_data_root(), DATASET_FILES[name])
+
+
+def review_path(app, review_root=None):
+    if app not in REVIEW_FILES:
+        raise KeyError(f"Unknown app: {app}")
+    return os.path.join(review_root or os.environ.get(REVIEW_ROOT_ENV) or REPO_ROOT, REVIEW_FILES[app])
+
+# ======= End of BharatPe Analysis Configuration =======
@@ -0,0 +1,118 @@
+# ======= BharatPe Merchant Cube =======
+#
+# Scans a frame once and keeps per-cell non-null counts and sums for every
+# measure column at the finest grain of the requested dimensions. Any rollup
+# over a subset of those dimensions (including cross-dimensions such as
+# state x tier, or the grand total) is then answered from the cell table,
+# which is tiny next to the merchant table, without rescanning it.
+#
+#     cube = MerchantCube(merchants, ['state', 'tier'], {
+#         'merchant_count': ('merchant_id', 'count'),
+#         'churn_rate': ('is_churned', 'mean')
+#     })
+#     cube.rollup(['state'])
+#     cube.rollup(['state', 'tier'])
+
+import numpy as np
+import pandas as pd
+
+AGG_FUNCS = ('count', 'sum', 'mean')
+
+
+class MerchantCube:
+    def __init__(self, df, dimensions, measures):
+        self.dimensions = list(dimensions)
+        self.measures = {}
+        self.levels = {}
+
+        codes = []
+        for dim in self.dimensions:
+            column = df[dim]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                dim_codes = column.cat.codes.to_numpy().astype(np.int64)
+                uniques = column.cat.categories
+            else:
+                dim_codes, uniques = pd.factorize(column, sort=True)
+            # Missing values get their own trailing code so they are kept in
+            # the cells but dropped from any rollup that groups on them
+            dim_codes = np.where(dim_codes < 0, len(uniques), dim_codes)
+            self.levels[dim] = (uniques, column.dtype)
+            codes.append(dim_codes)
+
+        shape = tuple(len(self.levels[dim][0]) + 1 for dim in self.dimensions)
+        if codes:
+            flat = np.ravel_multi_index(codes, shape)
+        else:
+            flat = np.zeros(len(df), dtype=np.int64)
+        inverse, cell_ids = pd.factorize(flat)
+        n_cells = len(cell_ids)
+
+        self.cells = pd.DataFrame(
+            dict(zip(self.dimensions, np.unravel_index(cell_ids, shape))) if codes else {},
+            index=pd.RangeIndex(n_cells)
+        )
+
+        for name, (source, func) in measures.items():
+            if func not in AGG_FUNCS:
+                raise ValueError(f"Unsupported aggregation {func!r} for {name}, expected one of {AGG_FUNCS}")
+            # Measures may point at a column or carry their own values
+            key = source if isinstance(source, str) else name
+            values = df[source] if isinstance(source, str) else pd.Series(np.asarray(source))
+            valid = values.notna().to_numpy()
+
+            if f"{key}__n" not in self.cells:
+                self.cells[f"{key}__n"] = np.bincount(inverse, weights=valid, minlength=n_cells).astype(np.int64)
+            if func != 'count' and f"{key}__sum" not in self.cells:
+                numeric = np.where(valid, values.to_numpy(dtype=np.float64, na_value=0.0), 0.0)
+                self.cells[f"{key}__sum"] = np.bincount(inverse, weights=numeric, minlength=n_cells)
+            self.measures[name] = (key, func)
+
+    def _index(self, grouped, dims):
+        arrays = []
+        for dim in dims:
+            uniques, dtype = self.levels[dim]
+            level_codes = grouped[dim].to_numpy()
+            if isinstance(dtype, pd.CategoricalDtype):
+                arrays.append(pd.Categorical.from_codes(level_codes, dtype=dtype))
+            else:
+                arrays.append(pd.Index(uniques).take(level_codes).infer_objects())
+        if len(arrays) == 1:
+            return pd.Index(arrays[0], name=dims[0])
+        return pd.MultiIndex.from_arrays(arrays, names=dims)
+
+    def rollup(self, dims, measures=None):
+        dims = list(dims)
+        unknown = [dim for dim in dims if dim not in self.levels]
+        if unknown:
+            raise KeyError(f"Dimensions not in cube: {unknown}")
+        names = list(measures) if measures is not None else list(self.measures)
+
+        cells = self.cells
+        for dim in dims:
+            cells = cells[cells[dim] < len(self.levels[dim][0])]
+
+        stat_columns = [col for col in cells.columns if col not in self.dimensions]
+        if dims:
+            grouped = cells.groupby(dims, sort=True)[stat_columns].sum().reset_index()
+            index = self._index(grouped, dims)
+        else:
+            grouped = cells[stat_columns].sum().to_frame().T.astype(cells[stat_columns].dtypes)
+            index = pd.RangeIndex(1)
+
+        result = pd.DataFrame(index=index)
+        for name in names:
+            key, func = self.measures[name]
+            count = grouped[f"{key}__n"].to_numpy()
+            if func == 'count':
+                result[name] = count
+            elif func == 'sum':
+                result[name] = grouped[f"{key}__sum"].to_numpy()
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result[name] = grouped[f"{key}__sum"].to_numpy() / count
+        return result
+
+    def grouping_sets(self, sets, measures=None):
+        return {tuple(dims): self.rollup(dims, measures) for dims in sets}
+
+# ======= End of BharatPe Merchant Cube =======
@@ -0,0 +1,291 @@
+# ======= BharatPe Feature Adoption Matrix =======
+#
+# feature_usage.csv as a merchants x features CSR matrix holding
+# monthly_frequency, one stored cell per (merchant, feature) in use. Every
+# co-usage statistic is a sparse product of the 0/1 adoption pattern A with
+# itself, so the cost grows with the number of features in use, never with
+# merchants x features:
+#
+#     A.T @ A             merchants using both features (features x features)
+#     A.T @ W             total frequency of one feature among adopters of another
+#     A.T @ diag(y) @ A   outcome y summed over merchants using both
+#
+# Outcomes (churn, loans, defaults) are joined per merchant row and only
+# ever enter through A.T @ y products.
+#
+#     matrix = FeatureMatrix.from_usage(get_dataset('feature_usage'), merchant_ids=merchants['merchant_id'])
+#     pairs = matrix.co_usage()
+#     result = feature_adoption_analysis(feature_usage, merchants, loans)
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .incremental import CHURN_DAYS
+from .streaming import DEFAULT_CHUNKSIZE, _plain
+
+OUTCOME_COLUMNS = ['churned', 'has_loan', 'defaulted', 'loan_count', 'total_loan_amount']
+
+
+def _usage_chunks(source, chunksize):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, (str, os.PathLike)):
+        from .loader import iter_dataset
+        yield from iter_dataset('feature_usage', chunksize=chunksize, path=source)
+    else:
+        yield from source
+
+
+def _used(values):
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return values.astype(str).str.lower().isin(['yes', 'true']).to_numpy()
+
+
+class FeatureMatrix:
+
+    def __init__(self, frequency, merchants, features):
+        # frequency: CSR (merchants x features); merchants: pd.Index of ids in row order
+        self.frequency = frequency.tocsr()
+        self.merchants = merchants
+        self.features = list(features)
+        # 0/1 pattern of the stored cells (explicit zeros included); integer so
+        # co-usage counts stay exact past float32's 2**24
+        self.adoption = sparse.csr_matrix(
+            (np.ones(self.frequency.nnz, dtype=np.int32), self.frequency.indices, self.frequency.indptr),
+            shape=self.frequency.shape
+        )
+
+    @classmethod
+    def from_usage(cls, feature_usage, merchant_ids=None, chunksize=DEFAULT_CHUNKSIZE):
+        # feature_usage: DataFrame, CSV path or iterable of chunks. Rows are
+        # snapshots, so the last row for a (merchant, feature) wins. The rows of
+        # the matrix are merchant_ids (if given) followed by any other merchant
+        # seen in feature_usage, whether or not it uses anything.
+        merchants = pd.Index([] if merchant_ids is None else pd.unique(_plain(pd.Series(merchant_ids)).dropna()))
+        features = {}
+        rows, cols, values = [], [], []
+        for chunk in _usage_chunks(feature_usage, chunksize):
+            # Look up each distinct id of the chunk once, not every row
+            chunk_codes, ids = pd.factorize(_plain(chunk['merchant_id']))
+            positions = merchants.get_indexer(ids)
+            unknown = positions < 0
+            if unknown.any():
+                merchants = merchants.append(pd.Index(ids[unknown]))
+                positions[unknown] = merchants.get_indexer(ids[unknown])
+            codes = np.append(positions, -1)[chunk_codes]
+
+            # Chunk categories -> matrix columns, without touching every row's string
+            feature = chunk['feature']
+            if not isinstance(feature.dtype, pd.CategoricalDtype):
+                feature = feature.astype('category')
+            mapping = np.array([features.setdefault(str(name), len(features))
+                                for name in feature.cat.categories] + [-1], dtype=np.int64)
+            feature_codes = mapping[feature.cat.codes.to_numpy()]
+
+            keep = (feature_codes >= 0) & (codes >= 0)
+            rows.append(codes[keep].astype(np.int64))
+            cols.append(feature_codes[keep])
+            values.append(np.where(
+                _used(chunk['is_used'])[keep],
+                chunk['monthly_frequency'].to_numpy(dtype=np.float32, na_value=0)[keep],
+                np.nan
+            ).astype(np.float32))
+
+        rows = np.concatenate(rows) if rows else np.empty(0, np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, np.int64)
+        values = np.concatenate(values) if values else np.empty(0, np.float32)
+
+        # Last row per (merchant, feature), then only the features in use. A used
+        # feature with frequency 0 stays as an explicit zero, so it still counts
+        # as adopted.
+        keys = rows * max(len(features), 1) + cols
+        last = ~pd.Series(keys).duplicated(keep='last').to_numpy()
+        keep = last & ~np.isnan(values)
+        frequency = sparse.csr_matrix(
+            (values[keep], (rows[keep], cols[keep])), shape=(len(merchants), len(features)), dtype=np.float32
+        )
+        return cls(frequency, merchants, list(features))
+
+    # ----- shape -----
+
+    @property
+    def shape(self):
+        return self.frequency.shape
+
+    @property
+    def nbytes(self):
+        # The adoption pattern shares indices and indptr with the frequencies
+        return (self.frequency.data.nbytes + self.adoption.data.nbytes
+                + self.frequency.indices.nbytes + self.frequency.indptr.nbytes)
+
+    def dense_nbytes(self):
+        # What a dense float32 pivot of the same table would take
+        return self.shape[0] * self.shape[1] * 4
+
+    def adopters(self):
+        return np.asarray(self.adoption.sum(axis=0)).ravel()
+
+    def features_per_merchant(self):
+        return np.diff(self.adoption.indptr)
+
+    def to_frame(self):
+        # Long (merchant_id, feature, monthly_frequency) for the stored cells
+        coo = self.frequency.tocoo()
+        return pd.DataFrame({
+            'merchant_id': self.merchants[coo.row],
+            'feature': pd.Categorical.from_codes(coo.col, categories=self.features),
+            'monthly_frequency': np.round(coo.data).astype(np.int32)
+        })
+
+    # ----- co-usage -----
+
+    def co_counts(self):
+        # Merchants using both features, as a dense features x features array
+        return (self.adoption.T @ self.adoption).toarray()
+
+    def conditional_adoption(self):
+        # P(uses column feature | uses row feature)
+        counts = self.co_counts()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            conditional = counts / np.diag(counts)[:, None]
+        return pd.DataFrame(conditional, index=self.features, columns=self.features)
+
+    def lift(self):
+        # P(a and b) / (P(a) P(b)); above 1 means used together more than chance
+        counts = self.co_counts()
+        adopters = np.diag(counts).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lift = counts * self.shape[0] / np.outer(adopters, adopters)
+        return pd.DataFrame(lift, index=self.features, columns=self.features)
+
+    def co_usage(self):
+        # One row per ordered feature pair: support, confidence, lift and the
+        # mean monthly frequency of feature_b among merchants also using feature_a
+        counts = self.co_counts().astype(np.float64)
+        adopters = np.diag(counts)
+        frequency_sum = (self.adoption.T @ self.frequency).toarray()
+        n = self.shape[0]
+        a, b = np.nonzero(~np.eye(len(self.features), dtype=bool))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pairs = pd.DataFrame({
+                'feature_a': np.asarray(self.features, dtype=object)[a],
+                'feature_b': np.asarray(self.features, dtype=object)[b],
+                'merchants_both': counts[a, b].astype(np.int64),
+                'support': counts[a, b] / n,
+                'confidence': counts[a, b] / adopters[a],
+                'lift': counts[a, b] * n / (adopters[a] * adopters[b]),
+                'avg_frequency_b': frequency_sum[a, b] / counts[a, b]
+            })
+        return pairs.sort_values(['lift', 'merchants_both'], ascending=False, kind='stable').reset_index(drop=True)
+
+    # ----- outcomes -----
+
+    def align(self, values):
+        # A per-merchant Series or frame (indexed by merchant_id) as a float array in row order; NaN where missing
+        if values.index is not self.merchants:
+            values = values.reindex(self.merchants)
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def feature_outcomes(self, outcomes):
+        # Mean of every outcome column among adopters and non-adopters of each feature
+        adopters = self.adopters()
+        result = pd.DataFrame({'feature': self.features, 'adopters': adopters.astype(np.int64),
+                               'adoption_rate': adopters / max(self.shape[0], 1)})
+        aligned = self.align(outcomes)
+        for i, column in enumerate(outcomes.columns):
+            y = aligned[:, i]
+            valid = ~np.isnan(y)
+            y = np.where(valid, y, 0.0)
+            sum_adopt = self.adoption.T @ y
+            n_adopt = self.adoption.T @ valid.astype(np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[f'{column}_adopters'] = sum_adopt / n_adopt
+                result[f'{column}_non_adopters'] = (y.sum() - sum_adopt) / (valid.sum() - n_adopt)
+            result[f'{column}_difference'] = result[f'{column}_adopters'] - result[f'{column}_non_adopters']
+        return result
+
+    def pair_outcome(self, outcome):
+        # Mean outcome among merchants using both features (features x features)
+        y = self.align(outcome).ravel()
+        valid = ~np.isnan(y)
+        weighted = self.adoption.T @ sparse.diags(np.where(valid, y, 0.0)) @ self.adoption
+        counted = self.adoption.T @ sparse.diags(valid.astype(np.float64)) @ self.adoption
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = weighted.toarray() / counted.toarray()
+        return pd.DataFrame(means, index=self.features, columns=self.features)
+
+    def outcomes_by_feature_count(self, outcomes):
+        # Outcome means by how many features a merchant uses
+        frame = pd.DataFrame(self.align(outcomes), columns=outcomes.columns)
+        frame['features_used'] = self.features_per_merchant()
+        summary = frame.groupby('features_used').mean()
+        summary.insert(0, 'merchant_count', frame.groupby('features_used').size())
+        return summary.reset_index()
+
+
+def merchant_outcomes(merchants=None, loans=None, churn_days=CHURN_DAYS):
+    # One row per merchant_id: churned (same rule as churn_analysis), has_loan,
+    # defaulted (any loan in default), loan_count and total_loan_amount
+    parts = []
+    if merchants is not None:
+        last = pd.to_datetime(merchants['last_transaction_date'], errors='coerce')
+        churned = ((last.max() - last).dt.days > churn_days).astype(np.float64)
+        churned[last.isna()] = np.nan
+        parts.append(pd.DataFrame({'churned': churned.to_numpy()}, index=pd.Index(_plain(merchants['merchant_id']))))
+    if loans is not None:
+        status = _plain(loans['status']).astype(str).str.lower()
+        per_merchant = pd.DataFrame({
+            'merchant_id': _plain(loans['merchant_id']).to_numpy(),
+            'loan_count': 1.0,
+            'defaulted': status.isin(['default', 'defaulted']).to_numpy(dtype=np.float64),
+            'total_loan_amount': loans['loan_amount'].to_numpy(dtype=np.float64)
+        }).groupby('merchant_id').agg({'loan_count': 'sum', 'defaulted': 'max', 'total_loan_amount': 'sum'})
+        per_merchant['has_loan'] = 1.0
+        parts.append(per_merchant)
+    if not parts:
+        return pd.DataFrame(columns=OUTCOME_COLUMNS)
+    outcomes = pd.concat(parts, axis=1)
+    outcomes = outcomes[~outcomes.index.duplicated(keep='last')]
+    if loans is not None:
+        # Merchants without loans: 0, not unknown
+        for column in ['loan_count', 'defaulted', 'total_loan_amount', 'has_loan']:
+            outcomes[column] = outcomes[column].fillna(0.0)
+    return outcomes[[column for column in OUTCOME_COLUMNS if column in outcomes.columns]]
+
+
+def feature_adoption_analysis(feature_usage, merchants=None, loans=None, verbose=True):
+    matrix = FeatureMatrix.from_usage(
+        feature_usage, merchant_ids=merchants['merchant_id'] if merchants is not None else None
+    )
+    # Reindexed once here so align() need not redo it per outcome column
+    outcomes = merchant_outcomes(merchants, loans).reindex(matrix.merchants)
+    co_usage = matrix.co_usage()
+    feature_outcomes = matrix.feature_outcomes(outcomes)
+
+    result = {
+        'matrix': matrix,
+        'co_usage': co_usage,
+        'conditional_adoption': matrix.conditional_adoption(),
+        'lift': matrix.lift(),
+        'feature_outcomes': feature_outcomes,
+        'by_feature_count': matrix.outcomes_by_feature_count(outcomes)
+    }
+    if 'churned' in outcomes.columns:
+        result['pair_churn_rate'] = matrix.pair_outcome(outcomes[['churned']])
+
+    if verbose:
+        rows, cols = matrix.shape
+        print(f"Feature matrix: {rows:,} merchants x {cols} features, {matrix.adoption.nnz:,} cells in use "
+              f"({matrix.nbytes / 1e6:.2f} MB sparse vs {matrix.dense_nbytes() / 1e6:.2f} MB dense)")
+        print("\n=== Feature Adoption and Outcomes ===")
+        print(feature_outcomes.round(3).to_string(index=False))
+        print("\n=== Top Feature Pairs by Lift ===")
+        print(co_usage.head(10).round(3).to_string(index=False))
+    return result
+
+# ======= End of BharatPe Feature Adoption Matrix =======
@@ -0,0 +1,399 @@
+# ======= BharatPe Incremental Churn Computation =======
+#
+# Keeps per-merchant last-transaction state, churn counters per category /
+# state / channel and per-merchant interaction totals, so a daily run only
+# has to apply the new merchants, transactions and interactions since the
+# last checkpoint. Merchants that drift past the churn threshold are expired
+# from a min-heap ordered by last transaction time, which makes each update
+# proportional to the size of the delta plus the number of merchants whose
+# status actually changes. apply_merchants also looks up every merchant it is
+# given (one vectorized index lookup), so passing the full merchants table
+# each day adds a pass over it.
+#
+# The reference date is the latest last-transaction time seen, exactly as in
+# churn_analysis, and result() returns the same tables it does (without the
+# cube, which needs a full scan).
+#
+#     state = IncrementalChurn.from_frames(merchants, interactions)
+#     state.save('state/churn.pkl')
+#     ...
+#     state = IncrementalChurn.load('state/churn.pkl')
+#     state.apply_transactions(state.new_rows(todays_transactions, 'transactions'))
+#     state.apply_interactions(state.new_rows(todays_interactions, 'interactions'))
+#     state.result()
+
+import heapq
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+CHURN_DAYS = 30
+DIMENSIONS = {
+    'churn_by_category': 'business_category',
+    'churn_by_state': 'state',
+    'churn_by_channel': 'acquisition_channel'
+}
+WATERMARK_COLUMNS = {
+    'transactions': 'transaction_date',
+    'interactions': 'date'
+}
+# Dates are often whole days, so rows on the watermark day itself are told
+# apart by (merchant_id, id)
+KEY_COLUMNS = {
+    'transactions': 'transaction_id',
+    'interactions': 'interaction_id'
+}
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_ns(values):
+    return pd.to_datetime(values, errors='coerce').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+class _Counters:
+    # merchant / churned counts per value of one dimension
+
+    def __init__(self, dtype=None):
+        self.codes = {}
+        self.values = []
+        self.dtype = dtype
+        self.merchants = np.zeros(0, dtype=np.int64)
+        self.churned = np.zeros(0, dtype=np.int64)
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            if pd.isna(value):
+                codes[i] = -1
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+
+        if len(self.values) > len(self.merchants):
+            grow = len(self.values) - len(self.merchants)
+            self.merchants = np.r_[self.merchants, np.zeros(grow, dtype=np.int64)]
+            self.churned = np.r_[self.churned, np.zeros(grow, dtype=np.int64)]
+        return codes
+
+    def add(self, codes, target, delta=1):
+        codes = codes[codes >= 0]
+        np.add.at(target, codes, delta)
+
+    def table(self, dim):
+        order = sorted(range(len(self.values)), key=lambda code: self.values[code])
+        order = [code for code in order if self.merchants[code] > 0]
+        values = [self.values[code] for code in order]
+
+        if isinstance(self.dtype, pd.CategoricalDtype):
+            categories = self.dtype.categories.union(pd.Index(values), sort=False)
+            index = pd.CategoricalIndex(values, categories=categories, name=dim)
+        else:
+            index = pd.Index(values, name=dim).infer_objects()
+
+        merchants = self.merchants[order]
+        return pd.DataFrame({
+            'merchant_count': merchants,
+            'churn_rate': self.churned[order] / merchants
+        }, index=index).sort_values('churn_rate', ascending=False)
+
+
+class IncrementalChurn:
+    def __init__(self, churn_days=CHURN_DAYS):
+        self.churn_days = churn_days
+        self.threshold_ns = int(pd.Timedelta(days=churn_days + 1).value)
+        self.current_ns = _NAT
+        self.watermarks = {}
+        self.watermark_keys = {}
+
+        self.ids = []
+        self._id_index = None
+        self.size = 0
+        self.last_txn = np.zeros(0, dtype=np.int64)
+        self.churned = np.zeros(0, dtype=bool)
+        self.dim_codes = {dim: np.zeros(0, dtype=np.int64) for dim in DIMENSIONS.values()}
+        self.counters = {dim: _Counters() for dim in DIMENSIONS.values()}
+
+        self.interaction_rows = {}
+        self.interaction_ids = []
+        self.interaction_count = np.zeros(0, dtype=np.int64)
+        self.resolution_sum = np.zeros(0, dtype=np.float64)
+        self.resolution_n = np.zeros(0, dtype=np.int64)
+
+        self._heap = []
+
+    # ----- construction and persistence -----
+
+    @classmethod
+    def from_frames(cls, merchants, interactions=None, churn_days=CHURN_DAYS):
+        state = cls(churn_days)
+        state.apply_merchants(merchants)
+        if interactions is not None:
+            state.apply_interactions(interactions)
+        return state
+
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The heap and the id index are derived and rebuilt on load
+        state['_heap'] = None
+        state['_id_index'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        active = np.flatnonzero(~self.churned[:self.size] & (self.last_txn[:self.size] != _NAT))
+        self._heap = list(zip(self.last_txn[active].tolist(), active.tolist()))
+        heapq.heapify(self._heap)
+
+    # ----- deltas -----
+
+    def new_rows(self, df, kind):
+        # Rows newer than the watermark, plus rows on the watermark day that
+        # earlier checkpoints have not applied yet
+        watermark = self.watermarks.get(kind)
+        if watermark is None or df.empty:
+            return df
+        dates = _to_ns(df[WATERMARK_COLUMNS[kind]])
+        keep = dates > watermark
+        same_day = np.flatnonzero(dates == watermark)
+        if len(same_day) and KEY_COLUMNS[kind] in df.columns:
+            seen = self.watermark_keys.get(kind, set())
+            keys = self._keys(df.iloc[same_day], kind)
+            keep[same_day] = [key not in seen for key in keys]
+        return df[keep]
+
+    def _keys(self, df, kind):
+        return list(zip(df['merchant_id'].tolist(), df[KEY_COLUMNS[kind]].tolist()))
+
+    def _advance_watermark(self, kind, df):
+        column = WATERMARK_COLUMNS[kind]
+        if column not in df.columns or not len(df):
+            return
+        dates = _to_ns(df[column])
+        latest = int(dates.max())
+        watermark = self.watermarks.get(kind, _NAT)
+        if latest == _NAT or latest < watermark:
+            return
+        if latest > watermark:
+            self.watermarks[kind] = latest
+            self.watermark_keys[kind] = set()
+        if KEY_COLUMNS[kind] in df.columns:
+            self.watermark_keys[kind].update(self._keys(df[dates == latest], kind))
+
+    def _lookup(self, merchant_ids):
+        # Row per id, -1 for merchants not seen yet
+        if self._id_index is None or len(self._id_index) != self.size:
+            self._id_index = pd.Index(self.ids, dtype=object)
+        return self._id_index.get_indexer(np.asarray(merchant_ids, dtype=object))
+
+    def _grow(self, needed):
+        capacity = len(self.last_txn)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        extra = capacity - len(self.last_txn)
+        self.last_txn = np.r_[self.last_txn, np.full(extra, _NAT, dtype=np.int64)]
+        self.churned = np.r_[self.churned, np.zeros(extra, dtype=bool)]
+        for dim in self.dim_codes:
+            self.dim_codes[dim] = np.r_[self.dim_codes[dim], np.full(extra, -1, dtype=np.int64)]
+
+    def _set_churned(self, rows, value):
+        if len(rows) == 0:
+            return
+        self.churned[rows] = value
+        delta = 1 if value else -1
+        for dim, counters in self.counters.items():
+            counters.add(self.dim_codes[dim][rows], counters.churned, delta)
+
+    def _touch(self, rows, last_ns):
+        # Raises last_txn for rows, moves the reference date forward, revives
+        # merchants that are active again and expires the ones that aged out
+        rows = np.asarray(rows, dtype=np.int64)
+        last_ns = np.asarray(last_ns, dtype=np.int64)
+        if len(rows):
+            unique = np.unique(rows)
+            before = self.last_txn[unique].copy()
+            np.maximum.at(self.last_txn, rows, last_ns)
+            if last_ns.max() != _NAT:
+                self.current_ns = max(self.current_ns, int(last_ns.max()))
+
+            valid = self.last_txn[unique] != _NAT
+            rows = unique[valid]
+            moved = self.last_txn[rows] != before[valid]
+            fresh = self.current_ns - self.last_txn[rows] < self.threshold_ns
+            revived = rows[fresh & self.churned[rows]]
+            self._set_churned(revived, False)
+            # A row needs a (new) heap entry only when its last_txn moved or it
+            # was just revived; otherwise its current entry is still valid.
+            # Stale ones expire right away.
+            push = moved & ~self.churned[rows]
+            push[np.isin(rows, revived)] = True
+            for row in rows[push].tolist():
+                heapq.heappush(self._heap, (int(self.last_txn[row]), row))
+
+        self._expire()
+
+    def _expire(self):
+        if self.current_ns == _NAT:
+            return
+        cutoff = self.current_ns - self.threshold_ns
+        expired = []
+        while self._heap and self._heap[0][0] <= cutoff:
+            last, row = heapq.heappop(self._heap)
+            # Entries go stale when a merchant transacts again or is already churned
+            if self.churned[row] or self.last_txn[row] != last:
+                continue
+            # Marked here so a duplicate entry for the same row is skipped
+            self.churned[row] = True
+            expired.append(row)
+        self._set_churned(np.array(expired, dtype=np.int64), True)
+
+        if len(self._heap) > 2 * max(self.size, 1):
+            self._rebuild_heap()
+
+    def apply_merchants(self, merchants):
+        # Adds new merchants; rows for known merchants only move last_transaction_date forward
+        ids = merchants['merchant_id'].to_numpy(dtype=object)
+        last_ns = _to_ns(merchants['last_transaction_date'])
+
+        rows = self._lookup(ids)
+        new_positions = np.flatnonzero(rows < 0)
+        # A merchant listed twice in one batch gets a single row
+        new_positions = new_positions[~pd.Index(ids[new_positions]).duplicated()]
+        if len(new_positions):
+            start = self.size
+            self._grow(start + len(new_positions))
+            new_rows = np.arange(start, start + len(new_positions))
+            self.ids.extend(ids[new_positions].tolist())
+            self.size += len(new_positions)
+            rows = self._lookup(ids)
+
+            for dim, counters in self.counters.items():
+                column = merchants[dim]
+                if counters.dtype is None:
+                    counters.dtype = column.dtype
+                codes = counters.encode(column.iloc[new_positions].tolist())
+                self.dim_codes[dim][new_rows] = codes
+                counters.add(codes, counters.merchants)
+
+        self._touch(rows, last_ns)
+        return self
+
+    def apply_transactions(self, transactions):
+        # Only merchants already known can move; unknown ids are ignored like in a left join
+        self._advance_watermark('transactions', transactions)
+        latest = pd.Series(_to_ns(transactions['transaction_date'])).groupby(
+            transactions['merchant_id'].to_numpy()
+        ).max()
+        rows = self._lookup(latest.index)
+        keep = rows >= 0
+        self._touch(rows[keep], latest.to_numpy()[keep])
+        return self
+
+    def apply_interactions(self, interactions):
+        self._advance_watermark('interactions', interactions)
+        if interactions.empty:
+            return self
+
+        resolution = interactions['resolution_time_days'].astype('float64')
+        grouped = pd.DataFrame({
+            'count': interactions['interaction_id'].notna().to_numpy(),
+            'sum': resolution.fillna(0.0).to_numpy(),
+            'n': resolution.notna().to_numpy()
+        }).groupby(interactions['merchant_id'].to_numpy()).sum()
+
+        rows = np.empty(len(grouped), dtype=np.int64)
+        for i, merchant_id in enumerate(grouped.index.tolist()):
+            row = self.interaction_rows.get(merchant_id)
+            if row is None:
+                row = self.interaction_rows[merchant_id] = len(self.interaction_ids)
+                self.interaction_ids.append(merchant_id)
+            rows[i] = row
+
+        if len(self.interaction_ids) > len(self.interaction_count):
+            extra = max(len(self.interaction_ids), 2 * len(self.interaction_count), 1024) - len(self.interaction_count)
+            self.interaction_count = np.r_[self.interaction_count, np.zeros(extra, dtype=np.int64)]
+            self.resolution_sum = np.r_[self.resolution_sum, np.zeros(extra, dtype=np.float64)]
+            self.resolution_n = np.r_[self.resolution_n, np.zeros(extra, dtype=np.int64)]
+
+        self.interaction_count[rows] += grouped['count'].to_numpy(dtype=np.int64)
+        self.resolution_sum[rows] += grouped['sum'].to_numpy()
+        self.resolution_n[rows] += grouped['n'].to_numpy(dtype=np.int64)
+        return self
+
+    # ----- results -----
+
+    @property
+    def current_date(self):
+        return pd.NaT if self.current_ns == _NAT else pd.Timestamp(self.current_ns)
+
+    def churned_merchants(self):
+        return pd.Series(self.churned[:self.size], index=pd.Index(self.ids, dtype=object, name='merchant_id'),
+                         name='is_churned')
+
+    def merchant_interactions(self):
+        n = len(self.interaction_ids)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg = self.resolution_sum[:n] / self.resolution_n[:n]
+        table = pd.DataFrame({
+            'merchant_id': self.interaction_ids,
+            'num_interactions': self.interaction_count[:n],
+            'avg_resolution_time': np.where(self.resolution_n[:n] > 0, avg, np.nan)
+        })
+        return table.sort_values('merchant_id', ignore_index=True)
+
+    def result(self, verbose=True):
+        churn_rate = self.churned[:self.size].mean() if self.size else float('nan')
+        if verbose:
+            print(f"Overall churn rate: {churn_rate:.2%}")
+
+        results = {'overall_churn_rate': churn_rate}
+        for key, dim in DIMENSIONS.items():
+            results[key] = self.counters[dim].table(dim)
+        results['merchant_interactions'] = self.merchant_interactions()
+        return results
+
+
+def incremental_churn_analysis(checkpoint_path, merchants=None, transactions=None, interactions=None,
+                               churn_days=CHURN_DAYS):
+    # Loads the checkpoint (or bootstraps it from merchants), applies whatever
+    # is new in the given frames, saves the checkpoint and returns the tables
+    if os.path.exists(checkpoint_path):
+        state = IncrementalChurn.load(checkpoint_path)
+        if merchants is not None:
+            state.apply_merchants(merchants)
+    elif merchants is not None:
+        state = IncrementalChurn(churn_days).apply_merchants(merchants)
+    else:
+        raise FileNotFoundError(f"No churn checkpoint at {checkpoint_path} and no merchants to bootstrap from")
+
+    if transactions is not None:
+        state.apply_transactions(state.new_rows(transactions, 'transactions'))
+    if interactions is not None:
+        state.apply_interactions(state.new_rows(interactions, 'interactions'))
+
+    state.save(checkpoint_path)
+    return state.result()
+
+# ======= End of BharatPe Incremental Churn Computation =======
@@ -0,0 +1,207 @@
+# ======= BharatPe Data Loading =======
+#
+# CSVs are parsed once with an explicit schema (see schema.py) and written to
+# a binary columnar cache (Feather by default) next to the data. Later loads
+# read the cache as long as the source file's size and mtime (and optionally
+# its SHA-256) still match.
+
+import hashlib
+import json
+import os
+
+from .config import dataset_path, get_data_root
+from .schema import SCHEMA_VERSION, SCHEMAS, read_csv_kwargs
+
+CACHE_DIR_ENV = 'BHARATPE_CACHE_DIR'
+CACHE_DIR_NAME = '.bharatpe_cache'
+CACHE_FORMAT_ENV = 'BHARATPE_CACHE_FORMAT'
+CACHE_FORMATS = ('feather', 'parquet', 'pickle')
+
+_cache = {}
+
+
+def cache_dir(data_root=None):
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(data_root or get_data_root(), CACHE_DIR_NAME)
+
+
+def cache_format():
+    # Feather (uncompressed Arrow IPC) reads fastest; parquet is smaller on disk
+    fmt = os.environ.get(CACHE_FORMAT_ENV, 'feather')
+    if fmt not in CACHE_FORMATS:
+        raise ValueError(f"Unknown cache format {fmt!r}, expected one of {CACHE_FORMATS}")
+    if fmt == 'pickle':
+        return fmt
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'pickle'
+    return fmt
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path, with_hash=False):
+    stat = os.stat(path)
+    fingerprint = {
+        'schema_version': SCHEMA_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+    if with_hash:
+        fingerprint['sha256'] = file_sha256(path)
+    return fingerprint
+
+
+def _cache_paths(name, data_root=None):
+    fmt = cache_format()
+    base = os.path.join(cache_dir(data_root), name)
+    return f"{base}.{fmt}", f"{base}.meta.json", fmt
+
+
+def _cache_is_valid(meta_path, data_path, fingerprint, verify_hash):
+    if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+        return False
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    for key in ('schema_version', 'size', 'mtime_ns'):
+        if meta.get(key) != fingerprint[key]:
+            return False
+    if verify_hash and meta.get('sha256') != fingerprint.get('sha256'):
+        return False
+    return True
+
+
+def _read_cache(data_path, fmt):
+    import pandas as pd
+
+    if fmt == 'feather':
+        return pd.read_feather(data_path)
+    if fmt == 'parquet':
+        return pd.read_parquet(data_path)
+    return pd.read_pickle(data_path)
+
+
+def _write_cache(df, data_path, meta_path, fmt, fingerprint):
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    tmp_path = f"{data_path}.tmp"
+    if fmt == 'feather':
+        df.reset_index(drop=True).to_feather(tmp_path)
+    elif fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, data_path)
+
+    with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(fingerprint, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def parse_csv(name, path, **kwargs):
+    import pandas as pd
+
+    columns = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, **read_csv_kwargs(name, columns), **kwargs)
+
+
+def iter_dataset(name, chunksize=500_000, data_root=None, path=None):
+    # Streams a table in bounded chunks straight from its CSV, bypassing the cache
+    import pandas as pd
+
+    path = path or dataset_path(name, data_root)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} dataset not found at {path}")
+
+    columns = pd.read_csv(path, nrows=0).columns
+    with pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs(name, columns)) as reader:
+        yield from reader
+
+
+def read_dataset(name, data_root=None, use_cache=True, verify_hash=False):
+    path = dataset_path(name, data_root)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} dataset not found at {path}")
+
+    if not use_cache:
+        return parse_csv(name, path)
+
+    fingerprint = source_fingerprint(path, with_hash=verify_hash)
+    data_path, meta_path, fmt = _cache_paths(name, data_root)
+    if _cache_is_valid(meta_path, data_path, fingerprint, verify_hash):
+        try:
+            return _read_cache(data_path, fmt)
+        except Exception as e:
+            print(f"Ignoring unreadable cache for {name}: {str(e)}")
+
+    df = parse_csv(name, path)
+    if 'sha256' not in fingerprint:
+        fingerprint['sha256'] = file_sha256(path)
+    try:
+        _write_cache(df, data_path, meta_path, fmt, fingerprint)
+    except OSError as e:
+        print(f"Could not write cache for {name}: {str(e)}")
+    return df
+
+
+def get_dataset(name, data_root=None, use_cache=True):
+    key = (name, data_root or get_data_root())
+    if key not in _cache:
+        _cache[key] = read_dataset(name, data_root, use_cache=use_cache)
+    return _cache[key]
+
+
+def load_datasets(names=('merchants', 'transactions', 'interactions', 'loans'), data_root=None, use_cache=True):
+    datasets = {}
+    for name in names:
+        try:
+            datasets[name] = get_dataset(name, data_root, use_cache=use_cache)
+        except FileNotFoundError as e:
+            print(f"Skipping {name}: {str(e)}")
+    return datasets
+
+
+def invalidate_cache(name=None, data_root=None):
+    names = [name] if name else list(SCHEMAS)
+    for table in names:
+        data_path, meta_path, _ = _cache_paths(table, data_root)
+        for path in (data_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+    clear_cache()
+
+
+def empty_transactions():
+    import pandas as pd
+
+    return pd.DataFrame({
+        'transaction_id': pd.Series(dtype=object),
+        'merchant_id': pd.Series(dtype=object),
+        'transaction_date': pd.Series(dtype='datetime64[ns]'),
+        'amount': pd.Series(dtype=float),
+        'payment_method': pd.Series(dtype=object)
+    })
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def print_summary(datasets):
+    for name, df in datasets.items():
+        print(f"Total {name}: {df.shape[0]}")
+
+    if 'merchants' in datasets:
+        print("\nMissing values in merchants dataset:")
+        print(datasets['merchants'].isnull().sum())
+
+# ======= End of BharatPe Data Loading =======
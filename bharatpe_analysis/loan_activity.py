@@ -0,0 +1,158 @@
+# ======= BharatPe Merchant Activity Around Loans =======
+#
+# Instead of joining every transaction to its merchant's loan dates, the
+# transactions of merchants that have loans are sorted once by
+# (merchant, transaction time) into a single int64 key, alongside a prefix
+# sum of amounts. The activity between any two instants for a merchant is
+# then two binary searches and a subtraction, so every loan window
+# (before approval, during the term, after end_date) for every loan costs
+# O(log T) and no joined copy of the transactions is ever built.
+#
+# Times are kept at one-second resolution. Transactions with an unparseable
+# date sort before everything else: they count as "before" the first loan,
+# as they did in the join-based version, but fall outside every dated window.
+#
+#     index = TransactionIndex.build(transactions, loans['merchant_id'])
+#     windows = loan_activity_windows(index, loans, pre_days=60, post_days=60)
+
+import numpy as np
+import pandas as pd
+
+from .streaming import DEFAULT_CHUNKSIZE, _plain, iter_chunks
+
+LOAN_WINDOWS = {'pre_days': 90, 'post_days': 90}
+WINDOW_NAMES = ['pre', 'during', 'post']
+_NAT_SECONDS = np.iinfo(np.int64).min
+
+
+def _seconds(values):
+    stamps = pd.to_datetime(values, errors='coerce')
+    seconds = np.asarray(stamps, dtype='datetime64[s]').astype(np.int64)
+    seconds[pd.isna(stamps)] = _NAT_SECONDS
+    return seconds
+
+
+class TransactionIndex:
+
+    def __init__(self, merchants, codes, seconds, amounts):
+        self.merchants = merchants
+        valid = seconds != _NAT_SECONDS
+        self.base = int(seconds[valid].min()) if valid.any() else 0
+        # Offset 0 holds undated rows, 1.. real times, and stride - 1 is "after everything"
+        self.last = int(seconds[valid].max()) if valid.any() else self.base
+        span = self.last - self.base + 1 if valid.any() else 0
+        self.stride = span + 2
+        if (len(merchants) + 1) * self.stride >= np.iinfo(np.int64).max:
+            raise OverflowError("Transaction time range too wide to index at one-second resolution")
+
+        offsets = np.where(valid, seconds - self.base + 1, 0)
+        keys = codes.astype(np.int64) * self.stride + offsets
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        # Missing amounts count as 0, as in a pandas sum; a NaN in the prefix
+        # sum would spread to every later window
+        amounts = amounts[order]
+        amounts = np.where(np.isnan(amounts), 0.0, amounts)
+        self.cum_amount = np.concatenate([[0.0], np.cumsum(amounts, dtype=np.float64)])
+
+    @classmethod
+    def build(cls, transactions, merchant_ids, chunksize=DEFAULT_CHUNKSIZE):
+        # Only transactions of the given merchants are kept; transactions can be
+        # a DataFrame, a CSV path or any iterable of chunks
+        merchants = pd.Index(pd.unique(_plain(pd.Series(merchant_ids)).dropna()))
+        codes, seconds, amounts = [], [], []
+        for chunk in iter_chunks(transactions, chunksize):
+            chunk_codes = merchants.get_indexer(_plain(chunk['merchant_id']))
+            keep = chunk_codes >= 0
+            codes.append(chunk_codes[keep].astype(np.int32))
+            seconds.append(_seconds(chunk['transaction_date'].to_numpy()[keep]))
+            amounts.append(chunk['amount'].to_numpy(dtype=np.float64)[keep])
+        if not codes:
+            codes, seconds, amounts = [np.empty(0, np.int32)], [np.empty(0, np.int64)], [np.empty(0)]
+        return cls(merchants, np.concatenate(codes), np.concatenate(seconds), np.concatenate(amounts))
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def end_time(self):
+        # Just after the latest indexed transaction
+        return pd.Timestamp(self.last + 1, unit='s')
+
+    def _positions(self, codes, seconds, lowest):
+        # Number of indexed rows strictly before each (merchant, time);
+        # seconds of None mean the start (lowest=0) or end of the merchant's rows
+        if seconds is None:
+            offsets = np.full(len(codes), lowest if lowest == 0 else self.stride - 1, dtype=np.int64)
+        else:
+            offsets = np.clip(seconds - self.base + 1, lowest, self.stride - 1)
+            offsets[seconds == _NAT_SECONDS] = self.stride - 1
+        return np.searchsorted(self.keys, codes.astype(np.int64) * self.stride + offsets, side='left')
+
+    def activity(self, merchant_ids, start=None, end=None, include_undated=False):
+        # Transaction count and amount per row for start <= transaction_date < end
+        codes = self.merchants.get_indexer(_plain(pd.Series(merchant_ids)))
+        found = codes >= 0
+        codes = np.where(found, codes, 0)
+        lo = self._positions(codes, None if start is None else _seconds(start), 0 if include_undated else 1)
+        hi = self._positions(codes, None if end is None else _seconds(end), 1)
+        if start is not None and end is not None:
+            hi = np.maximum(hi, lo)
+        counts = np.where(found, hi - lo, 0)
+        amounts = np.where(found, self.cum_amount[hi] - self.cum_amount[lo], 0.0)
+        return counts, amounts
+
+
+def activity_around_first_loan(index, merchant_first_loan):
+    # Same long frame as grouping the joined transactions by (merchant_id, is_after_loan)
+    merchant_ids = merchant_first_loan['merchant_id']
+    first_loan = merchant_first_loan['first_loan_date'].to_numpy()
+    before_count, before_amount = index.activity(merchant_ids, end=first_loan, include_undated=True)
+    after_count, after_amount = index.activity(merchant_ids, start=first_loan)
+
+    activity = pd.DataFrame({
+        'merchant_id': pd.concat([merchant_ids, merchant_ids], ignore_index=True).array,
+        'is_after_loan': np.repeat([False, True], len(merchant_ids)),
+        'transaction_id': np.concatenate([before_count, after_count]),
+        'amount': np.concatenate([before_amount, after_amount])
+    })
+    activity = activity[activity['transaction_id'] > 0]
+    return activity.sort_values(['merchant_id', 'is_after_loan'], kind='stable').reset_index(drop=True)
+
+
+def loan_activity_windows(index, loans, pre_days=LOAN_WINDOWS['pre_days'], post_days=LOAN_WINDOWS['post_days']):
+    # One row per loan: activity in the pre_days before approval, during the
+    # term (approval through end_date inclusive) and the post_days after it.
+    # Loans without an end_date are still running: their term lasts until the
+    # latest transaction and they have no post window.
+    approval = pd.to_datetime(loans['approval_date'], errors='coerce')
+    term_end = pd.to_datetime(loans['end_date'], errors='coerce') + pd.Timedelta(days=1)
+    bounds = {
+        'pre': (approval - pd.Timedelta(days=pre_days), approval),
+        'during': (approval, term_end.fillna(index.end_time)),
+        'post': (term_end, term_end + pd.Timedelta(days=post_days))
+    }
+
+    windows = pd.DataFrame({
+        'loan_id': loans['loan_id'].array,
+        'merchant_id': loans['merchant_id'].array,
+        'loan_type': loans['loan_type'].array,
+        'status': loans['status'].array
+    })
+    for name in WINDOW_NAMES:
+        start, end = bounds[name]
+        counts, amounts = index.activity(loans['merchant_id'], start.to_numpy(), end.to_numpy())
+        days = ((end - start) / pd.Timedelta(days=1)).to_numpy()
+        windows[f'{name}_days'] = days
+        windows[f'{name}_txn_count'] = counts
+        windows[f'{name}_amount'] = amounts
+
+    # Windows differ in length, so compare daily rates
+    for name in ['during', 'post']:
+        pre_rate = windows['pre_txn_count'] / windows['pre_days']
+        windows[f'{name}_vs_pre_txn_change'] = (windows[f'{name}_txn_count'] / windows[f'{name}_days']) / pre_rate.replace(0, np.nan) - 1
+        pre_amount = windows['pre_amount'] / windows['pre_days']
+        windows[f'{name}_vs_pre_amount_change'] = (windows[f'{name}_amount'] / windows[f'{name}_days']) / pre_amount.replace(0, np.nan) - 1
+    return windows
+
+# ======= End of BharatPe Merchant Activity Around Loans =======
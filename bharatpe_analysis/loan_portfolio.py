@@ -0,0 +1,357 @@
+# ======= BharatPe Loan Portfolio Engine =======
+#
+# Month-by-month projection of the active loan book: expected outstanding
+# balance, expected collections and interest, exposure at default (EAD) and
+# expected loss, per loan_type, business_category and tier (plus 'all'),
+# under stress scenarios on interest rate and default probability.
+#
+# Schedules are reducing-balance EMIs, computed for every loan at once as
+# loans x months NumPy arrays from the closed-form balance
+#     B(t) = P * ((1 + r)^n - (1 + r)^t) / ((1 + r)^n - 1)
+# Each active loan starts from its contractual balance at the as-of month
+# and is re-amortized over its remaining term at the scenario's rate; a
+# monthly default hazard (estimated per loan_type x tier from the book's own
+# defaults per loan-month of exposure) gives its survival curve. Each measure
+# is summed per loan_type x business_category x tier cell with one bincount,
+# and the dimension curves are rolled up from those cells; no per-loan loop.
+#
+#     book = LoanBook.from_frames(loans, merchants)
+#     curves = book.run()                 # every scenario in SCENARIOS, in parallel
+#     portfolio_summary(curves)
+#     book.project(SCENARIOS['severe'])   # one scenario in process
+#
+# Scenarios run in worker processes that map the book from shared memory
+# (see shared_frames.py) rather than unpickling it once per scenario.
+#
+# or python -m bharatpe_analysis.loan_portfolio [--data-root DIR] [--as-of 2025-05-01] [--dimension tier]
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .aggregation import status_flag
+
+PORTFOLIO_DIMENSIONS = ['loan_type', 'business_category', 'tier']
+PORTFOLIO_MEASURES = ['expected_balance', 'expected_collections', 'expected_interest', 'ead', 'expected_loss']
+HAZARD_BY = ['loan_type', 'tier']
+# Loan-months of the book-wide hazard mixed into each group's estimate
+HAZARD_PRIOR_MONTHS = 600
+DEFAULT_LGD = 0.65
+CHUNK_LOANS = 50_000
+
+# rate_shift: annual percentage points added to every loan's rate;
+# pd_multiplier scales the monthly default hazard; lgd: loss given default
+SCENARIOS = {
+    'base': {'rate_shift': 0.0, 'pd_multiplier': 1.0, 'lgd': DEFAULT_LGD},
+    'rates_+200bp': {'rate_shift': 2.0, 'pd_multiplier': 1.0, 'lgd': DEFAULT_LGD},
+    'rates_+400bp': {'rate_shift': 4.0, 'pd_multiplier': 1.0, 'lgd': DEFAULT_LGD},
+    'pd_x1.5': {'rate_shift': 0.0, 'pd_multiplier': 1.5, 'lgd': DEFAULT_LGD},
+    'pd_x2': {'rate_shift': 0.0, 'pd_multiplier': 2.0, 'lgd': DEFAULT_LGD},
+    'severe': {'rate_shift': 4.0, 'pd_multiplier': 2.5, 'lgd': 0.8}
+}
+
+
+def months_between(start, end):
+    # Calendar months from start to end (datetime-like arrays)
+    start = np.asarray(start, dtype='datetime64[M]').astype(np.int64)
+    end = np.asarray(end, dtype='datetime64[M]').astype(np.int64)
+    return end - start
+
+
+def amortization_schedule(principal, monthly_rate, term, horizon=None):
+    # Every loan's EMI schedule at once: loans x horizon arrays of closing
+    # balance, payment, interest and principal repaid for months 1..horizon
+    principal = np.asarray(principal, dtype=np.float64)[:, None]
+    rate = np.asarray(monthly_rate, dtype=np.float64)[:, None]
+    term = np.asarray(term, dtype=np.int64)[:, None]
+    horizon = int(horizon or term.max(initial=0))
+    t = np.arange(1, horizon + 1)
+    live = t <= term
+
+    # (1 + r)^t as a running product: far cheaper than a power per cell
+    growth_t = np.cumprod(np.repeat(1 + rate, horizon, axis=1), axis=1)
+    growth_n = (1 + rate) ** term
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = principal / (growth_n - 1)
+        balance = scale * (growth_n - growth_t)
+        payment = scale * rate * growth_n
+    interest_free = rate[:, 0] <= 0
+    if interest_free.any():
+        balance[interest_free] = principal[interest_free] * (1 - t / term[interest_free])
+        payment[interest_free] = principal[interest_free] / term[interest_free]
+    balance = np.maximum(balance, 0.0, out=balance)
+    balance *= live
+    payment = np.broadcast_to(payment, balance.shape) * live
+    interest = np.concatenate([principal, balance[:, :-1]], axis=1)
+    interest *= rate
+    interest *= live
+    return {'balance': balance, 'payment': payment, 'interest': interest, 'principal': payment - interest}
+
+
+def contract_balance(principal, monthly_rate, term, elapsed):
+    # Closing balance after `elapsed` installments of the original schedule
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(monthly_rate, dtype=np.float64)
+    term = np.asarray(term, dtype=np.int64)
+    elapsed = np.clip(elapsed, 0, term)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth_n = (1 + rate) ** term
+        balance = np.where(rate > 0, principal * (growth_n - (1 + rate) ** elapsed) / (growth_n - 1),
+                           principal * (1 - elapsed / term))
+    return np.maximum(balance, 0.0)
+
+
+def default_hazard(loans, as_of, by=HAZARD_BY, prior_months=HAZARD_PRIOR_MONTHS):
+    # Monthly default hazard per loan: defaults / loan-months of exposure in
+    # its group, shrunk towards the book-wide rate for thin groups. Exposure
+    # runs from approval to end_date (or as_of) and is capped at the term.
+    term = loans['loan_term_months'].to_numpy(dtype=np.int64)
+    end = loans['end_date'].fillna(pd.Timestamp(as_of)).clip(upper=pd.Timestamp(as_of))
+    exposure = np.clip(months_between(loans['approval_date'], end), 1, term)
+    paid = status_flag(loans['status'], 'Paid', case_sensitive=False)
+    exposure = np.where(paid, term, exposure)
+    defaulted = status_flag(loans['status'], 'Default', case_sensitive=False)
+
+    overall = defaulted.sum() / max(exposure.sum(), 1)
+    keys = [loans[column] for column in by]
+    groups = pd.DataFrame({'defaults': defaulted, 'exposure': exposure}).groupby(keys, observed=True, dropna=False).sum()
+    groups['hazard'] = (groups['defaults'] + prior_months * overall) / (groups['exposure'] + prior_months)
+    index = pd.MultiIndex.from_arrays(keys) if len(by) > 1 else pd.Index(keys[0])
+    return groups['hazard'].reindex(index).fillna(overall).to_numpy()
+
+
+def _codes(values):
+    # Group codes with missing labels as their own 'Unknown' group
+    codes, uniques = pd.factorize(values, sort=True)
+    labels = [str(value) for value in uniques]
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append('Unknown')
+    return codes.astype(np.int32), labels
+
+
+class LoanBook:
+
+    def __init__(self, frame, labels, as_of):
+        # frame: one row per active loan with balance, monthly_rate,
+        # remaining_term, hazard and a <dimension>_code per dimension
+        self.frame = frame
+        self.labels = labels
+        self.as_of = pd.Timestamp(as_of)
+        self.horizon = int(frame['remaining_term'].max()) if len(frame) else 0
+
+    @classmethod
+    def from_frames(cls, loans, merchants=None, as_of=None, hazard_by=HAZARD_BY):
+        # Dates may still be strings (a plain pd.read_csv); unparseable ones
+        # become NaT and those loans drop out of the active book
+        loans = loans.reset_index(drop=True)
+        for column in ['approval_date', 'end_date']:
+            if column in loans.columns:
+                loans[column] = pd.to_datetime(loans[column], errors='coerce')
+        # Defaults to the latest approval: the book's snapshot date
+        as_of = pd.Timestamp(pd.to_datetime(as_of if as_of is not None else loans['approval_date'].max()))
+        if merchants is not None:
+            attributes = merchants.drop_duplicates('merchant_id').set_index('merchant_id')
+            for column in ['business_category', 'tier']:
+                if column in attributes.columns and column not in loans.columns:
+                    loans[column] = loans['merchant_id'].map(attributes[column])
+        hazard = default_hazard(loans, as_of, [column for column in hazard_by if column in loans.columns])
+
+        active = status_flag(loans['status'], 'Active', case_sensitive=False) & (loans['approval_date'] <= as_of).to_numpy()
+        book = loans[active]
+        principal = book['loan_amount'].to_numpy(dtype=np.float64)
+        rate = book['interest_rate'].to_numpy(dtype=np.float64) / 1200
+        term = book['loan_term_months'].to_numpy(dtype=np.int64)
+        # Installments due so far; a loan still active past maturity keeps its
+        # last installment outstanding and is projected to pay it next month
+        elapsed = np.minimum(np.maximum(months_between(book['approval_date'], as_of), 0), term - 1)
+
+        frame = pd.DataFrame({
+            'balance': contract_balance(principal, rate, term, elapsed),
+            'monthly_rate': rate,
+            'remaining_term': (term - elapsed).astype(np.int16),
+            'hazard': hazard[active]
+        })
+        labels = {}
+        for dimension in PORTFOLIO_DIMENSIONS:
+            if dimension in book.columns:
+                frame[f'{dimension}_code'], labels[dimension] = _codes(book[dimension])
+        # Ordered by remaining term so each chunk only spans the months its loans still run
+        return cls(frame.sort_values('remaining_term', kind='stable').reset_index(drop=True), labels, as_of)
+
+    def schedule(self, rate_shift=0.0):
+        # Remaining schedules of the active book at a shifted rate
+        rate = self.frame['monthly_rate'].to_numpy() + rate_shift / 1200
+        return amortization_schedule(self.frame['balance'].to_numpy(), rate,
+                                     self.frame['remaining_term'].to_numpy(), self.horizon)
+
+    def _cells(self, frame):
+        # One code per combination of dimension values
+        shape = [len(labels) for labels in self.labels.values()]
+        codes = [frame[f'{dimension}_code'].to_numpy() for dimension in self.labels]
+        return np.ravel_multi_index(codes, shape) if codes else np.zeros(len(frame), dtype=np.int64), shape
+
+    def _project_chunk(self, rows, scenario):
+        # Sums of each measure per (dimension cell, month) over the chunk's
+        # longest remaining term: measures x cells x months
+        frame = self.frame.iloc[rows]
+        term = frame['remaining_term'].to_numpy()
+        horizon = int(term.max())
+        balance = frame['balance'].to_numpy()
+        rate = frame['monthly_rate'].to_numpy() + scenario.get('rate_shift', 0.0) / 1200
+        schedule = amortization_schedule(balance, rate, term, horizon)
+        hazard = np.minimum(frame['hazard'].to_numpy() * scenario.get('pd_multiplier', 1.0), 1.0)[:, None]
+
+        # survived[:, t]: probability of still performing after month t
+        survived = np.ones((len(frame), horizon + 1))
+        survived[:, 1:] = np.cumprod(np.repeat(1 - hazard, horizon, axis=1), axis=1)
+        opening = np.concatenate([balance[:, None], schedule['balance'][:, :-1]], axis=1)
+        ead = opening * survived[:, :-1] * hazard * (schedule['payment'] > 0)
+        measures = [
+            schedule['balance'] * survived[:, 1:],
+            schedule['payment'] * survived[:, 1:],
+            schedule['interest'] * survived[:, 1:],
+            ead,
+            ead * scenario.get('lgd', DEFAULT_LGD)
+        ]
+
+        cells, shape = self._cells(frame)
+        size = int(np.prod(shape))
+        index = (cells[:, None] * horizon + np.arange(horizon)).ravel()
+        return np.stack([
+            np.bincount(index, weights=values.ravel(), minlength=size * horizon).reshape(size, horizon)
+            for values in measures
+        ])
+
+    def project(self, scenario=None, name='base'):
+        # Long frame: dimension / value / month / step plus PORTFOLIO_MEASURES
+        scenario = scenario or SCENARIOS['base']
+        shape = [len(labels) for labels in self.labels.values()]
+        cell_sums = np.zeros((len(PORTFOLIO_MEASURES), int(np.prod(shape)), self.horizon))
+        for start in range(0, len(self.frame), CHUNK_LOANS):
+            sums = self._project_chunk(slice(start, start + CHUNK_LOANS), scenario)
+            cell_sums[:, :, :sums.shape[2]] += sums
+
+        # Roll the cells up to 'all' and to each dimension on its own
+        cube = cell_sums.reshape([len(PORTFOLIO_MEASURES)] + shape + [self.horizon])
+        totals = {'all': cube.sum(axis=tuple(range(1, len(shape) + 1)))[:, None, :]}
+        for axis, dimension in enumerate(self.labels, start=1):
+            others = tuple(other for other in range(1, len(shape) + 1) if other != axis)
+            totals[dimension] = cube.sum(axis=others)
+
+        frames = []
+        months = pd.period_range(self.as_of.to_period('M') + 1, periods=self.horizon, freq='M').to_timestamp()
+        for dimension, sums in totals.items():
+            values = ['all'] if dimension == 'all' else self.labels[dimension]
+            frame = pd.DataFrame({
+                'scenario': name,
+                'dimension': dimension,
+                'value': np.repeat(values, self.horizon),
+                'month': np.tile(months, len(values)),
+                'step': np.tile(np.arange(1, self.horizon + 1), len(values))
+            })
+            for measure, values in zip(PORTFOLIO_MEASURES, sums):
+                frame[measure] = values.ravel()
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def run(self, scenarios=None, workers=None):
+        # Projects every scenario; one worker process per scenario
+        scenarios = scenarios or SCENARIOS
+        workers = min(workers or os.cpu_count() or 1, len(scenarios))
+        if workers <= 1:
+            results = [self.project(scenario, name) for name, scenario in scenarios.items()]
+        else:
+            from .shared_frames import publish_frame
+
+            owner = publish_frame(self.frame)
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(
+                        _project_in_worker, list(scenarios), list(scenarios.values()),
+                        [owner.spec] * len(scenarios), [self.labels] * len(scenarios), [self.as_of] * len(scenarios)
+                    ))
+            finally:
+                owner.close()
+        return pd.concat(results, ignore_index=True)
+
+    def summary(self):
+        return {
+            'as_of': str(self.as_of.date()),
+            'active_loans': len(self.frame),
+            'outstanding_balance': float(self.frame['balance'].sum()),
+            'horizon_months': self.horizon,
+            'mean_monthly_hazard': float(self.frame['hazard'].mean()) if len(self.frame) else float('nan')
+        }
+
+
+def _project_in_worker(name, scenario, spec, labels, as_of):
+    from .shared_frames import attach_frame, close_attached
+
+    attached = []
+    try:
+        book = LoanBook(attach_frame(spec, attached), labels, as_of)
+        result = book.project(scenario, name)
+        del book
+        return result
+    finally:
+        close_attached(attached)
+
+
+def portfolio_summary(curves, dimension='all'):
+    # Lifetime totals per scenario (and value), plus the peak EAD month
+    curves = curves[curves['dimension'] == dimension]
+    totals = curves.groupby(['scenario', 'value'], sort=False)[
+        ['expected_collections', 'expected_interest', 'ead', 'expected_loss']].sum()
+    first = curves[curves['step'] == 1].set_index(['scenario', 'value'])['expected_balance']
+    peak = curves.loc[curves.groupby(['scenario', 'value'], sort=False)['ead'].idxmax()].set_index(['scenario', 'value'])['month']
+    totals['balance_after_first_month'] = first
+    totals['peak_ead_month'] = peak
+    totals['loss_rate'] = totals['expected_loss'] / (totals['expected_collections'] + totals['ead'])
+    return totals.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Project the active loan book under stress scenarios')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--as-of', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dimension', default='loan_type', choices=PORTFOLIO_DIMENSIONS)
+    parser.add_argument('--save', default=None, help='write the full curves to this CSV')
+    args = parser.parse_args(argv)
+
+    from .loader import read_dataset
+
+    start = time.perf_counter()
+    book = LoanBook.from_frames(read_dataset('loans', args.data_root), read_dataset('merchants', args.data_root), args.as_of)
+    built = time.perf_counter() - start
+    print(f"Book as of {book.summary()['as_of']}: {len(book.frame):,} active loans, "
+          f"outstanding {book.frame['balance'].sum():,.0f}, horizon {book.horizon} months (built in {built:.2f}s)")
+
+    start = time.perf_counter()
+    curves = book.run(workers=args.workers)
+    print(f"Projected {len(SCENARIOS)} scenarios in {time.perf_counter() - start:.2f}s")
+
+    with pd.option_context('display.width', 160, 'display.float_format', '{:,.2f}'.format):
+        print("\n=== Scenario Totals ===")
+        print(portfolio_summary(curves).drop(columns='value').to_string(index=False))
+        print(f"\n=== Expected Loss by {args.dimension} ===")
+        by_value = portfolio_summary(curves, args.dimension)
+        print(by_value.pivot(index='value', columns='scenario', values='expected_loss')[list(SCENARIOS)].to_string())
+        print("\n=== Base Scenario Curves ===")
+        base = curves[(curves['scenario'] == 'base') & (curves['dimension'] == 'all')]
+        print(base[['month'] + PORTFOLIO_MEASURES].to_string(index=False))
+
+    if args.save:
+        curves.to_csv(args.save, index=False)
+        print(f"\nCurves written to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Loan Portfolio Engine =======
@@ -0,0 +1,564 @@
+# ======= BharatPe Merchant Profile Index =======
+#
+# Per-merchant profiles (churn flag, adoption flags, loan status, interaction
+# count, location) held as plain NumPy columns: categoricals as small integer
+# codes over interned labels, flags as bools, dates as int32 day numbers and
+# ids / names as fixed-width bytes. merchant_id is looked up through a sorted
+# id array; district, city, state, category and tier have hash indexes (rows
+# grouped by code) and pin_code / last_transaction_date have sorted indexes
+# for range queries. Point lookups and single-key finds take a few
+# microseconds, without touching pandas.
+#
+#     index = MerchantIndex.from_frames(merchants, interactions)
+#     index.get('BPM100042')
+#     index.find(district='Ajmer', churned=False, limit=20)
+#     index.find(pin_code=(400001, 400099))
+#     index.refresh()                 # re-reads the loader's tables if their files changed
+#     serve(index, port=8765)         # or serve(index, unix_socket='/tmp/merchants.sock')
+#
+# GET /merchant/<id>, GET /merchants?district=Ajmer&pin_code=400001-400099&limit=20
+# (date ranges as last_transaction_date=2025-05-01~2025-05-19, lists as
+# city=Pune,Nashik, churned=1) and GET /stats return JSON. Refreshes only rewrite rows whose contents
+# changed and rebuild the indexes of columns that actually moved; the churn
+# flag is derived at query time from the latest last_transaction_date, like
+# churn_analysis.
+#
+# or python -m bharatpe_analysis.merchant_index [--data-root DIR] [--port 8765 | --unix-socket PATH]
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+CHURN_DAYS = 30
+CATEGORY_COLUMNS = ['business_category', 'subcategory', 'state', 'district', 'city', 'tier',
+                    'acquisition_channel', 'active_status', 'current_loan_status']
+FLAG_COLUMNS = ['qr_displayed', 'soundbox_adopted', 'swipe_machine']
+NUMBER_COLUMNS = {'pin_code': np.int32, 'loans_taken': np.int16}
+DATE_COLUMNS = ['onboarding_date', 'last_transaction_date']
+BYTES_COLUMNS = ['merchant_id', 'business_name']
+HASH_INDEXED = ['business_category', 'state', 'district', 'city', 'tier']
+SORTED_INDEXED = ['pin_code', 'last_transaction_date']
+NO_DATE = np.iinfo(np.int32).min
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def _days(values):
+    days = pd.to_datetime(values, errors='coerce').to_numpy().astype('datetime64[D]')
+    return np.where(np.isnat(days), NO_DATE, days.astype(np.int64)).astype(np.int32)
+
+
+def _to_bytes(values):
+    return pd.Series(values).astype(object).fillna('').astype(str).str.encode('utf-8').to_numpy().astype('S')
+
+
+def _code_dtype(n):
+    return np.int8 if n < 127 else np.int16 if n < 32767 else np.int32
+
+
+class _Labels:
+    # Interned labels of one categorical column; code -1 is missing
+
+    def __init__(self):
+        self.labels = []
+        self.codes = {}
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(pd.Series(values).astype(object))
+        mapping = np.array([self.intern(label) for label in uniques], dtype=np.int64)
+        return np.where(codes >= 0, np.r_[mapping, -1][codes], -1)
+
+    def intern(self, label):
+        label = str(label)
+        if label not in self.codes:
+            self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return self.codes[label]
+
+    def code(self, label):
+        return self.codes.get(str(label), -2)
+
+
+class MerchantIndex:
+
+    def __init__(self):
+        self.columns = {}
+        self.labels = {column: _Labels() for column in CATEGORY_COLUMNS}
+        self.hash_indexes = {}
+        self.sorted_indexes = {}
+        self.id_order = np.zeros(0, dtype=np.int32)
+        self.sorted_ids = np.zeros(0, dtype='S1')
+        self.reference_day = NO_DATE
+        self.row_hashes = np.zeros(0, dtype=np.uint64)
+        self.interaction_counts = np.zeros(0, dtype=np.int32)
+        self.sources = {}
+        self.data_root = None
+        self.lock = threading.RLock()
+        self.stats = {'built_s': 0.0, 'refreshes': 0, 'rows_updated': 0, 'rows_added': 0}
+
+    @classmethod
+    def from_frames(cls, merchants, interactions=None):
+        index = cls()
+        start = time.perf_counter()
+        index.upsert(merchants)
+        if interactions is not None:
+            index.set_interactions(interactions)
+        index.stats['built_s'] = time.perf_counter() - start
+        return index
+
+    @classmethod
+    def from_loader(cls, data_root=None):
+        from .config import dataset_path
+        from .loader import read_dataset, source_fingerprint
+
+        index = cls()
+        index.data_root = data_root
+        start = time.perf_counter()
+        index.upsert(read_dataset('merchants', data_root))
+        index.sources['merchants'] = source_fingerprint(dataset_path('merchants', data_root))
+        interactions_path = dataset_path('interactions', data_root)
+        if os.path.exists(interactions_path):
+            index.set_interactions(read_dataset('interactions', data_root))
+            index.sources['interactions'] = source_fingerprint(interactions_path)
+        index.stats['built_s'] = time.perf_counter() - start
+        return index
+
+    def __len__(self):
+        return len(self.id_order)
+
+    def nbytes(self):
+        arrays = list(self.columns.values()) + [self.id_order, self.sorted_ids, self.row_hashes, self.interaction_counts]
+        arrays += [array for pair in self.hash_indexes.values() for array in pair]
+        arrays += [array for pair in self.sorted_indexes.values() for array in pair]
+        return sum(array.nbytes for array in arrays)
+
+    # ----- building and refreshing -----
+
+    def _encode(self, merchants):
+        columns = {}
+        for column in BYTES_COLUMNS:
+            columns[column] = _to_bytes(merchants[column])
+        for column in CATEGORY_COLUMNS:
+            if column in merchants:
+                columns[column] = self.labels[column].encode(merchants[column])
+        for column in FLAG_COLUMNS:
+            if column in merchants:
+                columns[column] = merchants[column].to_numpy(dtype=bool, na_value=False)
+        for column, dtype in NUMBER_COLUMNS.items():
+            if column in merchants:
+                columns[column] = merchants[column].to_numpy(dtype=np.float64, na_value=-1).astype(dtype)
+        for column in DATE_COLUMNS:
+            if column in merchants:
+                columns[column] = _days(merchants[column])
+        return columns
+
+    def _store(self, column, rows, values, size):
+        current = self.columns.get(column)
+        if column in CATEGORY_COLUMNS:
+            dtype = _code_dtype(len(self.labels[column].labels))
+        elif current is not None and values.dtype.kind == 'S':
+            dtype = max(current.dtype, values.dtype, key=lambda d: d.itemsize)
+        else:
+            dtype = values.dtype
+        if current is None:
+            current = np.zeros(0, dtype=dtype)
+        if current.dtype != dtype or len(current) < size:
+            grown = np.zeros(size, dtype=dtype)
+            if column in CATEGORY_COLUMNS:
+                grown[:] = -1
+            elif column in DATE_COLUMNS:
+                grown[:] = NO_DATE
+            grown[:len(current)] = current
+            current = grown
+        current[rows] = values
+        self.columns[column] = current
+
+    def _rows_of(self, ids):
+        # Row of each id, -1 for ids not in the index
+        positions = np.searchsorted(self.sorted_ids, ids)
+        positions = np.minimum(positions, max(len(self.sorted_ids) - 1, 0))
+        found = (self.sorted_ids[positions] == ids) if len(self.sorted_ids) else np.zeros(len(ids), dtype=bool)
+        return np.where(found, self.id_order[positions] if len(self.id_order) else -1, -1)
+
+    def upsert(self, merchants):
+        # Adds new merchants and rewrites the rows of known ones whose
+        # contents changed; returns (updated, added)
+        with self.lock:
+            merchants = merchants.drop_duplicates('merchant_id', keep='last')
+            hashes = pd.util.hash_pandas_object(merchants, index=False).to_numpy()
+            ids = _to_bytes(merchants['merchant_id'])
+            rows = self._rows_of(ids)
+
+            known = rows >= 0
+            changed = known.copy()
+            changed[known] = self.row_hashes[rows[known]] != hashes[known]
+            added = ~known
+            selected = changed | added
+            if not selected.any():
+                return 0, 0
+
+            size = len(self) + int(added.sum())
+            rows = rows.copy()
+            rows[added] = np.arange(len(self), size)
+            subset = merchants[selected]
+            target = rows[selected]
+            encoded = self._encode(subset)
+            updated = rows[changed]
+            before = {column: self.columns[column][updated] for column in HASH_INDEXED + SORTED_INDEXED
+                      if column in self.columns}
+            for column, values in encoded.items():
+                self._store(column, target, values, size)
+            self._store_hashes(target, hashes[selected], size)
+            if len(self.interaction_counts) < size:
+                self.interaction_counts = np.r_[self.interaction_counts,
+                                                np.zeros(size - len(self.interaction_counts), dtype=np.int32)]
+
+            if added.any():
+                self._rebuild_ids()
+            for column in HASH_INDEXED + SORTED_INDEXED:
+                if column in self.columns and (added.any() or column not in before
+                                               or not np.array_equal(before[column], self.columns[column][updated])):
+                    self._rebuild_index(column)
+            last = self.columns.get('last_transaction_date')
+            valid = last[last != NO_DATE] if last is not None else last
+            self.reference_day = int(valid.max()) if valid is not None and len(valid) else NO_DATE
+
+            self.stats['rows_updated'] += int(changed.sum())
+            self.stats['rows_added'] += int(added.sum())
+            return int(changed.sum()), int(added.sum())
+
+    def _store_hashes(self, rows, hashes, size):
+        if len(self.row_hashes) < size:
+            self.row_hashes = np.r_[self.row_hashes, np.zeros(size - len(self.row_hashes), dtype=np.uint64)]
+        self.row_hashes[rows] = hashes
+
+    def _rebuild_ids(self):
+        self.id_order = np.argsort(self.columns['merchant_id'], kind='stable').astype(np.int32)
+        self.sorted_ids = self.columns['merchant_id'][self.id_order]
+
+    def _rebuild_index(self, column):
+        values = self.columns[column]
+        order = np.argsort(values, kind='stable').astype(np.int32)
+        if column in HASH_INDEXED:
+            # Rows of code c are order[offsets[c + 1]:offsets[c + 2]] (code -1 first)
+            offsets = np.searchsorted(values[order], np.arange(-1, len(self.labels[column].labels) + 1))
+            self.hash_indexes[column] = (order, offsets)
+        else:
+            self.sorted_indexes[column] = (order, values[order])
+
+    def set_interactions(self, interactions):
+        with self.lock:
+            counts = interactions.groupby(interactions['merchant_id'].astype(object), sort=False).size()
+            rows = self._rows_of(_to_bytes(counts.index))
+            interaction_counts = np.zeros(len(self), dtype=np.int32)
+            known = rows >= 0
+            interaction_counts[rows[known]] = counts.to_numpy()[known]
+            self.interaction_counts = interaction_counts
+
+    def add_interactions(self, interactions):
+        # New interaction rows only; counts are added on top of what is there
+        with self.lock:
+            rows = self._rows_of(_to_bytes(interactions['merchant_id']))
+            np.add.at(self.interaction_counts, rows[rows >= 0], 1)
+
+    def refresh(self, data_root=None):
+        # Re-reads any of the loader's tables whose file changed since the last look
+        from .config import dataset_path
+        from .loader import read_dataset, source_fingerprint
+
+        data_root = data_root or self.data_root
+        start = time.perf_counter()
+        summary = {'merchants': None, 'interactions': None}
+        for name in summary:
+            path = dataset_path(name, data_root)
+            if not os.path.exists(path):
+                continue
+            fingerprint = source_fingerprint(path)
+            if self.sources.get(name) == fingerprint:
+                continue
+            frame = read_dataset(name, data_root)
+            if name == 'merchants':
+                summary[name] = self.upsert(frame)
+            else:
+                self.set_interactions(frame)
+                summary[name] = len(frame)
+            self.sources[name] = fingerprint
+        with self.lock:
+            self.stats['refreshes'] += 1
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+    # ----- queries -----
+    #
+    # upsert() and set_interactions() rewrite rows and swap the id arrays while
+    # a background refresh runs, so every read holds the lock as well.
+
+    def row(self, merchant_id):
+        key = str(merchant_id).encode('utf-8')
+        with self.lock:
+            position = int(np.searchsorted(self.sorted_ids, key))
+            if position < len(self.sorted_ids) and self.sorted_ids[position] == key:
+                return int(self.id_order[position])
+            return None
+
+    def records(self, rows):
+        # Profiles of many rows at once: one NumPy gather per column
+        with self.lock:
+            return self._records(np.asarray(rows, dtype=np.int64))
+
+    def _records(self, rows):
+        columns = self.columns
+        fields = {}
+        for column in BYTES_COLUMNS:
+            fields[column] = [value.decode('utf-8') for value in columns[column][rows].tolist()]
+        for column in CATEGORY_COLUMNS:
+            if column in columns:
+                # Code -1 (missing) picks the trailing None
+                labels = self.labels[column].labels + [None]
+                fields[column] = [labels[code] for code in columns[column][rows].tolist()]
+        for column in FLAG_COLUMNS + list(NUMBER_COLUMNS):
+            if column in columns:
+                fields[column] = columns[column][rows].tolist()
+        for column in DATE_COLUMNS:
+            if column in columns:
+                days = columns[column][rows]
+                fields[column] = [None if day == NO_DATE else text for day, text in
+                                  zip(days.tolist(), days.astype('datetime64[D]').astype(str).tolist())]
+        last = columns['last_transaction_date'][rows].astype(np.int64) if 'last_transaction_date' in columns \
+            else np.full(len(rows), NO_DATE, dtype=np.int64)
+        known = (last != NO_DATE) & (self.reference_day != NO_DATE)
+        days_since = self.reference_day - last
+        fields['days_since_last_txn'] = [days if ok else None for days, ok in zip(days_since.tolist(), known.tolist())]
+        fields['churned'] = (known & (days_since > CHURN_DAYS)).tolist()
+        fields['interaction_count'] = self.interaction_counts[rows].tolist()
+        names = list(fields)
+        return [dict(zip(names, values)) for values in zip(*fields.values())]
+
+    def record(self, row):
+        # Scalar twin of records(); cheaper than a gather for a single row
+        with self.lock:
+            return self._record(row)
+
+    def _record(self, row):
+        columns = self.columns
+        record = {column: columns[column][row].decode('utf-8') for column in BYTES_COLUMNS}
+        for column in CATEGORY_COLUMNS:
+            if column in columns:
+                code = columns[column][row]
+                record[column] = self.labels[column].labels[code] if code >= 0 else None
+        for column in FLAG_COLUMNS:
+            if column in columns:
+                record[column] = bool(columns[column][row])
+        for column in NUMBER_COLUMNS:
+            if column in columns:
+                record[column] = int(columns[column][row])
+        for column in DATE_COLUMNS:
+            if column in columns:
+                day = int(columns[column][row])
+                record[column] = str(_EPOCH + day) if day != NO_DATE else None
+        last = int(columns['last_transaction_date'][row]) if 'last_transaction_date' in columns else NO_DATE
+        days_since = self.reference_day - last if last != NO_DATE and self.reference_day != NO_DATE else None
+        record['days_since_last_txn'] = days_since
+        record['churned'] = days_since is not None and days_since > CHURN_DAYS
+        record['interaction_count'] = int(self.interaction_counts[row])
+        return record
+
+    def get(self, merchant_id):
+        with self.lock:
+            row = self.row(merchant_id)
+            return self._record(row) if row is not None else None
+
+    def rows_equal(self, column, value):
+        with self.lock:
+            return self._rows_equal(column, value)
+
+    def _rows_equal(self, column, value):
+        if column in HASH_INDEXED:
+            code = self.labels[column].code(value)
+            order, offsets = self.hash_indexes[column]
+            if code < 0:
+                return order[:0]
+            return order[offsets[code + 1]:offsets[code + 2]]
+        if column in SORTED_INDEXED:
+            return self._rows_between(column, value, value)
+        raise KeyError(f"{column} is not indexed, expected one of {HASH_INDEXED + SORTED_INDEXED}")
+
+    def rows_between(self, column, low=None, high=None):
+        # Inclusive range on a sorted index; dates may be given as strings
+        with self.lock:
+            return self._rows_between(column, low, high)
+
+    def _rows_between(self, column, low=None, high=None):
+        if column not in SORTED_INDEXED:
+            raise KeyError(f"{column} has no sorted index, expected one of {SORTED_INDEXED}")
+        order, values = self.sorted_indexes[column]
+        if column in DATE_COLUMNS:
+            low = None if low is None else int((np.datetime64(str(low), 'D') - _EPOCH).astype(np.int64))
+            high = None if high is None else int((np.datetime64(str(high), 'D') - _EPOCH).astype(np.int64))
+            lo = np.searchsorted(values, NO_DATE, side='right') if low is None else np.searchsorted(values, low, 'left')
+        else:
+            lo = 0 if low is None else np.searchsorted(values, int(low), side='left')
+        hi = len(values) if high is None else np.searchsorted(values, int(high), side='right')
+        return order[lo:hi]
+
+    def find(self, limit=None, churned=None, **conditions):
+        # Rows matching every condition, in row order. A condition is a value,
+        # a list of values or (for sorted-index columns) a (low, high) range
+        with self.lock:
+            matches = []
+            for column, value in conditions.items():
+                if isinstance(value, tuple):
+                    rows = self._rows_between(column, *value)
+                elif isinstance(value, (list, set)):
+                    rows = np.concatenate([self._rows_equal(column, item) for item in value] or [np.zeros(0, np.int64)])
+                else:
+                    rows = self._rows_equal(column, value)
+                matches.append(rows)
+            if matches:
+                matches.sort(key=len)
+                rows = np.sort(matches[0])
+                for other in matches[1:]:
+                    rows = rows[np.isin(rows, other)]
+            else:
+                rows = np.arange(len(self))
+            if churned is not None:
+                last = self.columns['last_transaction_date'][rows]
+                flags = (last != NO_DATE) & (self.reference_day - last.astype(np.int64) > CHURN_DAYS)
+                rows = rows[flags == bool(churned)]
+            total = len(rows)
+            rows = rows[:limit] if limit is not None else rows
+            return {'total': total, 'merchants': self._records(rows)}
+
+    def summary(self):
+        with self.lock:
+            return {
+                'merchants': len(self),
+                'nbytes': self.nbytes(),
+                'reference_date': str(_EPOCH + self.reference_day) if self.reference_day != NO_DATE else None,
+                'hash_indexes': sorted(self.hash_indexes),
+                'sorted_indexes': sorted(self.sorted_indexes),
+                **self.stats
+            }
+
+
+# ----- HTTP front end -----
+
+def _query_conditions(query):
+    # ?district=Ajmer&pin_code=400001-400099&city=Pune,Nashik&churned=1&limit=20
+    conditions = {}
+    limit, churned = 100, None
+    for key, values in query.items():
+        value = values[-1]
+        if key == 'limit':
+            limit = int(value)
+        elif key == 'churned':
+            churned = value.lower() in ('1', 'true', 'yes')
+        elif key in SORTED_INDEXED and '~' in value:
+            low, high = value.split('~', 1)
+            conditions[key] = (low or None, high or None)
+        elif key in SORTED_INDEXED and key not in DATE_COLUMNS and '-' in value:
+            low, high = value.split('-', 1)
+            conditions[key] = (low or None, high or None)
+        elif ',' in value:
+            conditions[key] = value.split(',')
+        else:
+            conditions[key] = value
+    return conditions, limit, churned
+
+
+class MerchantRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle's
+    # algorithm holds the body back until the client's delayed ACK (~40ms)
+    disable_nagle_algorithm = True
+    index = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path.startswith('/merchant/'):
+                record = self.index.get(unquote(url.path[len('/merchant/'):]))
+                self._send(200 if record else 404, record or {'error': 'merchant not found'})
+            elif url.path == '/merchants':
+                conditions, limit, churned = _query_conditions(parse_qs(url.query))
+                self._send(200, self.index.find(limit=limit, churned=churned, **conditions))
+            elif url.path == '/stats':
+                self._send(200, self.index.summary())
+            else:
+                self._send(404, {'error': f"unknown path {url.path}"})
+        except (KeyError, ValueError) as e:
+            self._send(400, {'error': str(e.args[0]) if e.args else type(e).__name__})
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(index, host='127.0.0.1', port=8765, unix_socket=None):
+    handler = type('BoundMerchantRequestHandler', (MerchantRequestHandler,), {'index': index})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        # TCP_NODELAY does not apply to Unix sockets
+        handler.disable_nagle_algorithm = False
+        return _UnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(index, host='127.0.0.1', port=8765, unix_socket=None, refresh_every=None):
+    # Blocks; with refresh_every (seconds) the loader's files are re-checked in the background
+    server = make_server(index, host, port, unix_socket)
+    if refresh_every:
+        def refresh_loop():
+            while True:
+                time.sleep(refresh_every)
+                index.refresh()
+        threading.Thread(target=refresh_loop, daemon=True).start()
+    print(f"Serving {len(index):,} merchants on {unix_socket or f'http://{host}:{server.server_address[1]}'}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve BharatPe merchant profiles over HTTP')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', default=None)
+    parser.add_argument('--refresh-every', type=float, default=60, help='seconds between file checks (0: never)')
+    args = parser.parse_args(argv)
+
+    index = MerchantIndex.from_loader(args.data_root)
+    summary = index.summary()
+    print(f"Indexed {summary['merchants']:,} merchants in {summary['built_s']:.2f}s, {summary['nbytes'] / 1e6:.1f} MB")
+    serve(index, args.host, args.port, args.unix_socket, args.refresh_every or None)
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Merchant Profile Index =======
@@ -0,0 +1,211 @@
+# ======= BharatPe Report Writer =======
+#
+# Analyses hand their result frames and text reports to a ReportWriter
+# instead of writing them inline. A background thread serializes them, so
+# compute carries on while the previous table is being written. Every file
+# is written to a temporary name and renamed into place; with per_run=True
+# the whole run is staged in a hidden directory that is renamed to
+# <output_dir>/<run_id> on close(), so a half-written run is never visible.
+# A manifest.json next to the outputs lists every file with its size and
+# how long it took to serialize. With per_run=False the files go straight
+# into a directory other runs share, so close() only returns the manifest.
+#
+#     writer = ReportWriter('output', formats=('parquet',), echo=False)
+#     product_adoption_analysis(merchants, None, writer=writer)
+#     manifest = writer.close()
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from .profiling import stage
+
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+CSV_COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz',
+    'zstd': '.zst',
+    'zip': '.zip'
+}
+COMPRESSION = {
+    'csv': set(CSV_COMPRESSION_SUFFIXES),
+    'parquet': {'snappy', 'gzip', 'brotli', 'lz4', 'zstd'},
+    'feather': {'lz4', 'zstd', 'uncompressed'}
+}
+DEFAULT_COMPRESSION = {'csv': None, 'parquet': 'snappy', 'feather': 'lz4'}
+MANIFEST_NAME = 'manifest.json'
+
+
+def _write_frame(df, path, fmt, compression):
+    if fmt == 'csv':
+        df.to_csv(path, index=False, compression=compression)
+        return
+    # The CSVs never carried the index, so neither do the columnar formats
+    df = df.reset_index(drop=True)
+    df.columns = [str(col) for col in df.columns]
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False, compression=compression)
+    else:
+        df.to_feather(path, compression=compression)
+
+
+class ReportWriter:
+
+    def __init__(self, output_dir='output', run_id=None, formats=('csv',), compression=None,
+                 echo=True, per_run=True, max_pending=32):
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown output formats {unknown}, expected some of {sorted(FORMATS)}")
+        # compression is one codec for every format, or a {format: codec} dict
+        if not isinstance(compression, dict):
+            compression = {fmt: compression for fmt in formats}
+        self.compression = {fmt: compression.get(fmt) or DEFAULT_COMPRESSION[fmt] for fmt in formats}
+        for fmt, codec in self.compression.items():
+            if codec is not None and codec not in COMPRESSION[fmt]:
+                raise ValueError(f"{fmt} does not support {codec!r} compression, expected one of {sorted(COMPRESSION[fmt])}")
+
+        self.formats = tuple(formats)
+        self.echo = echo
+        self.per_run = per_run
+        self.run_id = run_id or datetime.now().strftime("run_%Y%m%d_%H%M%S_%f")
+
+        if per_run:
+            self.run_dir = os.path.join(output_dir, self.run_id)
+            self._stage_dir = os.path.join(output_dir, f".{os.path.basename(self.run_id)}.partial")
+            if os.path.exists(self.run_dir):
+                raise FileExistsError(f"Run directory already exists: {self.run_dir}")
+            shutil.rmtree(self._stage_dir, ignore_errors=True)
+        else:
+            self.run_dir = output_dir
+            self._stage_dir = output_dir
+        os.makedirs(self._stage_dir, exist_ok=True)
+
+        self.entries = []
+        self.errors = []
+        self._started = time.time()
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._drain, name='bharatpe-report-writer', daemon=True)
+        self._thread.start()
+
+    def print(self, *args, **kwargs):
+        if self.echo:
+            print(*args, **kwargs)
+
+    def path(self, filename):
+        # Where a file will live once the run is closed
+        return os.path.join(self.run_dir, filename)
+
+    def write_frame(self, name, df):
+        # Shallow copy: the caller may keep adding columns to its own frame
+        self._put(('frame', name, df.copy(deep=False)))
+
+    def write_text(self, filename, text):
+        self._put(('text', filename, text))
+
+    def _put(self, item):
+        if self._closed:
+            raise RuntimeError("ReportWriter is closed")
+        self._queue.put((time.perf_counter(), item))
+
+    def _filenames(self, name):
+        for fmt in self.formats:
+            suffix = FORMATS[fmt]
+            if fmt == 'csv' and self.compression['csv']:
+                suffix += CSV_COMPRESSION_SUFFIXES[self.compression['csv']]
+            yield fmt, name + suffix
+
+    def _drain(self):
+        while True:
+            queued = self._queue.get()
+            if queued is None:
+                return
+            queued_at, (kind, name, payload) = queued
+            targets = self._filenames(name) if kind == 'frame' else [('text', name)]
+            for fmt, filename in targets:
+                path = os.path.join(self._stage_dir, filename)
+                tmp_path = os.path.join(self._stage_dir, f".{filename}.tmp")
+                start = time.perf_counter()
+                try:
+                    with stage(f"write:{filename}", payload if kind == 'frame' else None):
+                        if kind == 'frame':
+                            _write_frame(payload, tmp_path, fmt, self.compression[fmt])
+                        else:
+                            with open(tmp_path, 'w', encoding='utf-8') as f:
+                                f.write(payload)
+                        os.replace(tmp_path, path)
+                except Exception as e:
+                    self.errors.append(f"{filename}: {e}")
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    continue
+                finished = time.perf_counter()
+                self.entries.append({
+                    'file': filename,
+                    'format': fmt,
+                    'rows': len(payload) if kind == 'frame' else payload.count('\n'),
+                    'bytes': os.path.getsize(path),
+                    'queued_s': start - queued_at,
+                    'write_s': finished - start
+                })
+
+    def manifest(self):
+        return {
+            'run_id': self.run_id,
+            'output_dir': self.run_dir,
+            'started': datetime.fromtimestamp(self._started).isoformat(timespec='seconds'),
+            'formats': list(self.formats),
+            'compression': dict(self.compression),
+            'files': list(self.entries),
+            'total_bytes': sum(entry['bytes'] for entry in self.entries),
+            'total_write_s': sum(entry['write_s'] for entry in self.entries),
+            'errors': list(self.errors)
+        }
+
+    def close(self):
+        # Waits for the queue to drain, writes the manifest and publishes the run
+        # (per_run only)
+        if self._closed:
+            return self.manifest()
+        self._closed = True
+        close_start = time.perf_counter()
+        self._queue.put(None)
+        self._thread.join()
+
+        manifest = self.manifest()
+        manifest['close_wait_s'] = time.perf_counter() - close_start
+        manifest['elapsed_s'] = time.time() - self._started
+        if self.per_run:
+            tmp_path = os.path.join(self._stage_dir, f".{MANIFEST_NAME}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(self._stage_dir, MANIFEST_NAME))
+
+        if self.errors:
+            raise RuntimeError(f"Failed to write {len(self.errors)} report file(s): {self.errors}")
+        if self.per_run:
+            os.replace(self._stage_dir, self.run_dir)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        return False
+
+# ======= End of BharatPe Report Writer =======
@@ -0,0 +1,312 @@
+# ======= BharatPe Stage Profiler =======
+#
+# Opt-in instrumentation for the named stages inside the analyses. Each
+# stage records wall time, CPU time of its thread, rows in and out, and
+# memory: the change in resident set size ('rss', cheap) or bytes allocated
+# and the peak above the stage's starting point ('tracemalloc', exact for
+# Python and NumPy allocations but several times slower). Stages nest per
+# thread, so the report writer's background file writes show up as their
+# own roots.
+#
+# tracemalloc keeps a single process-wide peak, so in 'tracemalloc' mode a
+# stage that overlaps stages on another thread (the report writer's, say)
+# records mem_peak_mb as None rather than a peak the other thread reset.
+# mem_alloc_mb is process-wide in both modes.
+#
+# With no profiler running, stage() hands back one shared no-op object and
+# @profiled functions call straight through: a global lookup per stage.
+#
+#     with Profiler(memory='rss') as profiler:
+#         loan_performance_analysis(merchants, loans, transactions)
+#     profiler.print_summary()
+#     profiler.write('trace')   # trace.jsonl + trace.folded
+#
+# trace.folded is in the collapsed-stack format read by flamegraph.pl,
+# speedscope and inferno (self time in microseconds per stack).
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, so no peak RSS
+    resource = None
+
+MEMORY_MODES = (None, 'rss', 'tracemalloc')
+
+_active = None
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class _NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def output(self, value):
+        return value
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _rows(value):
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _rss_bytes():
+    # Current resident set size; Linux only, None elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class _Stage:
+
+    __slots__ = ('profiler', 'name', 'rows_in', 'rows_out', 'parent', 'path', 'depth',
+                 'start', 'cpu_start', 'mem_start', 'peak', 'overlaps')
+
+    def __init__(self, profiler, name, rows_in=None):
+        self.profiler = profiler
+        self.name = name
+        self.rows_in = _rows(rows_in)
+        self.rows_out = None
+
+    def output(self, value):
+        self.rows_out = _rows(value)
+        return value
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        self.parent = stack[-1] if stack else None
+        self.path = f"{self.parent.path};{self.name}" if self.parent else self.name
+        self.depth = len(stack)
+        stack.append(self)
+
+        memory = self.profiler.memory
+        if memory == 'tracemalloc':
+            self.overlaps = self.profiler._open_thread()
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+            self.peak = current
+        elif memory == 'rss':
+            self.mem_start = _rss_bytes()
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        cpu = time.thread_time() - self.cpu_start
+        record = {
+            'stage': self.name,
+            'path': self.path,
+            'depth': self.depth,
+            'thread': threading.current_thread().name,
+            'pid': os.getpid(),
+            'start_s': round(self.start - self.profiler.started, 6),
+            'wall_s': end - self.start,
+            'cpu_s': cpu,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out
+        }
+
+        memory = self.profiler.memory
+        if memory == 'tracemalloc':
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            record['mem_alloc_mb'] = (current - self.mem_start) / 1e6
+            record['mem_peak_mb'] = (self.peak - self.mem_start) / 1e6
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, self.peak)
+            tracemalloc.reset_peak()
+            if not self.profiler._close_thread(self.overlaps):
+                # Another thread had stages open meanwhile and reset the peak too
+                record['mem_peak_mb'] = None
+        elif memory == 'rss':
+            rss = _rss_bytes()
+            record['mem_alloc_mb'] = (rss - self.mem_start) / 1e6 if rss is not None and self.mem_start is not None else None
+            record['mem_peak_mb'] = _max_rss_mb()
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+
+        self.profiler._stack().pop()
+        self.profiler.records.append(record)
+        return False
+
+
+class Profiler:
+
+    def __init__(self, memory='rss'):
+        if memory not in MEMORY_MODES:
+            raise ValueError(f"Unknown memory mode {memory!r}, expected one of {MEMORY_MODES}")
+        self.memory = memory
+        self.records = []
+        self.started = time.perf_counter()
+        self._local = threading.local()
+        self._previous = None
+        self._own_tracemalloc = False
+        # Open stages per thread, and a count of stages entered while another
+        # thread had some open (tracemalloc mode only)
+        self._lock = threading.Lock()
+        self._open = {}
+        self._overlaps = 0
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _open_thread(self):
+        # Returns the overlap count, or None when another thread already has stages open
+        thread = threading.get_ident()
+        with self._lock:
+            self._open[thread] = self._open.get(thread, 0) + 1
+            if len(self._open) > 1:
+                self._overlaps += 1
+                return None
+            return self._overlaps
+
+    def _close_thread(self, overlaps):
+        # True when no other thread had stages open during the stage
+        thread = threading.get_ident()
+        with self._lock:
+            alone = overlaps == self._overlaps and len(self._open) == 1
+            self._open[thread] -= 1
+            if not self._open[thread]:
+                del self._open[thread]
+            return alone
+
+    def start(self):
+        global _active
+        if self.memory == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+        self._previous, _active = _active, self
+        return self
+
+    def stop(self):
+        global _active
+        _active = self._previous
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+        return self.records
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def summary(self):
+        return summarize(self.records)
+
+    def print_summary(self, top=25):
+        print_summary(self.records, top)
+
+    def write(self, prefix):
+        return write_trace(self.records, prefix)
+
+
+def stage(name, rows_in=None):
+    # with stage('merge', loans) as s: ... s.output(merged)
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name, rows_in)
+
+
+def profiled(name=None):
+    # Makes the whole function a stage; rows_in is the length of the first argument
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with _Stage(profiler, label, args[0] if args else None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def is_profiling():
+    return _active is not None
+
+
+def summarize(records):
+    # Totals per stack path, children before self time is taken out
+    by_path = {}
+    for record in records:
+        entry = by_path.setdefault(record['path'], {
+            'path': record['path'], 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'child_s': 0.0,
+            'rows_in': 0, 'rows_out': 0, 'mem_alloc_mb': 0.0, 'mem_peak_mb': 0.0
+        })
+        entry['calls'] += 1
+        entry['wall_s'] += record['wall_s']
+        entry['cpu_s'] += record['cpu_s']
+        entry['rows_in'] += record['rows_in'] or 0
+        entry['rows_out'] += record['rows_out'] or 0
+        entry['mem_alloc_mb'] += record.get('mem_alloc_mb') or 0.0
+        entry['mem_peak_mb'] = max(entry['mem_peak_mb'], record.get('mem_peak_mb') or 0.0)
+    for path, entry in by_path.items():
+        parent = path.rpartition(';')[0]
+        if parent in by_path:
+            by_path[parent]['child_s'] += entry['wall_s']
+    for entry in by_path.values():
+        entry['self_s'] = max(entry['wall_s'] - entry.pop('child_s'), 0.0)
+    return sorted(by_path.values(), key=lambda entry: entry['path'])
+
+
+def print_summary(records, top=25):
+    entries = sorted(summarize(records), key=lambda entry: entry['self_s'], reverse=True)[:top]
+    print(f"{'stage':<60}{'calls':>6}{'wall s':>9}{'self s':>9}{'cpu s':>9}{'rows in':>12}{'rows out':>12}{'mem MB':>9}")
+    for entry in entries:
+        print(f"{entry['path'][-60:]:<60}{entry['calls']:>6}{entry['wall_s']:>9.3f}{entry['self_s']:>9.3f}"
+              f"{entry['cpu_s']:>9.3f}{entry['rows_in']:>12,}{entry['rows_out']:>12,}{entry['mem_alloc_mb']:>9.1f}")
+
+
+def write_trace(records, prefix):
+    # prefix.jsonl: one record per stage call; prefix.folded: collapsed stacks
+    jsonl_path, folded_path = f"{prefix}.jsonl", f"{prefix}.folded"
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    with open(folded_path, 'w', encoding='utf-8') as f:
+        for entry in summarize(records):
+            micros = int(round(entry['self_s'] * 1e6))
+            if micros > 0:
+                f.write(f"{entry['path']} {micros}\n")
+    return jsonl_path, folded_path
+
+# ======= End of BharatPe Stage Profiler =======
@@ -0,0 +1,312 @@
+# ======= BharatPe Analysis Result Cache =======
+#
+# Memoizes analysis calls on disk. The key is a content fingerprint of every
+# DataFrame argument (its column buffers, column names and dtypes), the function
+# (its qualified name and a hash of its module's source together with every
+# module of this package, so editing the analysis, a helper it calls in
+# cube.py or aggregation.py, or a constant such as the qcut quantile counts
+# or the 30-day churn threshold invalidates old entries) and every other bound
+# parameter, defaults included (output_dir, activity_windows, ...). Hits
+# return the pickled result dict; the files the original call wrote into
+# output_dir must still be there, otherwise the call is re-run. Entries are
+# evicted least-recently-used once the store grows past max_bytes.
+#
+#     cache = ResultCache(max_bytes=256 * 1024 ** 2)
+#     result = cache.call(loan_performance_analysis, merchants, loans, transactions)
+#     cached_adoption = cache.memoize(product_adoption_analysis)
+#     cache.stats(), cache.invalidate(loan_performance_analysis), cache.clear()
+#
+# Frame arguments are handed to the analysis as shallow copies, so the
+# columns it adds in place never reach the caller's frames, hit or miss, and
+# the next call on the same frames still matches. Calls given a ReportWriter
+# are never cached: their files belong to a new run directory each time.
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from .loader import cache_dir
+
+RESULT_CACHE_DIR_ENV = 'BHARATPE_RESULT_CACHE_DIR'
+RESULT_CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+_module_hashes = {}
+
+
+def _column_buffers(values):
+    # Raw memory of one column: NumPy data, categorical codes, or the Arrow
+    # buffers (with offset and length, as slices share their parent's buffers)
+    if isinstance(values, pd.Categorical):
+        yield values.codes.tobytes()
+        yield from _column_buffers(values.categories.array)
+        return
+    if hasattr(values, '__arrow_array__'):
+        import pyarrow as pa
+
+        arrow = values.__arrow_array__()
+        chunks = arrow.chunks if isinstance(arrow, pa.ChunkedArray) else [arrow]
+        for chunk in chunks:
+            yield repr((chunk.offset, len(chunk))).encode()
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    yield buffer
+        return
+    array = np.asarray(values)
+    if array.dtype == object:
+        yield pd.util.hash_array(array).tobytes()
+    else:
+        yield np.ascontiguousarray(array).tobytes()
+
+
+def frame_fingerprint(df):
+    digest = hashlib.blake2b(digest_size=16)
+    columns = list(df.items()) if isinstance(df, pd.DataFrame) else [(df.name, df)]
+    digest.update(repr((type(df).__name__, df.shape, [(str(col), str(values.dtype)) for col, values in columns])).encode())
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        digest.update(repr((index.start, index.stop, index.step)).encode())
+    else:
+        for buffer in _column_buffers(index.array):
+            digest.update(buffer)
+    for _, values in columns:
+        for buffer in _column_buffers(values.array):
+            digest.update(buffer)
+    return digest.hexdigest()
+
+
+def _source_paths(path):
+    # The function's own file plus every module of this package: analyses
+    # lean on helpers and constants in cube.py, aggregation.py, loader.py, ...
+    package = os.path.dirname(os.path.abspath(__file__))
+    paths = {os.path.abspath(path)}
+    paths.update(os.path.join(package, name) for name in os.listdir(package) if name.endswith('.py'))
+    return sorted(paths)
+
+
+def function_fingerprint(func):
+    func = inspect.unwrap(func)
+    path = inspect.getsourcefile(func)
+    if path not in _module_hashes:
+        digest = hashlib.blake2b(digest_size=16)
+        for source in _source_paths(path):
+            with open(source, 'rb') as f:
+                digest.update(os.path.basename(source).encode())
+                digest.update(f.read())
+        _module_hashes[path] = digest.hexdigest()
+    return f"{func.__module__}.{func.__qualname__}", _module_hashes[path]
+
+
+def _canonical(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return {'frame': frame_fingerprint(value)}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def _detached(value):
+    return value.copy(deep=False) if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+
+def _write_json(path, data):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _snapshot(directory):
+    if not directory or not os.path.isdir(directory):
+        return {}
+    return {
+        entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+        for entry in os.scandir(directory) if entry.is_file()
+    }
+
+
+class ResultCache:
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.environ.get(RESULT_CACHE_DIR_ENV) or os.path.join(cache_dir(), 'results')
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0, 'evicted': 0,
+                         'saved_s': 0.0, 'fingerprint_s': 0.0}
+        os.makedirs(self.path, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.path, key)
+        return f"{base}.pkl", f"{base}.json"
+
+    def key(self, func, args=(), kwargs=None):
+        # Returns (key, description) for a call
+        start = time.perf_counter()
+        bound = inspect.signature(inspect.unwrap(func)).bind(*args, **(kwargs or {}))
+        bound.apply_defaults()
+        name, source = function_fingerprint(func)
+        params = {param: _canonical(value) for param, value in bound.arguments.items()}
+        description = {'version': RESULT_CACHE_VERSION, 'function': name, 'source': source, 'params': params}
+        key = hashlib.blake2b(json.dumps(description, sort_keys=True).encode(), digest_size=20).hexdigest()
+        self.counters['fingerprint_s'] += time.perf_counter() - start
+        return key, description
+
+    def _load(self, key):
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            output_dir = meta.get('output_dir')
+            for filename in meta.get('files', []):
+                if not os.path.exists(os.path.join(output_dir, filename)):
+                    return None, None
+            with open(data_path, 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            return None, None
+        # Rewriting the meta bumps its mtime, which drives LRU eviction
+        meta['hits'] = meta.get('hits', 0) + 1
+        meta['last_hit'] = time.time()
+        _write_json(meta_path, meta)
+        return result, meta
+
+    def _store(self, key, description, result, compute_s, output_dir, files):
+        data_path, meta_path = self._paths(key)
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return False
+        with open(f"{data_path}.tmp", 'wb') as f:
+            f.write(payload)
+        os.replace(f"{data_path}.tmp", data_path)
+
+        meta = {
+            'function': description['function'],
+            'params': description['params'],
+            'bytes': len(payload),
+            'compute_s': compute_s,
+            'created': time.time(),
+            'output_dir': output_dir,
+            'files': files,
+            'hits': 0
+        }
+        _write_json(meta_path, meta)
+        self.counters['stored'] += 1
+        self.evict()
+        return True
+
+    def call(self, func, *args, **kwargs):
+        if kwargs.get('writer') is not None:
+            self.counters['bypassed'] += 1
+            return func(*args, **kwargs)
+
+        key, description = self.key(func, args, kwargs)
+        result, meta = self._load(key)
+        if meta is not None:
+            self.counters['hits'] += 1
+            self.counters['saved_s'] += meta['compute_s']
+            return result
+
+        self.counters['misses'] += 1
+        output_dir = description['params'].get('output_dir')
+        before = _snapshot(output_dir)
+        start = time.perf_counter()
+        result = func(*[_detached(arg) for arg in args], **{name: _detached(value) for name, value in kwargs.items()})
+        compute_s = time.perf_counter() - start
+        after = _snapshot(output_dir)
+        files = sorted(name for name, stat in after.items() if before.get(name) != stat)
+        try:
+            self._store(key, description, result, compute_s, output_dir and os.path.abspath(output_dir), files)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Could not cache {description['function']}: {str(e)}")
+        return result
+
+    def memoize(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        wrapper.cache = self
+        return wrapper
+
+    def entries(self):
+        # (key, meta, last access) for every stored entry, oldest access first
+        entries = []
+        for filename in os.listdir(self.path):
+            if not filename.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.path, filename)
+            try:
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                entries.append((filename[:-len('.json')], meta, os.stat(meta_path).st_mtime))
+            except (OSError, ValueError):
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, max_bytes=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(meta['bytes'] for _, meta, _ in entries)
+        evicted = 0
+        for key, meta, _ in entries:
+            if total <= max_bytes:
+                break
+            self._remove(key)
+            total -= meta['bytes']
+            evicted += 1
+        self.counters['evicted'] += evicted
+        return evicted
+
+    def invalidate(self, func=None, key=None):
+        # One entry by key, every entry of one function, or (neither) everything
+        if key is not None:
+            self._remove(key)
+            return 1
+        name = function_fingerprint(func)[0] if func is not None else None
+        removed = 0
+        for entry_key, meta, _ in self.entries():
+            if name is None or meta['function'] == name:
+                self._remove(entry_key)
+                removed += 1
+        return removed
+
+    def clear(self):
+        return self.invalidate()
+
+    def stats(self):
+        entries = self.entries()
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_rate': self.counters['hits'] / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(meta['bytes'] for _, meta, _ in entries),
+            'max_bytes': self.max_bytes,
+            # Across every process that used the store, for the entries still in it
+            'stored_hits': sum(meta.get('hits', 0) for _, meta, _ in entries),
+            'stored_saved_s': sum(meta.get('hits', 0) * meta['compute_s'] for _, meta, _ in entries)
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"Result cache {self.path}")
+        print(f"  {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+              f"{stats['bypassed']} bypassed, {stats['evicted']} evicted")
+        print(f"  {stats['entries']} entries, {stats['bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.0f} MB")
+        print(f"  {stats['saved_s']:.2f}s of compute saved, {stats['fingerprint_s']:.2f}s spent fingerprinting")
+        print(f"  {stats['stored_hits']} hits on the stored entries overall, {stats['stored_saved_s']:.2f}s saved")
+
+# ======= End of BharatPe Analysis Result Cache =======
@@ -0,0 +1,298 @@
+# ======= BharatPe Review Store =======
+#
+# One columnar store for the Play Store reviews of every app, fed
+# incrementally from the full re-scrapes (bharatpe_reviews.csv,
+# paytm_reviews.csv, phonepe_reviews.csv). Each ingest only keeps reviews
+# whose reviewId the store has not seen, and only looks at rows dated no
+# earlier than the app's watermark (latest stored `at`) minus an overlap
+# window for reviews that show up late. Scrapes come newest first, so
+# reading stops at the first chunk that is entirely older than that: a new
+# scrape costs time in proportion to its new reviews, not its length.
+#
+# Text is normalized once at ingest (emoji and other pictographs dropped,
+# whitespace collapsed, case and scripts kept) into a `text` column next to
+# the raw `content`; export_sql_csv() writes the MySQL bulk-load copy that
+# bharatpe_reviews_cleaned_file_SQL.csv used to be made by hand.
+#
+#     store = ReviewStore()
+#     store.ingest()                           # all three apps in parallel
+#     reviews = store.reviews('paytm')
+#     review_keyword_analysis(reviews, 'paytm')
+#     store.export_sql_csv('bharatpe', 'bharatpe_reviews_cleaned.csv')
+#
+# Each ingest appends one part file per app (in the loader's cache format)
+# and then rewrites manifest.json, which alone decides which parts count, so
+# an interrupted ingest leaves the store as it was. Duplicates are only
+# checked against parts whose max_at reaches the window (the manifest keeps
+# min_at / max_at per part), so a review edited to a newer date long after it
+# was stored gets a second copy; reviews() and compact() keep its first
+# version. compact() folds the parts into one.
+#
+# or python -m bharatpe_analysis.review_store [--store DIR] [--review-root DIR] [--apps paytm phonepe]
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .config import REPO_ROOT, REVIEW_FILES, review_path
+from .loader import CACHE_DIR_NAME, cache_format
+from .reviews import REVIEW_COLUMNS
+
+REVIEW_STORE_DIR_ENV = 'BHARATPE_REVIEW_STORE_DIR'
+REVIEW_STORE_VERSION = 1
+DEFAULT_OVERLAP = pd.Timedelta(days=2)
+DEFAULT_CHUNKSIZE = 2_000
+STORE_COLUMNS = ['app', 'reviewId', 'content', 'text', 'score', 'thumbsUpCount',
+                 'reviewCreatedVersion', 'at', 'appVersion']
+SQL_COLUMNS = {'text': 'content', 'score': 'score', 'thumbsUpCount': 'thumbsUpCount',
+               'reviewCreatedVersion': 'review created version', 'at': 'at', 'appVersion': 'appVersion'}
+
+_PICTOGRAPHS = re.compile(
+    '[\U0001F000-\U0001FAFF\u2190-\u21FF\u2300-\u23FF\u2460-\u24FF\u25A0-\u27BF\u2900-\u297F'
+    '\u2B00-\u2BFF\uFE00-\uFE0F\u200D\u20E3\U000E0000-\U000E007F]+'
+)
+
+
+def default_store_path(review_root=None):
+    return (os.environ.get(REVIEW_STORE_DIR_ENV)
+            or os.path.join(review_root or REPO_ROOT, CACHE_DIR_NAME, 'reviews'))
+
+
+def normalize_text(content):
+    # Pictographs become spaces (so 'good👍service' stays two words), then
+    # runs of whitespace collapse to one space
+    text = pd.Series(content).fillna('').astype(str)
+    text = text.str.replace(_PICTOGRAPHS, ' ', regex=True)
+    return text.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _read_part(path, fmt, columns=None):
+    if fmt == 'feather':
+        return pd.read_feather(path, columns=columns)
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df[columns] if columns else df
+
+
+def _write_part(df, path, fmt):
+    tmp_path = f"{path}.tmp"
+    if fmt == 'feather':
+        df.reset_index(drop=True).to_feather(tmp_path)
+    elif fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _scan_scrape(path, cutoff, chunksize):
+    # Rows of a scrape dated at or after cutoff; stops early once a
+    # newest-first file has gone past it. Returns (rows, rows scanned, stopped early)
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in REVIEW_COLUMNS if column in header]
+    kept, scanned, previous = [], 0, None
+    newest_first = True
+    with pd.read_csv(path, usecols=usecols, chunksize=chunksize, dtype={'reviewId': str}) as reader:
+        for chunk in reader:
+            scanned += len(chunk)
+            at = pd.to_datetime(chunk['at'], errors='coerce')
+            chunk = chunk.assign(at=at)
+            if cutoff is None:
+                kept.append(chunk)
+                continue
+            kept.append(chunk[at.isna() | (at >= cutoff)])
+            valid = at.dropna()
+            if len(valid):
+                newest_first = newest_first and valid.is_monotonic_decreasing and (previous is None or valid.iloc[0] <= previous)
+                previous = valid.iloc[-1]
+                if newest_first and previous < cutoff:
+                    return pd.concat(kept, ignore_index=True), scanned, True
+    columns = usecols if 'at' in usecols else usecols + ['at']
+    return (pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=columns)), scanned, False
+
+
+def _ingest_app(app, scrape_path, store_path, fmt, parts, watermark, overlap, chunksize):
+    # Runs in a worker: returns the app's new reviews, ready to store
+    start = time.perf_counter()
+    cutoff = pd.Timestamp(watermark) - overlap if watermark else None
+    rows, scanned, stopped_early = _scan_scrape(scrape_path, cutoff, chunksize)
+
+    # Only parts reaching into the window (or holding undated reviews) can
+    # hold a copy of a candidate; older parts are never opened
+    parts = [part['file'] for part in parts
+             if cutoff is None or part.get('undated', 1) or pd.Timestamp(part['max_at']) >= cutoff]
+    known = [_read_part(os.path.join(store_path, part), fmt, ['reviewId'])['reviewId'] for part in parts]
+    known = pd.Index(pd.concat(known, ignore_index=True)) if known else pd.Index([], dtype=object)
+    rows = rows[rows['reviewId'].notna()]
+    candidates = len(rows)
+    rows = rows.drop_duplicates('reviewId', keep='first')
+    rows = rows[~rows['reviewId'].isin(known)]
+
+    new = pd.DataFrame({
+        'app': app,
+        'reviewId': rows['reviewId'].astype(str).to_numpy(),
+        'content': rows['content'].fillna('').astype(str).to_numpy(),
+        'text': normalize_text(rows['content']).to_numpy(),
+        'score': rows['score'].to_numpy(dtype=np.float64, na_value=np.nan).astype(np.float32),
+        'thumbsUpCount': rows['thumbsUpCount'].fillna(0).to_numpy().astype(np.int32),
+        'reviewCreatedVersion': rows['reviewCreatedVersion'].astype(str).where(rows['reviewCreatedVersion'].notna()).to_numpy(),
+        'at': rows['at'].to_numpy(),
+        'appVersion': rows['appVersion'].astype(str).where(rows['appVersion'].notna()).to_numpy()
+    })
+    stats = {'scanned': scanned, 'candidates': candidates, 'new': len(new),
+             'duplicates': candidates - len(new), 'stopped_early': stopped_early,
+             'seconds': round(time.perf_counter() - start, 4)}
+    return app, new, stats
+
+
+class ReviewStore:
+
+    def __init__(self, path=None, review_root=None):
+        self.path = path or default_store_path(review_root)
+        self.review_root = review_root
+        self.manifest = {'version': REVIEW_STORE_VERSION, 'format': cache_format(), 'apps': {}, 'parts': []}
+        manifest_path = os.path.join(self.path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('version') != REVIEW_STORE_VERSION:
+                raise ValueError(f"{self.path} holds review store version {self.manifest.get('version')}, "
+                                 f"expected {REVIEW_STORE_VERSION}; rebuild it")
+        self.format = self.manifest['format']
+
+    def _save_manifest(self):
+        manifest_path = os.path.join(self.path, 'manifest.json')
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def parts(self, app=None):
+        return [part['file'] for part in self.manifest['parts'] if app is None or part['app'] == app]
+
+    def watermark(self, app):
+        return self.manifest['apps'].get(app, {}).get('watermark')
+
+    def ingest(self, apps=None, paths=None, workers=None, overlap=DEFAULT_OVERLAP, chunksize=DEFAULT_CHUNKSIZE):
+        # paths: {app: scrape csv}, defaulting to the review root's files
+        apps = list(apps or (paths or REVIEW_FILES))
+        paths = {app: (paths or {}).get(app) or review_path(app, self.review_root) for app in apps}
+        os.makedirs(self.path, exist_ok=True)
+        jobs = [(app, paths[app], self.path, self.format, [part for part in self.manifest['parts'] if part['app'] == app],
+                 self.watermark(app), overlap, chunksize) for app in apps]
+
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_ingest_app, *zip(*jobs)))
+        else:
+            results = [_ingest_app(*job) for job in jobs]
+
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        summary = {}
+        for app, new, stats in results:
+            summary[app] = stats
+            if new.empty:
+                continue
+            filename = f"{app}-{stamp}.{self.format}"
+            _write_part(new, os.path.join(self.path, filename), self.format)
+            self.manifest['parts'].append({'file': filename, 'app': app, 'rows': len(new),
+                                           'min_at': str(new['at'].min()), 'max_at': str(new['at'].max()),
+                                           'undated': int(new['at'].isna().sum())})
+            entry = self.manifest['apps'].setdefault(app, {'reviews': 0, 'watermark': None, 'ingests': 0})
+            latest = new['at'].max()
+            if pd.notna(latest):
+                entry['watermark'] = str(max(pd.Timestamp(entry['watermark']), latest) if entry['watermark'] else latest)
+            entry['reviews'] += len(new)
+        for app in summary:
+            entry = self.manifest['apps'].setdefault(app, {'reviews': 0, 'watermark': None, 'ingests': 0})
+            entry['ingests'] += 1
+            entry['last_ingest'] = stamp
+        self._save_manifest()
+        return summary
+
+    def reviews(self, app=None, columns=None):
+        # Stored reviews, oldest first within each app
+        read_columns = None if columns is None else list(dict.fromkeys(['app', 'at', 'reviewId'] + list(columns)))
+        frames = [_read_part(os.path.join(self.path, part), self.format, read_columns) for part in self.parts(app)]
+        if not frames:
+            return pd.DataFrame(columns=columns or STORE_COLUMNS)
+        reviews = pd.concat(frames, ignore_index=True)
+        reviews = reviews.sort_values(['app', 'at'], kind='stable')
+        # A review edited after its part left the ingest window is stored again; the first version wins
+        reviews = reviews.drop_duplicates(['app', 'reviewId'], keep='first').reset_index(drop=True)
+        for column in ['app', 'reviewCreatedVersion', 'appVersion']:
+            if column in reviews.columns:
+                reviews[column] = reviews[column].astype('category')
+        return reviews[columns] if columns else reviews
+
+    def compact(self):
+        # Folds every part into one file per app
+        compacted = []
+        for app in sorted({part['app'] for part in self.manifest['parts']}):
+            if len(self.parts(app)) < 2:
+                compacted += [part for part in self.manifest['parts'] if part['app'] == app]
+                continue
+            reviews = self.reviews(app)
+            for column in ['app', 'reviewCreatedVersion', 'appVersion']:
+                reviews[column] = reviews[column].astype(object)
+            filename = f"{app}-compacted-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{self.format}"
+            _write_part(reviews, os.path.join(self.path, filename), self.format)
+            compacted.append({'file': filename, 'app': app, 'rows': len(reviews),
+                              'min_at': str(reviews['at'].min()), 'max_at': str(reviews['at'].max()),
+                              'undated': int(reviews['at'].isna().sum())})
+        old = set(self.parts()) - {part['file'] for part in compacted}
+        self.manifest['parts'] = compacted
+        self._save_manifest()
+        for filename in old:
+            os.remove(os.path.join(self.path, filename))
+        return len(old)
+
+    def export_sql_csv(self, app, path):
+        # content / score / thumbsUpCount / review created version / at /
+        # appVersion, newest first, normalized text, no empty reviews
+        reviews = self.reviews(app, list(SQL_COLUMNS))
+        reviews = reviews[reviews['text'] != ''].iloc[::-1]
+        out = reviews[list(SQL_COLUMNS)].rename(columns=SQL_COLUMNS)
+        out['score'] = out['score'].astype('Int64')
+        out.to_csv(path, index=False)
+        return len(out)
+
+    def summary(self):
+        return {app: dict(entry, parts=len(self.parts(app))) for app, entry in self.manifest['apps'].items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest new Play Store reviews into the BharatPe review store')
+    parser.add_argument('--store', default=None)
+    parser.add_argument('--review-root', default=None)
+    parser.add_argument('--apps', nargs='+', default=list(REVIEW_FILES), choices=list(REVIEW_FILES))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--compact', action='store_true')
+    args = parser.parse_args(argv)
+
+    store = ReviewStore(args.store, args.review_root)
+    start = time.perf_counter()
+    summary = store.ingest(args.apps, workers=args.workers)
+    print(f"{'app':<10}{'scanned':>9}{'new':>8}{'dupes':>8}{'early stop':>12}{'seconds':>9}")
+    for app, stats in summary.items():
+        print(f"{app:<10}{stats['scanned']:>9,}{stats['new']:>8,}{stats['duplicates']:>8,}"
+              f"{str(stats['stopped_early']):>12}{stats['seconds']:>9.3f}")
+    print(f"Ingested in {time.perf_counter() - start:.2f}s into {store.path}")
+    if args.compact:
+        print(f"Compacted {store.compact()} part files")
+    for app, entry in store.summary().items():
+        print(f"  {app}: {entry['reviews']:,} reviews up to {entry['watermark']} in {entry['parts']} part(s)")
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Review Store =======
@@ -0,0 +1,334 @@
+# ======= BharatPe Review Warehouse =======
+#
+# File-backed SQLite copy of the `reviews` tables from the three
+# "* analysis SQL queries.sql" files, so the sentiment_distribution,
+# daily_sentiment_trend, version_performance, most_helpful_reviews,
+# language_analysis and word_frequency views run locally without a MySQL
+# server. All three apps share one table keyed by app, and every view takes
+# the app as a parameter.
+#
+# Instead of LIKE '%...%' scans over content, text lookups go through a
+# trigram FTS5 index (same case-insensitive substring semantics as LIKE;
+# keywords shorter than three characters fall back to a LIKE over the index's
+# own text). word_frequency reads a word postings table, (app, word, review,
+# position) clustered by word, built with the view's own split: the first ten
+# space-separated words of each review, lower-cased. (app, at),
+# (app, versions), (app, score) and (app, thumbs up, score) indexes serve the
+# trend, version, sentiment and most-helpful views.
+#
+#     warehouse = ReviewWarehouse()
+#     warehouse.load_csv('paytm')                  # re-loading skips known reviews
+#     warehouse.sentiment_distribution('paytm')
+#     warehouse.word_frequency('bharatpe')
+#     warehouse.search('phonepe', 'refund', 'money stuck')
+#
+# or python -m bharatpe_analysis.review_warehouse [--db PATH] [--review-root DIR] [--from-store DIR]
+
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from .config import REPO_ROOT, REVIEW_FILES, review_path
+from .loader import CACHE_DIR_NAME
+from .reviews import read_reviews
+
+REVIEW_WAREHOUSE_ENV = 'BHARATPE_REVIEW_WAREHOUSE'
+
+# language_analysis: reviews containing any of these count as Hindi/Local
+LOCAL_LANGUAGE_TERMS = ['vyapari', 'sahi nahin', 'लोन', 'सर्विस', 'jhakas', 'kamai', 'lootane']
+STOP_WORDS = ['this', 'that', 'with', 'from', 'have', 'what', 'your', 'they', 'will', 'would', 'could', 'when', 'where']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    app TEXT NOT NULL,
+    review_id TEXT NOT NULL,
+    content TEXT,
+    score INTEGER,
+    thumbs_up_count INTEGER,
+    review_created_version TEXT,
+    app_version TEXT,
+    at TEXT,
+    UNIQUE (app, review_id)
+);
+CREATE INDEX IF NOT EXISTS reviews_app_at ON reviews (app, at);
+CREATE INDEX IF NOT EXISTS reviews_app_version ON reviews (app, review_created_version, app_version, score);
+CREATE INDEX IF NOT EXISTS reviews_app_score ON reviews (app, score);
+CREATE INDEX IF NOT EXISTS reviews_app_helpful ON reviews (app, thumbs_up_count DESC, score DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS review_text USING fts5 (
+    content, content='reviews', content_rowid='id', tokenize='trigram'
+);
+CREATE TABLE IF NOT EXISTS review_words (
+    app TEXT NOT NULL,
+    word TEXT NOT NULL,
+    review INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (app, word, review, position)
+) WITHOUT ROWID;
+CREATE VIEW IF NOT EXISTS sentiment_analysis AS
+SELECT
+    id, app, content, score,
+    at AS review_date,
+    thumbs_up_count,
+    review_created_version,
+    app_version,
+    CASE
+        WHEN score <= 2 THEN 'Negative'
+        WHEN score = 3 THEN 'Neutral'
+        WHEN score > 3 THEN 'Positive'
+    END AS sentiment_category
+FROM reviews;
+"""
+
+
+def default_warehouse_path(review_root=None):
+    return (os.environ.get(REVIEW_WAREHOUSE_ENV)
+            or os.path.join(review_root or REPO_ROOT, CACHE_DIR_NAME, 'reviews.sqlite'))
+
+
+def split_words(content, max_words=None):
+    # word_frequency's split: space-separated, lower-cased, trimmed
+    words = [word.strip().lower() for word in str(content).split(' ')]
+    return words[:max_words] if max_words else words
+
+
+class ReviewWarehouse:
+
+    def __init__(self, path=None, review_root=None):
+        self.path = path or default_warehouse_path(review_root)
+        self.review_root = review_root
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    # ---- loading ----
+
+    def load(self, app, reviews):
+        # reviews: a frame with the scrape's columns; rows whose reviewId is
+        # already stored for the app are skipped. Frames without reviewId (the
+        # cleaned MySQL CSV) are keyed by a hash of content and timestamp.
+        at = pd.to_datetime(reviews['at'], errors='coerce')
+        if 'reviewId' in reviews.columns:
+            review_ids = reviews['reviewId'].astype(str)
+        else:
+            keys = pd.DataFrame({'content': reviews['content'].astype(str), 'at': at})
+            review_ids = pd.Series(pd.util.hash_pandas_object(keys, index=False).to_numpy()).map('{:016x}'.format)
+        created = reviews.get('reviewCreatedVersion', reviews.get('review created version'))
+
+        def text(values):
+            values = pd.Series(values)
+            return values.astype(object).where(values.notna(), None).tolist()
+
+        rows = zip(
+            [app] * len(reviews),
+            review_ids.tolist(),
+            text(reviews['content']),
+            text(reviews['score'].astype('Int64')),
+            text(reviews['thumbsUpCount'].astype('Int64')),
+            text(created.astype(str).where(created.notna()) if created is not None else [None] * len(reviews)),
+            text(reviews['appVersion'].astype(str).where(reviews['appVersion'].notna())),
+            text(at.dt.strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        with self.conn:
+            last_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM reviews').fetchone()[0]
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO reviews (app, review_id, content, score, thumbs_up_count, '
+                'review_created_version, app_version, at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            # Index only the rows that went in
+            self.conn.execute('INSERT INTO review_text (rowid, content) '
+                              'SELECT id, content FROM reviews WHERE id > ?', (last_id,))
+            new = self.conn.execute('SELECT id, content FROM reviews WHERE id > ?', (last_id,)).fetchall()
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO review_words (app, word, review, position) VALUES (?, ?, ?, ?)',
+                ((app, word, review, position)
+                 for review, content in new if content is not None
+                 for position, word in enumerate(split_words(content)) if word))
+        return len(new)
+
+    def load_csv(self, app, path=None):
+        return self.load(app, read_reviews(app, path or review_path(app, self.review_root)))
+
+    def load_store(self, store, apps=None):
+        # From a ReviewStore, using its normalized text as content
+        loaded = {}
+        for app in apps or store.manifest['apps']:
+            reviews = store.reviews(app)
+            loaded[app] = self.load(app, reviews.assign(content=reviews['text']))
+        return loaded
+
+    def apps(self):
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT app FROM reviews ORDER BY app')]
+
+    # ---- text search ----
+
+    def _match_sql(self, terms):
+        # Rowids of reviews containing any of the terms (case-insensitive substring)
+        long_terms = [term for term in terms if len(term) >= 3]
+        parts, params = [], []
+        if long_terms:
+            parts.append('SELECT rowid FROM review_text WHERE review_text MATCH ?')
+            params.append(' OR '.join('"' + term.replace('"', '""') + '"' for term in long_terms))
+        for term in terms:
+            if len(term) < 3:
+                parts.append('SELECT rowid FROM review_text WHERE content LIKE ?')
+                params.append(f'%{term}%')
+        return ' UNION '.join(parts), params
+
+    def search(self, app, *terms, limit=None):
+        match_sql, params = self._match_sql(terms)
+        sql = (f'SELECT content, score, thumbs_up_count, sentiment_category, review_date FROM sentiment_analysis '
+               f'WHERE app = ? AND id IN ({match_sql}) ORDER BY review_date DESC')
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        return self.query(sql, [app] + params)
+
+    def count_matching(self, app, *terms):
+        match_sql, params = self._match_sql(terms)
+        return self.conn.execute(f'SELECT COUNT(*) FROM reviews WHERE app = ? AND id IN ({match_sql})',
+                                 [app] + params).fetchone()[0]
+
+    # ---- views ----
+
+    def sentiment_distribution(self, app):
+        return self.query("""
+            SELECT
+                sentiment_category,
+                COUNT(*) AS review_count,
+                ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM reviews WHERE app = :app), 2) AS percentage
+            FROM sentiment_analysis
+            WHERE app = :app
+            GROUP BY sentiment_category
+            ORDER BY percentage DESC
+        """, {'app': app})
+
+    def daily_sentiment_trend(self, app, start=None, end=None):
+        # start / end: inclusive review days, 'YYYY-MM-DD'
+        return self.query("""
+            SELECT
+                DATE(review_date) AS review_day,
+                COUNT(*) AS total_reviews,
+                ROUND(AVG(score), 2) AS avg_rating,
+                SUM(CASE WHEN sentiment_category = 'Positive' THEN 1 ELSE 0 END) AS positive_reviews,
+                SUM(CASE WHEN sentiment_category = 'Neutral' THEN 1 ELSE 0 END) AS neutral_reviews,
+                SUM(CASE WHEN sentiment_category = 'Negative' THEN 1 ELSE 0 END) AS negative_reviews,
+                ROUND(SUM(CASE WHEN sentiment_category = 'Positive' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) AS positive_percentage
+            FROM sentiment_analysis
+            WHERE app = :app AND review_date >= :start AND review_date < :end
+            GROUP BY review_day
+            ORDER BY review_day DESC
+        """, {'app': app, 'start': start or '', 'end': f'{end} 99' if end else '9999'})
+
+    def version_performance(self, app):
+        return self.query("""
+            SELECT
+                review_created_version,
+                app_version,
+                COUNT(*) AS total_reviews,
+                ROUND(AVG(score), 2) AS avg_rating,
+                SUM(CASE WHEN sentiment_category = 'Positive' THEN 1 ELSE 0 END) AS positive_reviews,
+                SUM(CASE WHEN sentiment_category = 'Negative' THEN 1 ELSE 0 END) AS negative_reviews,
+                ROUND(SUM(CASE WHEN sentiment_category = 'Positive' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) AS positive_percentage
+            FROM sentiment_analysis
+            WHERE app = :app
+            GROUP BY review_created_version, app_version
+            ORDER BY avg_rating DESC
+        """, {'app': app})
+
+    def most_helpful_reviews(self, app, limit=10):
+        return self.query("""
+            SELECT content, score, thumbs_up_count, sentiment_category, review_date
+            FROM sentiment_analysis
+            WHERE app = :app
+            ORDER BY thumbs_up_count DESC, score DESC
+            LIMIT :limit
+        """, {'app': app, 'limit': limit})
+
+    def language_analysis(self, app, terms=LOCAL_LANGUAGE_TERMS):
+        match_sql, params = self._match_sql(terms)
+        return self.query(f"""
+            SELECT
+                CASE WHEN id IN ({match_sql}) THEN 'Hindi/Local' ELSE 'English' END AS language,
+                COUNT(*) AS review_count,
+                ROUND(AVG(score), 2) AS avg_rating,
+                ROUND(SUM(CASE WHEN sentiment_category = 'Positive' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) AS positive_percentage
+            FROM sentiment_analysis
+            WHERE app = ?
+            GROUP BY language
+            ORDER BY review_count DESC
+        """, params + [app])
+
+    def word_frequency(self, app, limit=30, max_words=10, min_length=4, stop_words=STOP_WORDS):
+        # Words among each review's first max_words, as in the view
+        stop = ', '.join('?' * len(stop_words))
+        return self.query(f"""
+            SELECT
+                w.word,
+                COUNT(*) AS frequency,
+                ROUND(AVG(r.score), 2) AS avg_rating,
+                ROUND(SUM(CASE WHEN r.score > 3 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) AS positive_percentage
+            FROM review_words w
+            JOIN reviews r ON r.id = w.review
+            WHERE w.app = ? AND w.position < ? AND LENGTH(w.word) >= ? AND w.word NOT IN ({stop})
+            GROUP BY w.word
+            HAVING COUNT(*) > 1
+            ORDER BY frequency DESC
+            LIMIT ?
+        """, [app, max_words, min_length] + list(stop_words) + [limit])
+
+    def summary(self):
+        return self.query('SELECT app, COUNT(*) AS reviews, MIN(at) AS first_review, MAX(at) AS last_review '
+                          'FROM reviews GROUP BY app ORDER BY app')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load the Play Store reviews into the local review warehouse and print its views')
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--review-root', default=None)
+    parser.add_argument('--apps', nargs='+', default=list(REVIEW_FILES), choices=list(REVIEW_FILES))
+    parser.add_argument('--from-store', default=None, help='load from a ReviewStore directory instead of the CSVs')
+    parser.add_argument('--search', nargs='+', default=None)
+    args = parser.parse_args(argv)
+
+    warehouse = ReviewWarehouse(args.db, args.review_root)
+    start = time.perf_counter()
+    if args.from_store:
+        from .review_store import ReviewStore
+        loaded = warehouse.load_store(ReviewStore(args.from_store), args.apps)
+    else:
+        loaded = {app: warehouse.load_csv(app) for app in args.apps}
+    print(f"Loaded {sum(loaded.values()):,} new reviews in {time.perf_counter() - start:.2f}s into {warehouse.path}")
+    print(warehouse.summary().to_string(index=False))
+
+    with pd.option_context('display.width', 160, 'display.max_colwidth', 60):
+        for app in args.apps:
+            print(f"\n======= {app} =======")
+            if args.search:
+                print(f"\nReviews mentioning {' / '.join(args.search)}: {warehouse.count_matching(app, *args.search):,}")
+                print(warehouse.search(app, *args.search, limit=5).to_string(index=False))
+                continue
+            for name in ['sentiment_distribution', 'language_analysis', 'most_helpful_reviews', 'word_frequency']:
+                print(f"\n{name}")
+                print(getattr(warehouse, name)(app).to_string(index=False))
+            print("\ndaily_sentiment_trend (last 7 days)")
+            print(warehouse.daily_sentiment_trend(app).head(7).to_string(index=False))
+            print("\nversion_performance (top 10)")
+            print(warehouse.version_performance(app).head(10).to_string(index=False))
+    warehouse.close()
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Review Warehouse =======
@@ -0,0 +1,234 @@
+# ======= BharatPe Review Keyword Classifier =======
+#
+# Python version of the pain-point CASE cascade and the feature_mentions view
+# from the "* analysis SQL queries.sql" files. Every keyword from every
+# category and the feature list is compiled into a single trie-shaped regex
+# (so each position costs one character-class test, not one test per
+# keyword), and the lower-cased reviews are scanned once as one
+# newline-joined string. That single pass yields each review's issue category
+# (the first CASE branch with a matching keyword, as in SQL) and the set of
+# features it mentions, instead of up to ~200 LIKE scans per review plus a
+# reviews x features join.
+#
+#     reviews = read_reviews('paytm')
+#     result = review_keyword_analysis(reviews, app='paytm')
+#     result['pain_points'], result['feature_mentions']
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from .config import REVIEW_FILES, review_path
+
+# In CASE order: a review gets the first category with any matching keyword
+ISSUE_CATEGORIES = [
+    ('Payment & Settlement Issues', ['payment', 'settlement', 'hold', 'credited', 'transfer', 'refund', 'pending', 'delay', 'processing']),
+    ('Loan Issues', ['loan', 'interest', 'emi', 'cibil', 'rejected', 'disburse', 'overdue', 'repayment', 'penalty', 'application', 'loan not given', 'no loan', 'loan rejection']),
+    ('Customer Support Issues', ['customer care', 'support', 'help', 'response', 'call', 'chat', 'service center', 'representative', 'agent', 'no support', 'no help', 'not responding', 'call disconnect', 'response delay']),
+    ('App Performance Issues', ['app not working', 'crash', 'slow', 'login', 'error', 'bug', 'freeze', 'hang', 'not opening', 'unresponsive', 'not working', 'audio', 'app not open', 'app didnt open']),
+    ('Technical Glitches', ['technical', 'glitch', 'network', 'server', 'connectivity', 'system', 'issue', 'failure']),
+    ('Hidden Charges / Fees', ['charge', 'fees', 'rental', 'hidden', 'deduct', 'penalty', 'extra', 'cost', 'amount']),
+    ('Equipment Issues', ['speaker', 'machine', 'device', 'swipe', 'pos', 'equipment', 'scanner']),
+    ('Fraud / Trust Concerns', ['fraud', 'cheat', 'fake', 'scam', 'misuse', 'crook', 'thief', 'ripoff', 'froud']),
+    ('Notification Problems', ['notification', 'voice alert', 'alert', 'sms', 'message', 'alert sound']),
+    ('KYC / Verification Issues', ['kyc', 'verification', 'document', 'reject', 'approval', 'dispute', 'identity', 'upload', 'document upload', 'document rejection', 'verification delay']),
+    ('Account Blocking Issues', ['blocked', 'block', 'disable', 'account locked', 'suspended', 'account freeze']),
+    ('Misleading Sales & Offers', ['sales', 'offer', 'misleading', 'promotion', 'target', 'agent', 'marketing']),
+    ('Process & Policy Complaints', ['policy', 'process', 'rule', 'terms', 'condition', 'procedure', 'guideline', 'requirement']),
+    ('Communication Issues', ['communication', 'call disconnect', 'response delay', 'no reply', 'not answering', 'contact', 'no response', 'no answer']),
+    ('General Service Complaints', ['service', 'poor', 'bad', 'worst', 'not good', 'unsatisfactory', 'unsupportive']),
+    ('Privacy & Security Concerns', ['privacy', 'data leak', 'security', 'permission', 'access']),
+    ('Feature Requests & UI Issues', ['feature request', 'missing feature', 'improvement', 'suggestion', 'ui', 'user interface']),
+    ('Loan Approval & Eligibility Issues', ['loan approval', 'eligibility', 'waiting time', 'disbursal', 'application']),
+    ('Account Management Issues', ['account update', 'profile', 'change details', 'update', 'modify']),
+    ('Refund Issues', ['refund delay', 'refund not received', 'money stuck', 'not credited', 'payment not received']),
+    ('Cancellation / Withdrawal Issues', ['cancel', 'cancellation', 'withdraw', 'stop', 'terminate']),
+    ('Delay & Waiting Time Issues', ['delay', 'waiting', 'slow', 'waiting time']),
+    ('General Complaints', ['complaint', 'issue', 'problem', 'bad experience', 'unsatisfactory', 'disappointed', 'frustrated'])
+]
+OTHER_ISSUES = 'Other Issues'
+
+COMMON_FEATURES = [
+    'UPI', 'payment device', 'voice alert', 'business loan', 'loan approval', 'credit card',
+    'QR code', 'merchant', 'settlement', 'customer care', 'app', 'scanner', 'payment',
+    'transaction', 'cashback', 'support', 'service'
+]
+TRAILING_FEATURES = ['refund', 'disbursement', 'loan rejection', 'penalty', 'feature request']
+
+# The feature list of each app's feature_mentions view
+APP_FEATURES = {
+    'bharatpe': COMMON_FEATURES + ['bharatpe', 'vyapari', 'experience'] + TRAILING_FEATURES,
+    'paytm': COMMON_FEATURES + ['paytm', 'wallet'] + TRAILING_FEATURES,
+    'phonepe': COMMON_FEATURES + ['phonepe', 'wallet'] + TRAILING_FEATURES
+}
+
+REVIEW_COLUMNS = ['reviewId', 'content', 'score', 'thumbsUpCount', 'reviewCreatedVersion', 'at', 'appVersion']
+SENTIMENTS = ['Negative', 'Neutral', 'Positive']
+
+
+def _trie_pattern(words):
+    # 'call|call disconnect|cancel' -> 'ca(?:ll(?: disconnect)?|ncel)'; greedy
+    # optional tails make every match the longest keyword at its position
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = (body if len(branches) > 1 or len(body) == 1 else '(?:' + body + ')') + '?'
+        return body
+
+    return build(trie)
+
+
+class ReviewClassifier:
+
+    def __init__(self, categories=ISSUE_CATEGORIES, features=()):
+        self.categories = [name for name, _ in categories] + [OTHER_ISSUES]
+        self.features = list(features)
+
+        # keyword -> (best CASE branch, bitmask of features) for that exact keyword
+        keywords = {}
+        for priority, (_, words) in enumerate(categories):
+            for word in words:
+                best, mask = keywords.get(word.lower(), (len(categories), 0))
+                keywords[word.lower()] = (min(best, priority), mask)
+        for bit, feature in enumerate(self.features):
+            best, mask = keywords.get(feature.lower(), (len(categories), 0))
+            keywords[feature.lower()] = (best, mask | (1 << bit))
+
+        # The scan reports one keyword per start position: the longest one.
+        # Every shorter keyword that is a prefix of it matches there too, so
+        # fold those in to get the same answer as testing every LIKE.
+        ordered = sorted(keywords, key=len, reverse=True)
+        self.keywords = ordered
+        self.keyword_priority = np.empty(len(ordered), dtype=np.int16)
+        self.keyword_features = np.zeros(len(ordered), dtype=np.int64)
+        for i, word in enumerate(ordered):
+            best, mask = keywords[word]
+            for other in ordered:
+                if len(other) < len(word) and word.startswith(other):
+                    best = min(best, keywords[other][0])
+                    mask |= keywords[other][1]
+            self.keyword_priority[i] = best
+            self.keyword_features[i] = mask
+
+        self._lookup = {word: i for i, word in enumerate(ordered)}
+        # Lookahead so overlapping matches (one per start position) are all seen
+        self.pattern = re.compile('(?=(' + _trie_pattern(ordered) + '))')
+
+    def scan(self, texts):
+        # One pass over all reviews; returns (category code per review, feature bitmask per review)
+        texts = pd.Series(texts).fillna('').astype(str).str.lower()
+        lengths = texts.str.len().to_numpy() + 1
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        corpus = '\n'.join(texts)
+
+        positions, keyword_ids = [], []
+        lookup = self._lookup
+        for match in self.pattern.finditer(corpus):
+            positions.append(match.start())
+            keyword_ids.append(lookup[match.group(1)])
+
+        review = np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side='right') - 1
+        keyword_ids = np.asarray(keyword_ids, dtype=np.int64)
+
+        codes = np.full(len(texts), len(self.categories) - 1, dtype=np.int16)
+        np.minimum.at(codes, review, self.keyword_priority[keyword_ids])
+        masks = np.zeros(len(texts), dtype=np.int64)
+        np.bitwise_or.at(masks, review, self.keyword_features[keyword_ids])
+        return codes, masks
+
+    def classify(self, texts):
+        codes, masks = self.scan(texts)
+        issue = pd.Categorical.from_codes(codes, categories=self.categories)
+        mentions = pd.DataFrame({
+            feature: (masks >> bit) & 1 == 1 for bit, feature in enumerate(self.features)
+        }, index=getattr(texts, 'index', None))
+        return issue, mentions
+
+
+_classifiers = {}
+
+
+def get_classifier(app=None):
+    # Compiled once per feature list
+    features = tuple(APP_FEATURES[app]) if app else ()
+    if features not in _classifiers:
+        _classifiers[features] = ReviewClassifier(features=features)
+    return _classifiers[features]
+
+
+def read_reviews(app, path=None, columns=REVIEW_COLUMNS):
+    reviews = pd.read_csv(path or review_path(app), usecols=lambda col: col in columns)
+    if 'at' in reviews.columns:
+        reviews['at'] = pd.to_datetime(reviews['at'], errors='coerce')
+    return reviews
+
+
+def sentiment_category(score):
+    # score <= 2 Negative, 3 Neutral, > 3 Positive
+    codes = np.select([score <= 2, score == 3, score > 3], [0, 1, 2], default=-1)
+    return pd.Categorical.from_codes(codes, categories=SENTIMENTS)
+
+
+def review_keyword_analysis(reviews, app):
+    classifier = get_classifier(app)
+    issue, mentions = classifier.classify(reviews['content'])
+    sentiment = sentiment_category(reviews['score'].to_numpy())
+
+    # feature_mentions: every (feature, review) pair where the review mentions it
+    sentiment_flags = pd.DataFrame({
+        f'{name.lower()}_sentiment_ratio': np.asarray(sentiment == name, dtype=float)
+        for name in ['Positive', 'Negative', 'Neutral']
+    })
+    score = reviews['score'].to_numpy(dtype=float)
+    counts = mentions.sum().to_numpy()
+    matrix = mentions.to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        feature_mentions = pd.DataFrame({
+            'feature': classifier.features,
+            'mention_count': counts,
+            'avg_rating': (matrix.T @ score) / counts,
+            **{col: (matrix.T @ flags.to_numpy()) / counts for col, flags in sentiment_flags.items()}
+        })
+    feature_mentions = feature_mentions[feature_mentions['mention_count'] > 0]
+    feature_mentions = feature_mentions.sort_values('mention_count', ascending=False, kind='stable')
+    feature_mentions = feature_mentions.round(2).reset_index(drop=True)
+
+    # pain_points_summary: issue categories over the negative reviews only
+    negative = np.asarray(sentiment == 'Negative')
+    issues = pd.DataFrame({'issue_category': issue[negative], 'score': reviews['score'].to_numpy()[negative]})
+    pain_points = issues.groupby('issue_category', observed=True).agg(
+        issue_count=('score', 'size'),
+        avg_score=('score', 'mean')
+    ).reset_index()
+    pain_points['percentage'] = pain_points['issue_count'] * 100.0 / max(len(issues), 1)
+    pain_points = pain_points.sort_values('issue_count', ascending=False, kind='stable')
+    pain_points = pain_points.round(2).reset_index(drop=True)
+
+    return {
+        'issue_category': issue,
+        'sentiment_category': sentiment,
+        'mentions': mentions,
+        'feature_mentions': feature_mentions,
+        'pain_points': pain_points
+    }
+
+
+def review_keyword_analysis_all(apps=tuple(REVIEW_FILES), review_root=None):
+    results = {}
+    for app in apps:
+        reviews = read_reviews(app, review_path(app, review_root))
+        results[app] = review_keyword_analysis(reviews, app)
+    return results
+
+# ======= End of BharatPe Review Keyword Classifier =======
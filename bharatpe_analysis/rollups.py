@@ -0,0 +1,394 @@
+# ======= BharatPe Transaction Rollup Store =======
+#
+# Pre-aggregated transaction counts and amounts per day, week (starting
+# Monday) and month, broken down by payment method, merchant segment
+# (business_category) and state, plus an overall 'all' series. Rollups live
+# on disk partitioned by date: daily rows in one file per month, weekly and
+# monthly rows in one file per year. The store is append-only by day: a
+# batch only adds days after the last stored day (earlier rows are skipped
+# and counted), and the weeks and months it touches are re-derived from the
+# daily rows, so re-running an interrupted append gives the same files.
+#
+# Trend queries never touch raw transactions. Each (granularity, dimension)
+# is held in memory as a dense period x value matrix with running totals, so
+# a rolling window of any length is one subtraction per period.
+#
+#     store = RollupStore('rollups')
+#     store.append(todays_transactions, merchants)
+#     store.series('state', freq='M', measure='amount')
+#     store.rolling('payment_method', 28, measure='txn_count', how='mean')
+#     store.method_trend(window=7)   # same layout as daily_method_pivot
+#
+# or python -m bharatpe_analysis.rollups --store rollups [--data-root DIR] [--window 7]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .loader import cache_format
+
+ROLLUP_VERSION = 1
+DIMENSIONS = {
+    'payment_method': 'payment_method',
+    'segment': 'business_category',
+    'state': 'state'
+}
+MERCHANT_COLUMNS = ['business_category', 'state']
+FREQS = ('D', 'W', 'M')
+MEASURES = ('txn_count', 'amount', 'avg_amount')
+ALL = 'all'
+UNKNOWN = 'Unknown'
+_FREQ_DIRS = {'D': 'daily', 'W': 'weekly', 'M': 'monthly'}
+_ROLLUP_COLUMNS = ['period', 'dimension', 'value', 'txn_count', 'amount']
+
+
+def _days(values):
+    return pd.to_datetime(values, errors='coerce').to_numpy().astype('datetime64[D]')
+
+
+def period_start(days, freq):
+    # First day of the week (Monday) or month holding each day
+    days = np.asarray(days, dtype='datetime64[D]')
+    if freq == 'D':
+        return days
+    if freq == 'M':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    # 1970-01-01 was a Thursday
+    offset = days.astype(np.int64) + 3
+    return (offset - offset % 7 - 3).astype('datetime64[D]')
+
+
+def _partition_key(periods, freq):
+    # Daily rows are partitioned by month, weekly and monthly rows by year
+    unit = 'datetime64[M]' if freq == 'D' else 'datetime64[Y]'
+    return np.asarray(periods, dtype='datetime64[D]').astype(unit).astype(str)
+
+
+def _period_range(first, last, freq):
+    if first is None:
+        return np.array([], dtype='datetime64[D]')
+    if freq == 'D':
+        return np.arange(first, last + 1, dtype='datetime64[D]')
+    if freq == 'M':
+        return np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    return np.arange(first, last + 1, 7, dtype='datetime64[D]')
+
+
+def daily_rollup(transactions, merchants=None):
+    # Long frame of (period, dimension, value, txn_count, amount) for each day
+    days = _days(transactions['transaction_date'])
+    valid = ~np.isnat(days)
+    amount = transactions['amount'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    labels = {'payment_method': transactions['payment_method'].astype(object).to_numpy()}
+    if merchants is not None:
+        labels.update(merchant_labels(transactions, merchants, MERCHANT_COLUMNS))
+
+    parts = [_group(days[valid], np.full(valid.sum(), ALL, dtype=object), amount[valid], ALL)]
+    for dimension, column in DIMENSIONS.items():
+        if column not in labels:
+            continue
+        values = np.where(pd.isna(labels[column]), UNKNOWN, labels[column]).astype(str)
+        parts.append(_group(days[valid], values[valid], amount[valid], dimension))
+    return pd.concat(parts, ignore_index=True)
+
+
+def merchant_labels(transactions, merchants, columns):
+    # Merchant attributes for every transaction row as object arrays; None
+    # for merchants not in the table (or rows with no merchant id)
+    codes, uniques = pd.factorize(transactions['merchant_id'])
+    rows = pd.Index(merchants['merchant_id']).get_indexer(uniques)
+    rows = np.where(codes >= 0, np.r_[rows, -1][codes], -1)
+    labels = {}
+    for column in columns:
+        values = merchants[column].astype(object).to_numpy()
+        labels[column] = np.where(rows >= 0, np.r_[values, None][rows], None)
+    return labels
+
+
+def _group(periods, values, amount, dimension):
+    grouped = pd.DataFrame({'period': periods, 'value': values, 'amount': amount}).groupby(
+        ['period', 'value'], sort=True
+    ).agg(txn_count=('amount', 'size'), amount=('amount', 'sum')).reset_index()
+    grouped.insert(1, 'dimension', dimension)
+    return grouped[_ROLLUP_COLUMNS]
+
+
+def _coarsen(daily, freq):
+    if freq == 'D' or daily.empty:
+        return daily
+    coarse = daily.assign(period=period_start(daily['period'].to_numpy(), freq))
+    return coarse.groupby(['period', 'dimension', 'value'], sort=True, as_index=False)[['txn_count', 'amount']].sum()[_ROLLUP_COLUMNS]
+
+
+class RollupStore:
+
+    def __init__(self, path):
+        self.path = path
+        self.format = cache_format()
+        self.manifest = {'version': ROLLUP_VERSION, 'format': self.format, 'first_day': None, 'last_day': None,
+                         'days': 0, 'rows_appended': 0, 'rows_skipped': 0, 'appends': []}
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('version') != ROLLUP_VERSION:
+                raise ValueError(f"{path} holds rollup store version {self.manifest.get('version')}, "
+                                 f"expected {ROLLUP_VERSION}; rebuild it")
+            self.format = self.manifest['format']
+        self._frames = {}
+        self._matrices = {}
+
+    # ----- partitions -----
+
+    def _partition_path(self, freq, key):
+        return os.path.join(self.path, _FREQ_DIRS[freq], f"{key}.{self.format}")
+
+    def _read_partition(self, path):
+        if self.format == 'feather':
+            return pd.read_feather(path)
+        if self.format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def _write_partition(self, df, freq, key):
+        path = self._partition_path(freq, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df = df.reset_index(drop=True)
+        tmp_path = f"{path}.tmp"
+        if self.format == 'feather':
+            df.to_feather(tmp_path)
+        elif self.format == 'parquet':
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def partitions(self, freq='D'):
+        directory = os.path.join(self.path, _FREQ_DIRS[freq])
+        if not os.path.isdir(directory):
+            return []
+        suffix = f".{self.format}"
+        return sorted(name[:-len(suffix)] for name in os.listdir(directory) if name.endswith(suffix))
+
+    def _load_partitions(self, freq, keys):
+        frames = [self._read_partition(self._partition_path(freq, key)) for key in keys
+                  if os.path.exists(self._partition_path(freq, key))]
+        if not frames:
+            return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in
+                                 zip(_ROLLUP_COLUMNS, ['datetime64[s]', str, str, np.int64, np.float64])})
+        return pd.concat(frames, ignore_index=True)
+
+    def frame(self, freq='D'):
+        # Every stored rollup row of one granularity
+        if freq not in FREQS:
+            raise ValueError(f"Unknown frequency {freq!r}, expected one of {FREQS}")
+        if freq not in self._frames:
+            self._frames[freq] = self._load_partitions(freq, self.partitions(freq))
+        return self._frames[freq]
+
+    # ----- appending -----
+
+    def new_rows(self, transactions):
+        # Rows dated after the last stored day
+        last_day = self.manifest['last_day']
+        if last_day is None or transactions.empty:
+            return transactions
+        return transactions[_days(transactions['transaction_date']) > np.datetime64(last_day)]
+
+    def append(self, transactions, merchants=None):
+        # Adds the days after the last stored one; returns what was written
+        start = time.perf_counter()
+        fresh = self.new_rows(transactions)
+        skipped = len(transactions) - len(fresh)
+        daily = daily_rollup(fresh, merchants)
+        summary = {'rows': len(fresh), 'rows_skipped': skipped, 'days': 0, 'partitions': 0}
+        if daily.empty:
+            self.manifest['rows_skipped'] += skipped
+            self._save_manifest()
+            return summary
+
+        last_day = self.manifest['last_day']
+        new_days = np.unique(daily['period'].to_numpy().astype('datetime64[D]'))
+        written = 0
+
+        # Daily partitions: keep what was there up to the last stored day (an
+        # interrupted append may have left later days behind) and add the batch
+        daily_keys = _partition_key(daily['period'].to_numpy(), 'D')
+        for key in np.unique(daily_keys):
+            existing = self._load_partitions('D', [key])
+            if last_day is not None:
+                existing = existing[existing['period'].to_numpy().astype('datetime64[D]') <= np.datetime64(last_day)]
+            self._write_partition(pd.concat([existing, daily[daily_keys == key]], ignore_index=True), 'D', key)
+            written += 1
+
+        # Weeks and months touched by the batch, re-derived from their daily rows
+        for freq in ('W', 'M'):
+            periods = np.unique(period_start(new_days, freq))
+            span_end = new_days.max()
+            span_start = periods.min()
+            source = self._load_partitions('D', np.unique(_partition_key(_period_range(span_start, span_end, 'D'), 'D')))
+            source = source[source['period'].to_numpy().astype('datetime64[D]') >= span_start]
+            coarse = _coarsen(source, freq)
+            coarse_keys = _partition_key(coarse['period'].to_numpy(), freq)
+            for key in np.unique(coarse_keys):
+                existing = self._load_partitions(freq, [key])
+                existing = existing[existing['period'].to_numpy().astype('datetime64[D]') < span_start]
+                self._write_partition(pd.concat([existing, coarse[coarse_keys == key]], ignore_index=True), freq, key)
+                written += 1
+
+        first_day = self.manifest['first_day']
+        self.manifest['first_day'] = str(new_days.min()) if first_day is None else first_day
+        self.manifest['last_day'] = str(new_days.max())
+        self.manifest['days'] += len(new_days)
+        self.manifest['rows_appended'] += len(fresh)
+        self.manifest['rows_skipped'] += skipped
+        self.manifest['appends'].append({'days': [str(new_days.min()), str(new_days.max())], 'rows': len(fresh),
+                                         'seconds': round(time.perf_counter() - start, 3)})
+        self._save_manifest()
+        self._frames = {}
+        self._matrices = {}
+        summary.update(days=len(new_days), partitions=written)
+        return summary
+
+    def _save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, 'manifest.json')
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    # ----- queries -----
+
+    def _matrix(self, dimension, freq):
+        # (periods, values, count matrix, amount matrix, running totals of both)
+        key = (dimension, freq)
+        if key not in self._matrices:
+            first, last = self.manifest['first_day'], self.manifest['last_day']
+            periods = _period_range(
+                None if first is None else period_start([np.datetime64(first)], freq)[0],
+                None if last is None else period_start([np.datetime64(last)], freq)[0],
+                freq
+            )
+            rows = self.frame(freq)
+            rows = rows[rows['dimension'] == dimension]
+            values = np.unique(rows['value'].to_numpy().astype(str))
+            row_index = np.searchsorted(periods, rows['period'].to_numpy().astype('datetime64[D]'))
+            col_index = np.searchsorted(values, rows['value'].to_numpy().astype(str))
+            counts = np.zeros((len(periods), len(values)), dtype=np.int64)
+            amounts = np.zeros((len(periods), len(values)), dtype=np.float64)
+            np.add.at(counts, (row_index, col_index), rows['txn_count'].to_numpy())
+            np.add.at(amounts, (row_index, col_index), rows['amount'].to_numpy())
+            zero = np.zeros((1, len(values)))
+            self._matrices[key] = (periods, values, counts, amounts,
+                                   np.vstack([zero, counts.cumsum(axis=0)]), np.vstack([zero, amounts.cumsum(axis=0)]))
+        return self._matrices[key]
+
+    def _window(self, start, end, periods, freq):
+        lo = 0 if start is None else np.searchsorted(periods, period_start([np.datetime64(pd.Timestamp(start), 'D')], freq)[0])
+        hi = len(periods) if end is None else np.searchsorted(periods, np.datetime64(pd.Timestamp(end), 'D'), side='right')
+        return lo, hi
+
+    def series(self, dimension, freq='D', measure='txn_count', start=None, end=None):
+        # period x value table of one measure, zero-filled for quiet periods
+        if dimension != ALL and dimension not in DIMENSIONS:
+            raise KeyError(f"Unknown dimension {dimension!r}, expected one of {[ALL] + list(DIMENSIONS)}")
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}, expected one of {MEASURES}")
+        periods, values, counts, amounts, _, _ = self._matrix(dimension, freq)
+        lo, hi = self._window(start, end, periods, freq)
+        if measure == 'txn_count':
+            data = counts[lo:hi]
+        elif measure == 'amount':
+            data = amounts[lo:hi]
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                data = amounts[lo:hi] / counts[lo:hi]
+        return pd.DataFrame(data, index=pd.DatetimeIndex(periods[lo:hi], name='period'),
+                            columns=pd.Index(values, name=dimension))
+
+    def rolling(self, dimension, window, freq='D', measure='txn_count', how='mean', start=None, end=None):
+        # Trailing window of `window` periods ending at each period. Like
+        # pandas' rolling(window), the first window - 1 periods of the store
+        # are NaN; avg_amount is total amount over total count in the window
+        if how not in ('sum', 'mean'):
+            raise ValueError(f"Unknown window aggregation {how!r}, expected 'sum' or 'mean'")
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}, expected one of {MEASURES}")
+        window = int(window)
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        periods, values, _, _, count_totals, amount_totals = self._matrix(dimension, freq)
+        lo, hi = self._window(start, end, periods, freq)
+        ends = np.arange(lo, hi) + 1
+        begins = np.maximum(ends - window, 0)
+
+        def window_sum(totals):
+            return totals[ends] - totals[begins]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if measure == 'avg_amount':
+                data = window_sum(amount_totals) / window_sum(count_totals)
+            else:
+                data = window_sum(count_totals if measure == 'txn_count' else amount_totals)
+                if how == 'mean':
+                    data = data / window
+        data = np.where((ends < window)[:, None], np.nan, data)
+        return pd.DataFrame(data, index=pd.DatetimeIndex(periods[lo:hi], name='period'),
+                            columns=pd.Index(values, name=dimension))
+
+    def method_trend(self, window=7, start=None, end=None):
+        # Daily transactions per payment method plus their trailing mean, laid
+        # out like feature_usage_analysis' daily_method_pivot
+        counts = self.series('payment_method', 'D', 'txn_count', start, end)
+        means = self.rolling('payment_method', window, 'D', 'txn_count', 'mean', start, end)
+        trend = counts.astype(np.float64)
+        for column in counts.columns:
+            trend[f"{column}_{window}d_ma"] = means[column]
+        trend.columns.name = None
+        trend.index.name = 'transaction_date_only'
+        return trend.reset_index()
+
+    def summary(self):
+        return {
+            'path': self.path,
+            'first_day': self.manifest['first_day'],
+            'last_day': self.manifest['last_day'],
+            'days': self.manifest['days'],
+            'rows_appended': self.manifest['rows_appended'],
+            'partitions': {_FREQ_DIRS[freq]: len(self.partitions(freq)) for freq in FREQS}
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append new transaction days to a BharatPe rollup store')
+    parser.add_argument('--store', required=True)
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--window', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from .loader import read_dataset
+
+    store = RollupStore(args.store)
+    merchants = read_dataset('merchants', args.data_root)
+    transactions = read_dataset('transactions', args.data_root)
+    written = store.append(transactions, merchants)
+    print(f"Appended {written['rows']:,} rows over {written['days']} days "
+          f"({written['rows_skipped']:,} already stored), {written['partitions']} partitions written")
+    print(store.summary())
+
+    start = time.perf_counter()
+    trend = store.method_trend(window=args.window)
+    elapsed = time.perf_counter() - start
+    print(f"\n=== Daily Payment Method Trend ({args.window}-day mean), {elapsed * 1000:.1f} ms ===")
+    print(trend.tail(10).round(1).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Transaction Rollup Store =======
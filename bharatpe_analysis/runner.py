@@ -0,0 +1,274 @@
+# ======= BharatPe Parallel Report Runner =======
+#
+# Runs the analyses as a dependency graph on a process pool. The shared
+# input frames are published once into shared memory (see shared_frames.py)
+# and every task maps its own read-only view of them, so in-place column
+# additions like is_churned or product_combo stay local to that task and
+# nothing large is pickled per task. The 'serial' executor runs the same
+# graph in-process on shallow copies, which is also what happens on a
+# single-core machine.
+#
+#     results, report = run_reports(load_datasets(), workers=4)
+#     print_timing_report(report)
+#
+# With output={'output_dir': 'runs', 'formats': ('parquet',)} every task that
+# writes files gets its own ReportWriter (see output.py) under
+# runs/<run_id>/<task>, and the task manifests are collected into the report.
+# With profile='rss' (or 'tracemalloc') each task runs under a Profiler (see
+# profiling.py) and its stage records come back in report['tasks'][name]['stages'].
+
+import contextlib
+import importlib
+import io
+import os
+import pickle
+import time
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .profiling import Profiler, stage
+
+DEFAULT_TASKS = {
+    'churn': {
+        'func': 'bharatpe_analysis.analysis:churn_analysis',
+        'inputs': ['merchants', 'interactions'],
+        'kwargs': {},
+        'after': []
+    },
+    'product_adoption': {
+        'func': 'bharatpe_analysis.analysis:product_adoption_analysis',
+        'inputs': ['merchants', 'enriched_merchants?'],
+        'kwargs': {'output_dir': 'product_adoption_output'},
+        'after': [],
+        'writes': True
+    },
+    'loan_performance': {
+        'func': 'bharatpe_analysis.analysis:loan_performance_analysis',
+        'inputs': ['merchants', 'loans', 'transactions?'],
+        'kwargs': {'output_dir': 'output'},
+        'after': [],
+        'writes': True
+    },
+    'feature_usage': {
+        'func': 'bharatpe_analysis.analysis:feature_usage_analysis',
+        'inputs': ['merchants', 'transactions'],
+        'kwargs': {},
+        'after': []
+    },
+    'feature_adoption': {
+        'func': 'bharatpe_analysis.feature_matrix:feature_adoption_analysis',
+        'inputs': ['feature_usage', 'merchants', 'loans?'],
+        'kwargs': {},
+        'after': []
+    }
+}
+
+
+def _resolve(func):
+    module_name, _, attr = func.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _input_name(name):
+    # A trailing '?' marks an optional input that is passed as None when missing
+    return name.rstrip('?'), name.endswith('?')
+
+
+def task_order(tasks):
+    # Kahn's algorithm; raises on unknown dependencies or cycles
+    pending = {name: set(spec.get('after', [])) for name, spec in tasks.items()}
+    for name, deps in pending.items():
+        unknown = deps - set(tasks)
+        if unknown:
+            raise ValueError(f"Task {name} depends on unknown tasks: {sorted(unknown)}")
+
+    order = []
+    while pending:
+        ready = sorted(name for name, deps in pending.items() if not deps)
+        if not ready:
+            raise ValueError(f"Dependency cycle between tasks: {sorted(pending)}")
+        for name in ready:
+            order.append(name)
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return order
+
+
+def _task_writer(name, spec, output, quiet):
+    if not output or not spec.get('writes'):
+        return None
+    from .output import ReportWriter
+
+    options = dict(output)
+    options.setdefault('echo', not quiet)
+    options['output_dir'] = os.path.join(options.pop('output_dir', 'output'), options.pop('run_id'))
+    return ReportWriter(run_id=name, **options)
+
+
+def _call_task(name, frames, spec, quiet, output=None, profile=None):
+    kwargs = dict(spec.get('kwargs', {}))
+    args = [frames.get(_input_name(arg)[0]) for arg in spec['inputs']]
+    writer = _task_writer(name, spec, output, quiet)
+    if writer is not None:
+        kwargs['writer'] = writer
+
+    stdout = io.StringIO() if quiet else None
+    profiler = Profiler(memory=profile if isinstance(profile, str) else 'rss') if profile else None
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    with profiler if profiler is not None else contextlib.nullcontext():
+        with contextlib.redirect_stdout(stdout) if quiet else contextlib.nullcontext():
+            result = _resolve(spec['func'])(*args, **kwargs)
+        compute_s = time.perf_counter() - start
+        timing = {'pid': os.getpid()}
+        if writer is not None:
+            with stage('write_outputs'):
+                timing['output'] = writer.close()
+    timing['wall_s'] = time.perf_counter() - start
+    timing['cpu_s'] = time.process_time() - cpu_start
+    timing['compute_s'] = compute_s
+    if profiler is not None:
+        timing['stages'] = profiler.records
+    return result, timing
+
+
+def _run_in_worker(name, spec, frame_specs, quiet, output, profile=None):
+    from .shared_frames import attach_frame, close_attached
+
+    attached = []
+    start = time.perf_counter()
+    try:
+        frames = {key: attach_frame(frame_spec, attached) for key, frame_spec in frame_specs.items()}
+        attach_s = time.perf_counter() - start
+        result, timing = _call_task(name, frames, spec, quiet, output, profile)
+        timing['attach_s'] = attach_s
+        del frames
+        # Results often slice the input frames, so they still view the shared
+        # segments; pickling here copies them out and lets close() succeed
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        del result
+        return name, payload, timing
+    finally:
+        close_attached(attached)
+
+
+def _missing_inputs(spec, datasets):
+    return [
+        base for base, optional in map(_input_name, spec['inputs'])
+        if not optional and datasets.get(base) is None
+    ]
+
+
+def run_reports(datasets, tasks=None, workers=None, executor='process', quiet=False, output=None, profile=None):
+    tasks = tasks or DEFAULT_TASKS
+    if output:
+        output = dict(output)
+        output.setdefault('run_id', datetime.now().strftime("run_%Y%m%d_%H%M%S"))
+    order = task_order(tasks)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        executor = 'serial'
+
+    results, timings, skipped = {}, {}, {}
+    runnable = {}
+    for name in order:
+        missing = _missing_inputs(tasks[name], datasets)
+        blocked = [dep for dep in tasks[name].get('after', []) if dep in skipped]
+        if missing or blocked:
+            skipped[name] = f"missing inputs {missing}" if missing else f"depends on skipped {blocked}"
+        else:
+            runnable[name] = tasks[name]
+
+    wall_start = time.perf_counter()
+    publish_s = 0.0
+    shared_bytes = 0
+
+    if executor == 'serial':
+        for name in order:
+            if name not in runnable:
+                continue
+            # Shallow copies: tasks can add or replace columns without touching the shared frames
+            frames = {key: df.copy(deep=False) for key, df in datasets.items() if df is not None}
+            results[name], timings[name] = _call_task(name, frames, runnable[name], quiet, output, profile)
+    elif executor == 'process':
+        from .shared_frames import publish_frame
+
+        needed = {_input_name(inp)[0] for spec in runnable.values() for inp in spec['inputs']}
+        owners = {}
+        try:
+            publish_start = time.perf_counter()
+            for key in needed:
+                if datasets.get(key) is not None:
+                    owners[key] = publish_frame(datasets[key])
+            publish_s = time.perf_counter() - publish_start
+            shared_bytes = sum(owner.nbytes for owner in owners.values())
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                remaining = {name: set(spec.get('after', [])) for name, spec in runnable.items()}
+                running = {}
+                while remaining or running:
+                    for name in [name for name, deps in remaining.items() if not deps]:
+                        spec = runnable[name]
+                        frame_specs = {
+                            _input_name(inp)[0]: owners[_input_name(inp)[0]].spec
+                            for inp in spec['inputs'] if _input_name(inp)[0] in owners
+                        }
+                        running[pool.submit(_run_in_worker, name, spec, frame_specs, quiet, output, profile)] = name
+                        del remaining[name]
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished = running.pop(future)
+                        _, payload, timings[finished] = future.result()
+                        results[finished] = pickle.loads(payload)
+                        for deps in remaining.values():
+                            deps.discard(finished)
+        finally:
+            for owner in owners.values():
+                owner.close()
+    else:
+        raise ValueError(f"Unknown executor {executor!r}, expected 'process' or 'serial'")
+
+    wall_s = time.perf_counter() - wall_start
+    task_s = sum(timing['wall_s'] for timing in timings.values())
+    report = {
+        'executor': executor,
+        'workers': workers if executor == 'process' else 1,
+        'wall_s': wall_s,
+        'sum_task_s': task_s,
+        'speedup': task_s / wall_s if wall_s else float('nan'),
+        'publish_s': publish_s,
+        'shared_mb': shared_bytes / 1e6,
+        'tasks': timings,
+        'skipped': skipped
+    }
+    if output:
+        report['run_dir'] = os.path.join(output.get('output_dir', 'output'), output['run_id'])
+    return results, report
+
+
+def print_timing_report(report):
+    print(f"\nExecutor: {report['executor']} ({report['workers']} workers)")
+    if report['executor'] == 'process':
+        print(f"Shared memory: {report['shared_mb']:.1f} MB published in {report['publish_s']:.3f}s")
+    for name, timing in report['tasks'].items():
+        print(f"  {name:<20} {timing['wall_s']:8.3f}s wall {timing['cpu_s']:8.3f}s cpu  (pid {timing['pid']})")
+        if 'output' in timing:
+            manifest = timing['output']
+            print(f"  {'':<20} {len(manifest['files'])} files, {manifest['total_bytes'] / 1e6:.2f} MB, "
+                  f"{manifest['total_write_s']:.3f}s writing, {manifest['close_wait_s']:.3f}s waited on close")
+    for name, reason in report['skipped'].items():
+        print(f"  {name:<20} skipped: {reason}")
+    print(f"Sum of task times: {report['sum_task_s']:.3f}s")
+    print(f"Wall-clock time:   {report['wall_s']:.3f}s")
+    print(f"Speedup:           {report['speedup']:.2f}x")
+    if 'run_dir' in report:
+        print(f"Outputs:           {report['run_dir']}")
+
+
+def stage_records(report):
+    # Every task's stage records, in task order
+    return [record for timing in report['tasks'].values() for record in timing.get('stages', [])]
+
+# ======= End of BharatPe Parallel Report Runner =======
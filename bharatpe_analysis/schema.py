@@ -0,0 +1,136 @@
+# ======= BharatPe Table Schemas =======
+#
+# One entry per table: the dtype each column is read as, the Yes/No flag
+# columns that become real booleans and the date columns parsed at read time.
+# Columns missing from a file are ignored, extra columns fall back to pandas'
+# own inference. Bump SCHEMA_VERSION whenever a schema changes so stale
+# binary caches are rebuilt.
+
+SCHEMA_VERSION = 1
+
+# Placeholder resolved by id_dtype(); ids are high-cardinality so they are
+# stored as Arrow strings rather than categoricals when pyarrow is present
+ID_DTYPE = 'id'
+
+SCHEMAS = {
+    'merchants': {
+        'dtypes': {
+            'merchant_id': ID_DTYPE,
+            'business_name': ID_DTYPE,
+            'business_category': 'category',
+            'subcategory': 'category',
+            'state': 'category',
+            'district': 'category',
+            'city': 'category',
+            'tier': 'category',
+            'pin_code': 'int32',
+            'acquisition_channel': 'category',
+            'device_type': 'category',
+            'active_status': 'category',
+            'loans_taken': 'int8',
+            'current_loan_status': 'category',
+            'monthly_transaction_count': 'int32',
+            'monthly_transaction_value': 'int32',
+            'avg_ticket_size': 'float32'
+        },
+        'flags': ['qr_displayed', 'soundbox_adopted', 'swipe_machine'],
+        'dates': ['onboarding_date', 'last_transaction_date']
+    },
+    'enriched_merchants': {
+        'dtypes': {
+            'merchant_id': ID_DTYPE,
+            'business_category': 'category',
+            'state': 'category',
+            'tier': 'category',
+            'acquisition_channel': 'category',
+            'active_status': 'category'
+        },
+        'flags': ['qr_displayed', 'soundbox_adopted', 'swipe_machine'],
+        'dates': ['onboarding_date', 'last_transaction_date']
+    },
+    'transactions': {
+        'dtypes': {
+            'transaction_id': ID_DTYPE,
+            'merchant_id': ID_DTYPE,
+            'amount': 'float64',
+            'payment_method': 'category'
+        },
+        'flags': [],
+        'dates': ['transaction_date']
+    },
+    'interactions': {
+        'dtypes': {
+            'interaction_id': ID_DTYPE,
+            'merchant_id': ID_DTYPE,
+            'category': 'category',
+            'issue': 'category',
+            'channel': 'category',
+            'resolution_status': 'category',
+            'resolution_time_days': 'float32'
+        },
+        'flags': [],
+        'dates': ['date']
+    },
+    'loans': {
+        'dtypes': {
+            'loan_id': ID_DTYPE,
+            'merchant_id': ID_DTYPE,
+            'loan_type': 'category',
+            'loan_amount': 'int32',
+            'interest_rate': 'float32',
+            'loan_term_months': 'int16',
+            'monthly_installment': 'int32',
+            'amount_paid': 'float64',
+            'remaining_amount': 'float64',
+            'status': 'category'
+        },
+        'flags': [],
+        'dates': ['approval_date', 'end_date']
+    },
+    'feature_usage': {
+        'dtypes': {
+            'merchant_id': ID_DTYPE,
+            'feature': 'category',
+            'monthly_frequency': 'int16'
+        },
+        'flags': ['is_used'],
+        'dates': []
+    }
+}
+
+FLAG_TRUE_VALUES = ['Yes', 'yes', 'YES', 'True', 'true', 'TRUE']
+FLAG_FALSE_VALUES = ['No', 'no', 'NO', 'False', 'false', 'FALSE']
+
+
+def id_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'object'
+    return 'string[pyarrow]'
+
+
+def read_csv_kwargs(name, columns):
+    # Builds pd.read_csv keyword arguments for the columns actually present
+    schema = SCHEMAS.get(name, {'dtypes': {}, 'flags': [], 'dates': []})
+    present = set(columns)
+
+    ids = id_dtype()
+    dtypes = {
+        col: ids if dtype == ID_DTYPE else dtype
+        for col, dtype in schema['dtypes'].items() if col in present
+    }
+    for col in schema['flags']:
+        if col in present:
+            dtypes[col] = 'bool'
+
+    kwargs = {
+        'dtype': dtypes,
+        'parse_dates': [col for col in schema['dates'] if col in present]
+    }
+    if any(col in present for col in schema['flags']):
+        kwargs['true_values'] = FLAG_TRUE_VALUES
+        kwargs['false_values'] = FLAG_FALSE_VALUES
+    return kwargs
+
+# ======= End of BharatPe Table Schemas =======
@@ -0,0 +1,177 @@
+# ======= BharatPe Shared-Memory DataFrames =======
+#
+# Publishes a DataFrame's column buffers into multiprocessing shared memory
+# so worker processes can map them instead of unpickling a copy. Numeric,
+# boolean and datetime columns are shared as raw NumPy buffers, categoricals
+# as shared codes plus their (small) categories, and strings as Arrow
+# offset/data buffers. Workers get read-only arrays: an analysis can add or
+# replace columns on its own frame but can never write into the shared data.
+# Anything else falls back to being pickled with the spec.
+
+import pickle
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+class SharedFrameOwner:
+    # Parent-side handle: keeps the segments alive until close()
+
+    def __init__(self, spec, segments):
+        self.spec = spec
+        self.segments = segments
+
+    @property
+    def nbytes(self):
+        return sum(segment.size for segment in self.segments)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments = []
+
+
+def _share_buffer(data, segments):
+    data = memoryview(data).cast('B')
+    segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    segment.buf[:len(data)] = data
+    segments.append(segment)
+    return {'name': segment.name, 'size': len(data)}
+
+
+def _share_array(array, segments):
+    array = np.ascontiguousarray(array)
+    return {
+        'buffer': _share_buffer(array.view(np.uint8).reshape(-1), segments),
+        'dtype': array.dtype.str,
+        'shape': array.shape
+    }
+
+
+def _share_arrow_strings(series, segments):
+    import pyarrow as pa
+
+    array = pa.array(series, from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.offset != 0 or not (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)):
+        return None
+
+    validity, offsets, data = array.buffers()
+    return {
+        'type': 'large_string' if pa.types.is_large_string(array.type) else 'string',
+        'length': len(array),
+        'null_count': array.null_count,
+        'validity': _share_buffer(validity, segments) if validity is not None else None,
+        'offsets': _share_buffer(offsets, segments),
+        'data': _share_buffer(data, segments) if data is not None else None
+    }
+
+
+def _column_spec(series, segments):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {
+            'kind': 'categorical',
+            'codes': _share_array(series.cat.codes.to_numpy(), segments),
+            'dtype': pickle.dumps(dtype)
+        }
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return {'kind': 'numpy', 'array': _share_array(series.to_numpy(), segments)}
+
+    is_string = pd.api.types.is_string_dtype(dtype) and (
+        dtype != object or pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty')
+    )
+    if is_string:
+        try:
+            arrow = _share_arrow_strings(series, segments)
+        except ImportError:
+            arrow = None
+        if arrow is not None:
+            return {'kind': 'arrow_string', 'arrow': arrow, 'dtype': pickle.dumps(dtype)}
+
+    return {'kind': 'pickled', 'values': pickle.dumps(series.to_numpy(), protocol=pickle.HIGHEST_PROTOCOL),
+            'dtype': pickle.dumps(dtype)}
+
+
+def publish_frame(df):
+    segments = []
+    try:
+        spec = {
+            'columns': [(name, _column_spec(df[name], segments)) for name in df.columns],
+            'index': None if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+            else pickle.dumps(df.index),
+            'length': len(df)
+        }
+    except BaseException:
+        SharedFrameOwner(None, segments).close()
+        raise
+    return SharedFrameOwner(spec, segments)
+
+
+# ----- worker side -----
+
+def _attach_buffer(ref, attached):
+    segment = shared_memory.SharedMemory(name=ref['name'])
+    attached.append(segment)
+    return segment.buf[:ref['size']]
+
+
+def _attach_array(ref, attached):
+    buffer = _attach_buffer(ref['buffer'], attached)
+    array = np.frombuffer(buffer, dtype=np.dtype(ref['dtype'])).reshape(ref['shape'])
+    array.flags.writeable = False
+    return array
+
+
+def _attach_arrow_strings(ref, dtype, attached):
+    import pyarrow as pa
+
+    buffers = [
+        pa.py_buffer(_attach_buffer(ref[key], attached)) if ref[key] is not None else None
+        for key in ('validity', 'offsets', 'data')
+    ]
+    arrow_type = pa.large_string() if ref['type'] == 'large_string' else pa.string()
+    array = pa.Array.from_buffers(arrow_type, ref['length'], buffers, ref['null_count'])
+    try:
+        return pd.array(array, dtype=dtype)
+    except (TypeError, ValueError):
+        return pd.array(array.to_numpy(zero_copy_only=False), dtype=dtype)
+
+
+def attach_frame(spec, attached):
+    # attached collects the SharedMemory handles; the caller closes them once
+    # the frame (and anything viewing it) is no longer needed
+    columns = {}
+    for name, column in spec['columns']:
+        kind = column['kind']
+        if kind == 'numpy':
+            columns[name] = _attach_array(column['array'], attached)
+        elif kind == 'categorical':
+            columns[name] = pd.Categorical.from_codes(
+                _attach_array(column['codes'], attached), dtype=pickle.loads(column['dtype'])
+            )
+        elif kind == 'arrow_string':
+            columns[name] = _attach_arrow_strings(column['arrow'], pickle.loads(column['dtype']), attached)
+        else:
+            columns[name] = pd.array(pickle.loads(column['values']), dtype=pickle.loads(column['dtype']))
+
+    index = pickle.loads(spec['index']) if spec['index'] is not None else pd.RangeIndex(spec['length'])
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def close_attached(attached):
+    for segment in attached:
+        try:
+            segment.close()
+        except BufferError:
+            # Something still views the buffer; the mapping goes away with the process
+            pass
+    attached.clear()
+
+# ======= End of BharatPe Shared-Memory DataFrames =======
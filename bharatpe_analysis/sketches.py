@@ -0,0 +1,529 @@
+# ======= BharatPe Streaming Sketches =======
+#
+# Fixed-size summaries for numbers that otherwise need every raw row:
+#
+#   KLLSketch     approximate quantiles (KLL compactors; rank error around
+#                 1.7 / k, so about 1% with the default k=200). Count, min
+#                 and max are exact.
+#   HyperLogLog   approximate distinct counts (2**p one-byte registers,
+#                 standard error 1.04 / sqrt(2**p): 1.6% with p=12).
+#
+# Both are built chunk by chunk and merged, so partials from separate files,
+# chunks or processes combine into the sketch of the whole. dumps() / loads()
+# turn any sketch (or the grouped collections below) into bytes for storage.
+#
+#     sketches = ResolutionSketches()
+#     for chunk in loader.iter_dataset('interactions', chunksize=100_000):
+#         sketches.update(chunk)
+#     sketches.quantiles('category')                  # p50 / p90 / p99 per category
+#     active = ActiveMerchantSketches().update(transactions, merchants)
+#     active.distinct(['state'])                      # distinct merchants per state
+#     active.distinct(['day'], start='2025-05-01')    # daily active merchants
+#     blob = dumps(sketches); sketches.merge(loads(blob))
+#
+# Values are hashed with pandas' stable hash (hash_pandas_object), so the
+# same ids hash the same way in every process and run.
+
+import argparse
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 200
+DEFAULT_P = 12
+QUANTILES = (0.5, 0.9, 0.99)
+UNKNOWN = 'Unknown'
+RESOLUTION_GROUPINGS = {
+    'category': ['category'],
+    'channel': ['channel'],
+    'resolution_status': ['resolution_status']
+}
+_MAGIC = b'BPSK'
+_HEADER = struct.Struct('<4sI')
+
+
+# ----- serialization -----
+
+def dumps(sketch):
+    header, arrays = sketch.state()
+    header = dict(header, kind=type(sketch).__name__,
+                  arrays=[(array.dtype.str, array.shape) for array in arrays])
+    encoded = json.dumps(header).encode()
+    return _HEADER.pack(_MAGIC, len(encoded)) + encoded + b''.join(np.ascontiguousarray(a).tobytes() for a in arrays)
+
+
+def loads(data):
+    magic, length = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("Not a serialized BharatPe sketch")
+    offset = _HEADER.size
+    header = json.loads(data[offset:offset + length])
+    offset += length
+    arrays = []
+    for dtype, shape in header['arrays']:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        arrays.append(np.frombuffer(data, dtype=dtype, count=size // dtype.itemsize, offset=offset).reshape(shape).copy())
+        offset += size
+    kinds = {cls.__name__: cls for cls in (KLLSketch, HyperLogLog, GroupedQuantiles, GroupedDistinct,
+                                           ResolutionSketches, ActiveMerchantSketches)}
+    if header['kind'] not in kinds:
+        raise ValueError(f"Unknown sketch kind {header['kind']!r}")
+    return kinds[header['kind']].from_state(header, arrays)
+
+
+# ----- quantiles -----
+
+class KLLSketch:
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Level h items weigh 2**h; capacities shrink by 2/3 going down from the top level
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for h, items in enumerate(self.levels):
+                if len(items) <= self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind; of each remaining pair one
+                # survives, at twice the weight, chosen by a random offset
+                leftover = items[:len(items) % 2]
+                paired = items[len(leftover):]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[h] = leftover
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                break
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << h, dtype=np.int64) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        # Smallest retained value whose estimated rank reaches q * n; q may be a list
+        scalar = np.ndim(q) == 0
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.n == 0:
+            result = np.full(len(q), np.nan)
+        else:
+            items, ranks = self._weighted()
+            positions = np.searchsorted(ranks, np.maximum(q, 0) * self.n, side='left')
+            result = items[np.minimum(positions, len(items) - 1)]
+            result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result[0] if scalar else result
+
+    def rank(self, value):
+        # Estimated fraction of values <= value
+        if self.n == 0:
+            return np.nan
+        items, ranks = self._weighted()
+        position = np.searchsorted(items, value, side='right')
+        return ranks[position - 1] / self.n if position else 0.0
+
+    def nbytes(self):
+        return sum(items.nbytes for items in self.levels)
+
+    def state(self):
+        header = {'k': self.k, 'seed': self.seed, 'n': self.n, 'min': float(self.min), 'max': float(self.max)}
+        return header, list(self.levels)
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        sketch = cls(header['k'], header['seed'])
+        sketch.n, sketch.min, sketch.max = header['n'], header['min'], header['max']
+        sketch.levels = list(arrays) or [np.empty(0)]
+        return sketch
+
+
+# ----- distinct counts -----
+
+def hash_values(values):
+    # 64-bit hashes that do not depend on the process or the dtype's storage
+    return pd.util.hash_pandas_object(pd.Series(values).reset_index(drop=True), index=False).to_numpy()
+
+
+def _register_updates(hashes, p):
+    # Register index from the top p bits, rank = 1 + leading zeros of the rest
+    index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    # frexp gives the bit length; the float rounding it hides is far below
+    # the estimator's own error
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    return index, (64 - p - bit_length + 1).astype(np.uint8)
+
+
+def _hll_estimate(registers):
+    # registers: (..., m) array; standard estimator with linear counting for small ranges
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class HyperLogLog:
+
+    def __init__(self, p=DEFAULT_P):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        if len(values):
+            index, rank = _register_updates(hash_values(values), self.p)
+            np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with p={self.p} and p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        return float(_hll_estimate(self.registers))
+
+    def nbytes(self):
+        return self.registers.nbytes
+
+    def state(self):
+        return {'p': self.p}, [self.registers]
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        sketch = cls(header['p'])
+        sketch.registers = arrays[0]
+        return sketch
+
+
+# ----- grouped collections -----
+
+def _labels(uniques):
+    if isinstance(uniques, pd.DatetimeIndex):
+        return list(uniques.strftime('%Y-%m-%d'))
+    return [UNKNOWN if pd.isna(value) else str(value) for value in uniques]
+
+
+def _group_keys(df, by):
+    # Row -> group code and the distinct keys as tuples of strings (missing
+    # values become UNKNOWN, days YYYY-MM-DD)
+    codes, labels = [], []
+    for column in by:
+        column_codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        codes.append(column_codes)
+        labels.append(_labels(uniques))
+    shape = tuple(max(len(level), 1) for level in labels)
+    codes, flat = pd.factorize(np.ravel_multi_index(codes, shape))
+    keys = zip(*[np.asarray(level, dtype=object)[level_codes]
+                 for level, level_codes in zip(labels, np.unravel_index(flat, shape))])
+    return codes, [tuple(key) for key in keys]
+
+
+class GroupedQuantiles:
+    # One KLLSketch of `column` per distinct value of the `by` columns
+
+    def __init__(self, by, column, k=DEFAULT_K):
+        self.by = list(by)
+        self.column = column
+        self.k = k
+        self.sketches = {}
+
+    def update(self, df):
+        if df.empty:
+            return self
+        codes, keys = _group_keys(df, self.by)
+        values = df[self.column].to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+        for code, key in enumerate(keys):
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                sketch = self.sketches[key] = KLLSketch(self.k)
+            sketch.update(values[order[bounds[code]:bounds[code + 1]]])
+        return self
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = KLLSketch.from_state(*sketch.state())
+        return self
+
+    def result(self, quantiles=QUANTILES):
+        rows = []
+        for key, sketch in sorted(self.sketches.items()):
+            values = sketch.quantile(list(quantiles))
+            rows.append((*key, sketch.n, sketch.min if sketch.n else np.nan,
+                         *values, sketch.max if sketch.n else np.nan))
+        columns = self.by + ['count', 'min'] + [f"p{round(q * 100, 1):g}" for q in quantiles] + ['max']
+        return pd.DataFrame(rows, columns=columns)
+
+    def nbytes(self):
+        return sum(sketch.nbytes() for sketch in self.sketches.values())
+
+    def state(self):
+        keys = sorted(self.sketches)
+        states = [self.sketches[key].state() for key in keys]
+        header = {'by': self.by, 'column': self.column, 'k': self.k, 'keys': keys,
+                  'sketches': [(header, len(arrays)) for header, arrays in states]}
+        return header, [array for _, arrays in states for array in arrays]
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        grouped = cls(header['by'], header['column'], header['k'])
+        offset = 0
+        for key, (sketch_header, count) in zip(header['keys'], header['sketches']):
+            grouped.sketches[tuple(key)] = KLLSketch.from_state(sketch_header, arrays[offset:offset + count])
+            offset += count
+        return grouped
+
+
+class GroupedDistinct:
+    # One HyperLogLog of `column` per distinct value of the `by` columns, kept
+    # as rows of a single register matrix so updates are one scatter-max
+
+    def __init__(self, by, column, p=DEFAULT_P):
+        self.by = list(by)
+        self.column = column
+        self.p = p
+        self.keys = {}
+        self.registers = np.zeros((0, 1 << p), dtype=np.uint8)
+
+    def _rows(self, keys):
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            rows[i] = self.keys.setdefault(key, len(self.keys))
+        if len(self.keys) > len(self.registers):
+            grown = np.zeros((max(len(self.keys), 2 * len(self.registers)), 1 << self.p), dtype=np.uint8)
+            grown[:len(self.registers)] = self.registers
+            self.registers = grown
+        return rows
+
+    def update(self, df):
+        if df.empty:
+            return self
+        codes, keys = _group_keys(df, self.by)
+        rows = self._rows(keys)
+        index, rank = _register_updates(hash_values(df[self.column]), self.p)
+        flat = self.registers.reshape(-1)
+        np.maximum.at(flat, rows[codes] * (1 << self.p) + index, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with p={self.p} and p={other.p}")
+        keys = list(other.keys)
+        rows = self._rows(keys)
+        self.registers[rows] = np.maximum(self.registers[rows], other.registers[[other.keys[key] for key in keys]])
+        return self
+
+    def sketch(self, key):
+        sketch = HyperLogLog(self.p)
+        sketch.registers = self.registers[self.keys[tuple(key)]].copy()
+        return sketch
+
+    def distinct(self, by=None, **filters):
+        # Distinct counts after merging the groups down to the `by` columns
+        # (None: one overall count). filters: column=value or column=[values]
+        if not self.keys:
+            return pd.DataFrame(columns=list(by) + ['distinct']) if by else 0.0
+        keys = pd.DataFrame(list(self.keys), columns=self.by)
+        rows = np.fromiter(self.keys.values(), dtype=np.int64, count=len(self.keys))
+        mask = np.ones(len(keys), dtype=bool)
+        for column, wanted in filters.items():
+            wanted = [wanted] if isinstance(wanted, str) or np.ndim(wanted) == 0 else wanted
+            mask &= keys[column].isin([str(value) for value in wanted]).to_numpy()
+        keys, rows = keys[mask], rows[mask]
+        if not by:
+            merged = self.registers[rows].max(axis=0, initial=0)
+            return float(_hll_estimate(merged))
+        codes, uniques = _group_keys(keys, list(by))
+        order = np.argsort(codes, kind='stable')
+        starts = np.searchsorted(codes[order], np.arange(len(uniques)))
+        merged = np.maximum.reduceat(self.registers[rows[order]], starts, axis=0) if len(order) else \
+            np.zeros((0, 1 << self.p), dtype=np.uint8)
+        result = pd.DataFrame(uniques, columns=list(by))
+        result['distinct'] = _hll_estimate(merged)
+        return result.sort_values(list(by)).reset_index(drop=True)
+
+    def nbytes(self):
+        return len(self.keys) * (1 << self.p)
+
+    def state(self):
+        # Small groups leave most registers at zero, so only the set ones are stored
+        keys = list(self.keys)
+        registers = self.registers[:len(keys)].reshape(-1)
+        positions = np.flatnonzero(registers)
+        positions = positions.astype(np.min_scalar_type(max(registers.size - 1, 0)))
+        return ({'by': self.by, 'column': self.column, 'p': self.p, 'keys': keys},
+                [positions, registers[positions]])
+
+    def _restore(self, header, arrays):
+        self.keys = {tuple(key): i for i, key in enumerate(header['keys'])}
+        self.registers = np.zeros((len(self.keys), 1 << self.p), dtype=np.uint8)
+        positions, values = arrays
+        self.registers.reshape(-1)[positions.astype(np.int64)] = values
+        return self
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        return cls(header['by'], header['column'], header['p'])._restore(header, arrays)
+
+
+# ----- BharatPe sketches -----
+
+class ResolutionSketches:
+    # resolution_time_days quantiles from interactions, per grouping
+
+    def __init__(self, groupings=RESOLUTION_GROUPINGS, k=DEFAULT_K):
+        self.groups = {name: GroupedQuantiles(by, 'resolution_time_days', k) for name, by in groupings.items()}
+        self.overall = KLLSketch(k)
+
+    def update(self, interactions):
+        for grouped in self.groups.values():
+            grouped.update(interactions)
+        self.overall.update(interactions['resolution_time_days'].to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def merge(self, other):
+        for name, grouped in other.groups.items():
+            self.groups.setdefault(name, GroupedQuantiles(grouped.by, grouped.column, grouped.k)).merge(grouped)
+        self.overall.merge(other.overall)
+        return self
+
+    def quantiles(self, grouping, quantiles=QUANTILES):
+        return self.groups[grouping].result(quantiles)
+
+    def state(self):
+        header, arrays = self.overall.state()
+        header = {'overall': (header, len(arrays)), 'groups': []}
+        for name, grouped in self.groups.items():
+            group_header, group_arrays = grouped.state()
+            header['groups'].append((name, group_header, len(group_arrays)))
+            arrays += group_arrays
+        return header, arrays
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        sketches = cls(groupings={})
+        overall_header, offset = header['overall']
+        sketches.overall = KLLSketch.from_state(overall_header, arrays[:offset])
+        for name, group_header, count in header['groups']:
+            sketches.groups[name] = GroupedQuantiles.from_state(group_header, arrays[offset:offset + count])
+            offset += count
+        return sketches
+
+
+class ActiveMerchantSketches(GroupedDistinct):
+    # Distinct transacting merchants per day and state
+
+    def __init__(self, p=DEFAULT_P):
+        super().__init__(['day', 'state'], 'merchant_id', p)
+
+    def update(self, transactions, merchants=None):
+        from .rollups import merchant_labels
+
+        state = merchant_labels(transactions, merchants, ['state'])['state'] if merchants is not None else None
+        days = pd.to_datetime(transactions['transaction_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+        frame = pd.DataFrame({
+            'day': days,
+            'state': state if state is not None else np.full(len(transactions), None, dtype=object),
+            'merchant_id': transactions['merchant_id'].to_numpy()
+        })
+        return super().update(frame[~np.isnat(days)])
+
+    def distinct(self, by=None, start=None, end=None, **filters):
+        # start / end bound the days merged (inclusive); ISO dates compare as strings
+        if start is not None or end is not None:
+            days = [key[0] for key in self.keys]
+            start = str(pd.Timestamp(start).date()) if start is not None else min(days, default='')
+            end = str(pd.Timestamp(end).date()) if end is not None else max(days, default='')
+            filters['day'] = [day for day in set(days) if start <= day <= end]
+        return super().distinct(by, **filters)
+
+    @classmethod
+    def from_state(cls, header, arrays):
+        return cls(header['p'])._restore(header, arrays)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resolution-time quantiles and active merchants from sketches')
+    parser.add_argument('--data-root', default=None)
+    parser.add_argument('--chunksize', type=int, default=250_000)
+    parser.add_argument('--save', default=None, help='write the serialized sketches to this prefix')
+    args = parser.parse_args(argv)
+
+    from .loader import iter_dataset, read_dataset
+
+    resolution = ResolutionSketches()
+    for chunk in iter_dataset('interactions', args.chunksize, args.data_root):
+        resolution.update(chunk)
+    for grouping in resolution.groups:
+        print(f"\n=== Resolution Time (days) by {grouping} ===")
+        print(resolution.quantiles(grouping).round(2).to_string(index=False))
+
+    merchants = read_dataset('merchants', args.data_root)
+    active = ActiveMerchantSketches()
+    for chunk in iter_dataset('transactions', args.chunksize, args.data_root):
+        active.update(chunk, merchants)
+    print("\n=== Distinct Active Merchants by State ===")
+    print(active.distinct(['state']).round(0).to_string(index=False))
+    print("\n=== Daily Active Merchants (last 7 days) ===")
+    print(active.distinct(['day']).tail(7).round(0).to_string(index=False))
+
+    if args.save:
+        for name, sketch in [('resolution', resolution), ('active_merchants', active)]:
+            with open(f"{args.save}.{name}.sketch", 'wb') as f:
+                f.write(dumps(sketch))
+        print(f"\nSketches written to {args.save}.*.sketch")
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Streaming Sketches =======
@@ -0,0 +1,195 @@
+# ======= BharatPe Streaming Transaction Engine =======
+#
+# Transactions are consumed in bounded chunks and folded into small partial
+# aggregates (per payment method, per day and method, per merchant and method,
+# per merchant before/after first loan). Partials are plain grouped frames, so
+# accumulators built on different chunks or processes can be merged and then
+# finalized into the same intermediate frames the in-memory analyses build.
+# Peak memory depends on the chunk size and the number of distinct merchants,
+# never on the length of the transactions file.
+#
+#     from bharatpe_analysis import loader
+#     chunks = loader.iter_dataset('transactions', chunksize=250_000)
+#     feature_usage_analysis(merchants, chunks)
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, (str, os.PathLike)):
+        from .loader import iter_dataset
+        yield from iter_dataset('transactions', chunksize=chunksize, path=source)
+    else:
+        yield from source
+
+
+def _plain(series):
+    # Chunks carry their own categories; group on the underlying values instead
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+
+def _combine(parts, how):
+    if len(parts) == 1:
+        return parts[0]
+    combined = pd.concat(parts)
+    return combined.groupby(level=list(range(combined.index.nlevels))).agg(how)
+
+
+class _Partial:
+    # A list of grouped frames that is compacted every few chunks
+
+    def __init__(self, how, compact_every):
+        self.how = how
+        self.compact_every = compact_every
+        self.parts = []
+
+    def add(self, part):
+        self.parts.append(part)
+        if len(self.parts) >= self.compact_every:
+            self.parts = [_combine(self.parts, self.how)]
+
+    def extend(self, other):
+        for part in other.parts:
+            self.add(part)
+
+    def result(self):
+        if not self.parts:
+            return None
+        self.parts = [_combine(self.parts, self.how)]
+        return self.parts[0]
+
+
+class FeatureUsageAccumulator:
+    def __init__(self, compact_every=8):
+        self.rows_seen = 0
+        self.by_method = _Partial({'transaction_id': 'sum', 'amount': 'sum'}, compact_every)
+        self.by_day_method = _Partial('sum', compact_every)
+        self.by_merchant = _Partial({'transaction_id': 'sum', 'amount': 'sum'}, compact_every)
+        # Ties in the primary payment method go to the method seen first, as
+        # value_counts breaks them on the plain strings read from the CSV
+        self.by_merchant_method = _Partial({'n': 'sum', 'first_row': 'min'}, compact_every)
+
+    def update(self, chunk):
+        frame = pd.DataFrame({
+            'merchant_id': _plain(chunk['merchant_id']).to_numpy(),
+            'payment_method': _plain(chunk['payment_method']).to_numpy(),
+            'transaction_id': chunk['transaction_id'].to_numpy(),
+            'amount': chunk['amount'].to_numpy(),
+            'transaction_date_only': chunk['transaction_date'].dt.date.to_numpy(),
+            'row': np.arange(self.rows_seen, self.rows_seen + len(chunk))
+        })
+        self.rows_seen += len(chunk)
+
+        self.by_method.add(frame.groupby('payment_method').agg({
+            'transaction_id': 'count',
+            'amount': 'sum'
+        }))
+        self.by_day_method.add(frame.groupby(['transaction_date_only', 'payment_method'])['transaction_id'].count())
+        self.by_merchant.add(frame.groupby('merchant_id').agg({
+            'transaction_id': 'count',
+            'amount': 'sum'
+        }))
+        self.by_merchant_method.add(frame.groupby(['merchant_id', 'payment_method']).agg(
+            n=('row', 'size'),
+            first_row=('row', 'min')
+        ))
+        return self
+
+    def merge(self, other):
+        # other's rows are treated as coming after ours
+        offset = self.rows_seen
+        self.by_method.extend(other.by_method)
+        self.by_day_method.extend(other.by_day_method)
+        self.by_merchant.extend(other.by_merchant)
+        for part in other.by_merchant_method.parts:
+            self.by_merchant_method.add(part.assign(first_row=part['first_row'] + offset))
+        self.rows_seen += other.rows_seen
+        return self
+
+    def finalize(self, merchants):
+        if self.rows_seen == 0:
+            raise ValueError("No transactions were streamed")
+
+        payment_method_usage = self.by_method.result().reset_index()
+        daily_method_usage = self.by_day_method.result().rename('transaction_id').reset_index()
+
+        by_merchant = self.by_merchant.result()
+        by_merchant_method = self.by_merchant_method.result().reset_index()
+
+        primary_method = by_merchant_method.sort_values(
+            ['merchant_id', 'n', 'first_row'], ascending=[True, False, True]
+        ).drop_duplicates('merchant_id').set_index('merchant_id')['payment_method']
+        methods_used = by_merchant_method.groupby('merchant_id').size()
+
+        merchant_usage_metrics = by_merchant.assign(
+            payment_method=methods_used.reindex(by_merchant.index, fill_value=0)
+        ).reset_index()
+
+        merchant_product_usage = pd.merge(
+            by_merchant.assign(payment_method=primary_method.reindex(by_merchant.index)).reset_index(),
+            merchants[['merchant_id', 'qr_displayed', 'soundbox_adopted', 'swipe_machine']],
+            on='merchant_id',
+            how='inner'
+        ).sort_values('merchant_id', ignore_index=True)
+
+        return payment_method_usage, daily_method_usage, merchant_product_usage, merchant_usage_metrics
+
+
+class LoanActivityAccumulator:
+    def __init__(self, merchant_first_loan, compact_every=8):
+        self.first_loan = merchant_first_loan.assign(
+            merchant_id=_plain(merchant_first_loan['merchant_id']),
+            first_loan_date=pd.to_datetime(merchant_first_loan['first_loan_date'], errors='coerce')
+        )
+        self.activity = _Partial('sum', compact_every)
+
+    def update(self, chunk):
+        frame = pd.DataFrame({
+            'merchant_id': _plain(chunk['merchant_id']).to_numpy(),
+            'transaction_id': chunk['transaction_id'].to_numpy(),
+            'amount': chunk['amount'].to_numpy(),
+            'transaction_date': pd.to_datetime(chunk['transaction_date'], errors='coerce').to_numpy()
+        }).merge(self.first_loan, on='merchant_id', how='inner')
+
+        frame['is_after_loan'] = frame['transaction_date'] >= frame['first_loan_date']
+        self.activity.add(frame.groupby(['merchant_id', 'is_after_loan']).agg({
+            'transaction_id': 'count',
+            'amount': 'sum'
+        }))
+        return self
+
+    def merge(self, other):
+        self.activity.extend(other.activity)
+        return self
+
+    def finalize(self):
+        activity = self.activity.result()
+        if activity is None:
+            return pd.DataFrame(columns=['merchant_id', 'is_after_loan', 'transaction_id', 'amount'])
+        return activity.reset_index()
+
+
+def stream_feature_usage_aggregates(source, merchants, chunksize=DEFAULT_CHUNKSIZE):
+    accumulator = FeatureUsageAccumulator()
+    for chunk in iter_chunks(source, chunksize):
+        accumulator.update(chunk)
+    return accumulator.finalize(merchants)
+
+
+def stream_loan_activity(source, merchant_first_loan, chunksize=DEFAULT_CHUNKSIZE):
+    accumulator = LoanActivityAccumulator(merchant_first_loan)
+    for chunk in iter_chunks(source, chunksize):
+        accumulator.update(chunk)
+    return accumulator.finalize()
+
+# ======= End of BharatPe Streaming Transaction Engine =======
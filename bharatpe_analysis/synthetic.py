@@ -0,0 +1,336 @@
+# ======= BharatPe Synthetic Data Generator =======
+#
+# Writes merchants.csv, loans.csv, interactions.csv, feature_usage.csv and
+# transactions.csv in the same layout as "Synthetic BharatPe Data", at any
+# scale. Distributions (category mixes, ranges, status rules) follow the
+# shipped 5k-merchant sample. Merchants are generated in fixed blocks, each
+# with its own seed derived from (seed, block), and every table is appended
+# to its CSV block by block, so memory stays flat however many rows are
+# written and the same seed always gives the same files.
+#
+#     python -m bharatpe_analysis.synthetic --merchants 1000000 --txn-per-merchant 20 --output data_1m
+#
+# or generate_dataset('data_1m', 1_000_000, txn_per_merchant=20).
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+BLOCK_MERCHANTS = 50_000
+TXN_ROWS_PER_WRITE = 1_000_000
+ANCHOR_DATE = pd.Timestamp('2025-05-19')
+ONBOARDING_RANGE = (pd.Timestamp('2022-05-23'), pd.Timestamp('2024-11-17'))
+INTERACTION_RANGE = (pd.Timestamp('2024-10-25'), ANCHOR_DATE)
+
+CATEGORIES = {
+    'Food & Beverage': ['Cafe', 'Sweet Shop', 'Bakery', 'Restaurant', 'Dhaba', 'Fast Food', 'Juice Center', 'Tea Stall'],
+    'Retail': ['Electronics', 'Hardware', 'Grocery', 'Clothing', 'Stationery', 'Medical Store', 'General Store', 'Mobile Shop'],
+    'Services': ['Salon', 'Tailor', 'Printing Services', 'Mobile Repair', 'Travel Agency', 'Electronics Repair', 'Laundry'],
+    'Wholesale': ['Electronics Wholesale', 'Stationery Wholesale', 'Grocery Wholesale', 'Textile Wholesale']
+}
+CATEGORY_P = [0.252, 0.255, 0.234, 0.259]
+STATES = {
+    'Delhi': (['East Delhi', 'North Delhi', 'Central Delhi', 'New Delhi', 'West Delhi', 'South Delhi'], (110000, 110100)),
+    'Gujarat': (['Vadodara', 'Ahmedabad', 'Rajkot', 'Surat', 'Gandhinagar'], (360079, 395860)),
+    'Karnataka': (['Mysore', 'Belgaum', 'Mangalore', 'Bangalore Urban', 'Hubli'], (560066, 584967)),
+    'Maharashtra': (['Aurangabad', 'Pune', 'Nagpur', 'Nashik', 'Mumbai City', 'Thane'], (400000, 444882)),
+    'Punjab': (['Amritsar', 'Ludhiana', 'Bathinda', 'Patiala', 'Jalandhar'], (140115, 164997)),
+    'Rajasthan': (['Jodhpur', 'Jaipur', 'Udaipur', 'Ajmer', 'Kota'], (300006, 344854)),
+    'Tamil Nadu': (['Coimbatore', 'Madurai', 'Chennai', 'Salem', 'Trichy'], (600064, 640000)),
+    'Uttar Pradesh': (['Varanasi', 'Lucknow', 'Agra', 'Meerut', 'Kanpur', 'Noida', 'Ghaziabad'], (200127, 284888)),
+    'West Bengal': (['Durgapur', 'Kolkata', 'Asansol', 'Siliguri', 'Howrah'], (700040, 739891))
+}
+STATE_P = [0.118, 0.116, 0.109, 0.108, 0.108, 0.115, 0.109, 0.104, 0.113]
+TIERS = (['Tier 1', 'Tier 2', 'Tier 3'], [0.218, 0.332, 0.45])
+CHANNELS = (['Field Sales', 'Digital Marketing', 'Referral', 'App Store Download', 'Merchant Event', 'Partner Bank'],
+            [0.495, 0.155, 0.147, 0.101, 0.051, 0.051])
+DEVICES = (['Android Mid-Range', 'Android Low-End', 'Android High-End', 'iPhone'], [0.408, 0.392, 0.153, 0.047])
+# status -> (share, min days since last transaction, max days)
+ACTIVITY = {'Active': (0.861, 0, 30), 'Dormant': (0.112, 31, 90), 'Churned': (0.027, 91, 180)}
+LOANS_TAKEN_P = [0.654, 0.174, 0.087, 0.052, 0.023, 0.01]
+CURRENT_LOAN_STATUS = (['Active', 'Paid', 'Default'], [0.677, 0.259, 0.064])
+NAME_PARTS = (
+    ['Bakshi', 'Anvi', 'Sharma', 'Gupta', 'Patel', 'Reddy', 'Singh', 'Iyer', 'Das', 'Khan', 'Mehta', 'Joshi'],
+    ['Emporium', 'Store', 'Traders', 'Enterprises', 'Mart', 'Corner', 'Bhandar', 'Centre']
+)
+
+LOAN_TYPES = (['Short Term Cash Flow', 'Inventory Financing', 'Business Expansion', 'Equipment Purchase', 'Working Capital'],
+              [0.208, 0.204, 0.202, 0.2, 0.186])
+LOAN_TERMS = ([3, 6, 9, 12, 18], [0.194, 0.191, 0.198, 0.221, 0.196])
+LOAN_STATUS = (['Paid', 'Active', 'Default'], [0.545, 0.362, 0.093])
+
+ISSUES = {
+    'Account': ['Account Update', 'Bank Account Change', 'Password Reset', 'KYC Verification'],
+    'Financial': ['Transaction Dispute', 'Loan Inquiry', 'Settlement Delay', 'Refund Request'],
+    'Product': ['Device Replacement', 'New Product Inquiry', 'Feature Request', 'Pricing Query'],
+    'Technical': ['Login Issues', 'App Crash', 'Payment Failed', 'Soundbox Issues', 'QR Code Not Working']
+}
+ISSUE_P = [0.282, 0.216, 0.27, 0.232]
+INTERACTION_CHANNELS = ['In-App', 'WhatsApp', 'Phone', 'Email', 'Field Agent']
+# resolution status -> (share, resolution time range in days; None = never resolved)
+RESOLUTION = {'Resolved': (0.651, (0, 5)), 'Pending': (0.217, (3, 15)), 'Escalated': (0.098, (7, 20)),
+              'Customer Dropout': (0.034, None)}
+INTERACTIONS_PER_MERCHANT = 1.68
+
+# feature -> max monthly frequency when used
+FEATURES = {'QR Payments': 30, 'Soundbox Alerts': 20, 'Business Reports': 8, 'Settlement History': 20,
+            'Loan Dashboard': 8, 'Rewards': 20}
+FEATURE_USED_P = 0.69
+
+PAYMENT_METHODS = ['UPI', 'QR', 'Card', 'Wallet', 'Cash']
+PAYMENT_P = [0.45, 0.25, 0.1, 0.1, 0.1]
+PAYMENT_P_SWIPE = [0.35, 0.2, 0.3, 0.07, 0.08]
+
+TABLES = ['merchants', 'loans', 'interactions', 'feature_usage', 'transactions']
+
+
+def _choice(rng, options, p, size):
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=size, p=np.asarray(p) / np.sum(p))]
+
+
+def _nested_choice(rng, parents, groups):
+    # One child per parent value, uniform within that parent's group
+    lengths = np.array([len(groups[parent]) for parent in groups])
+    flat = np.array([child for parent in groups for child in groups[parent]], dtype=object)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    codes = pd.Categorical(parents, categories=list(groups)).codes
+    return flat[starts[codes] + (rng.random(len(parents)) * lengths[codes]).astype(np.int64)]
+
+
+def _dates_between(rng, start, end):
+    # start / end are datetime64 arrays (or scalars); whole days, inclusive
+    start = np.asarray(start, dtype='datetime64[D]')
+    end = np.asarray(end, dtype='datetime64[D]')
+    span = np.maximum((end - start).astype(np.int64), 0) + 1
+    return start + (rng.random(np.broadcast(start, end).shape) * span).astype('timedelta64[D]')
+
+
+def _ids(prefix, start, count):
+    return prefix + pd.Series(np.arange(start, start + count)).astype(str)
+
+
+def generate_merchants(rng, start, count):
+    category = _choice(rng, list(CATEGORIES), CATEGORY_P, count)
+    state = _choice(rng, list(STATES), STATE_P, count)
+    district = _nested_choice(rng, state, {name: districts for name, (districts, _) in STATES.items()})
+    pin_low = np.array([STATES[name][1][0] for name in STATES])
+    pin_high = np.array([STATES[name][1][1] for name in STATES])
+    state_codes = pd.Categorical(state, categories=list(STATES)).codes
+
+    status = _choice(rng, list(ACTIVITY), [share for share, _, _ in ACTIVITY.values()], count)
+    low = np.array([ACTIVITY[name][1] for name in ACTIVITY])[pd.Categorical(status, categories=list(ACTIVITY)).codes]
+    high = np.array([ACTIVITY[name][2] for name in ACTIVITY])[pd.Categorical(status, categories=list(ACTIVITY)).codes]
+    onboarding = _dates_between(rng, np.full(count, np.datetime64(ONBOARDING_RANGE[0].date())),
+                                np.datetime64(ONBOARDING_RANGE[1].date()))
+    days_idle = low + (rng.random(count) * (high - low + 1)).astype(np.int64)
+    last_txn = np.maximum(np.datetime64(ANCHOR_DATE.date()) - days_idle.astype('timedelta64[D]'), onboarding)
+
+    loans_taken = rng.choice(len(LOANS_TAKEN_P), size=count, p=LOANS_TAKEN_P).astype(np.int8)
+    loan_status = np.where(loans_taken > 0, _choice(rng, *CURRENT_LOAN_STATUS, count), 'No Loan')
+
+    txn_count = np.clip(np.round(rng.lognormal(np.log(320), 0.85, count)), 22, 1899).astype(np.int32)
+    ticket = np.clip(rng.lognormal(np.log(271), 1.25, count), 48.37, 14629.65).round(2)
+    value = np.clip(np.round(txn_count * ticket * rng.uniform(0.6, 1.4, count)), 14951, 849857).astype(np.int32)
+
+    flag = lambda p: np.where(rng.random(count) < p, 'Yes', 'No')
+    first, second = NAME_PARTS
+    return pd.DataFrame({
+        'merchant_id': _ids('BPM', 100000 + start, count),
+        'business_name': pd.Series(_choice(rng, first, np.ones(len(first)), count)) + ' '
+                         + _choice(rng, second, np.ones(len(second)), count),
+        'business_category': category,
+        'subcategory': _nested_choice(rng, category, CATEGORIES),
+        'state': state,
+        'district': district,
+        'city': district,
+        'tier': _choice(rng, *TIERS, count),
+        'pin_code': pin_low[state_codes] + (rng.random(count) * (pin_high - pin_low + 1)[state_codes]).astype(np.int64),
+        'onboarding_date': onboarding.astype('datetime64[ns]'),
+        'acquisition_channel': _choice(rng, *CHANNELS, count),
+        'device_type': _choice(rng, *DEVICES, count),
+        'active_status': status,
+        'last_transaction_date': last_txn.astype('datetime64[ns]'),
+        'qr_displayed': flag(0.95),
+        'soundbox_adopted': flag(0.422),
+        'swipe_machine': flag(0.345),
+        'loans_taken': loans_taken,
+        'current_loan_status': loan_status,
+        'monthly_transaction_count': txn_count,
+        'monthly_transaction_value': value,
+        'avg_ticket_size': ticket
+    })
+
+
+def generate_loans(rng, merchants, start):
+    repeat = merchants['loans_taken'].to_numpy(dtype=np.int64)
+    count = int(repeat.sum())
+    merchant_ids = np.repeat(merchants['merchant_id'].to_numpy(), repeat)
+    onboarding = np.repeat(merchants['onboarding_date'].to_numpy(), repeat)
+
+    term = _choice(rng, *LOAN_TERMS, count).astype(np.int16)
+    status = _choice(rng, *LOAN_STATUS, count)
+    # Paid loans have run their full term by the anchor date
+    latest = np.datetime64(ANCHOR_DATE.date()) - np.where(status == 'Paid', term.astype(np.int64) * 30, 30).astype('timedelta64[D]')
+    approval = _dates_between(rng, onboarding, np.maximum(latest, onboarding.astype('datetime64[D]')))
+    end = approval + (term.astype(np.int64) * 30 - 1).astype('timedelta64[D]')
+    end_missing = (status == 'Active') | ((status == 'Default') & (rng.random(count) < 0.37))
+
+    amount = (np.clip(np.round(rng.lognormal(np.log(172), 0.8, count)), 21, 996) * 1000).astype(np.int32)
+    rate = rng.uniform(13.0, 24.0, count).round(2)
+    total_due = amount * (1 + rate / 100 * term / 12)
+    installment = np.round(total_due / term).astype(np.int32)
+    paid_share = np.where(status == 'Paid', 1.0, rng.uniform(0.05, 0.95, count))
+    amount_paid = np.round(total_due * paid_share, 1)
+
+    return pd.DataFrame({
+        'loan_id': _ids('LN', start, count),
+        'merchant_id': merchant_ids,
+        'approval_date': approval.astype('datetime64[ns]'),
+        'end_date': np.where(end_missing, np.datetime64('NaT'), end).astype('datetime64[ns]'),
+        'loan_type': _choice(rng, *LOAN_TYPES, count),
+        'loan_amount': amount,
+        'interest_rate': rate,
+        'loan_term_months': term,
+        'monthly_installment': installment,
+        'amount_paid': amount_paid,
+        'remaining_amount': np.where(status == 'Paid', 0.0, np.round(total_due - amount_paid, 1)),
+        'status': status
+    })
+
+
+def generate_interactions(rng, merchants, start):
+    repeat = rng.poisson(INTERACTIONS_PER_MERCHANT, len(merchants))
+    count = int(repeat.sum())
+    category = _choice(rng, list(ISSUES), ISSUE_P, count)
+    status = _choice(rng, list(RESOLUTION), [share for share, _ in RESOLUTION.values()], count)
+    status_codes = pd.Categorical(status, categories=list(RESOLUTION)).codes
+    low = np.array([bounds[0] if bounds else 0 for _, bounds in RESOLUTION.values()])[status_codes]
+    high = np.array([bounds[1] if bounds else 0 for _, bounds in RESOLUTION.values()])[status_codes]
+    days = (low + (rng.random(count) * (high - low + 1)).astype(np.int64)).astype(np.float64)
+    days[status == 'Customer Dropout'] = np.nan
+
+    return pd.DataFrame({
+        'interaction_id': _ids('INT', start, count),
+        'merchant_id': np.repeat(merchants['merchant_id'].to_numpy(), repeat),
+        'date': _dates_between(rng, np.full(count, np.datetime64(INTERACTION_RANGE[0].date())),
+                               np.datetime64(INTERACTION_RANGE[1].date())).astype('datetime64[ns]'),
+        'category': category,
+        'issue': _nested_choice(rng, category, ISSUES),
+        'channel': _choice(rng, INTERACTION_CHANNELS, np.ones(len(INTERACTION_CHANNELS)), count),
+        'resolution_status': status,
+        'resolution_time_days': days
+    })
+
+
+def generate_feature_usage(rng, merchants):
+    count = len(merchants) * len(FEATURES)
+    used = rng.random(count) < FEATURE_USED_P
+    ceiling = np.tile(np.array(list(FEATURES.values())), len(merchants))
+    frequency = np.where(used, 1 + (rng.random(count) * ceiling).astype(np.int64), 0)
+    return pd.DataFrame({
+        'merchant_id': np.repeat(merchants['merchant_id'].to_numpy(), len(FEATURES)),
+        'feature': np.tile(np.array(list(FEATURES), dtype=object), len(merchants)),
+        'is_used': np.where(used, 'Yes', 'No'),
+        'monthly_frequency': frequency.astype(np.int16)
+    })
+
+
+def generate_transactions(rng, merchants, start, txn_per_merchant):
+    # Dated within the year before each merchant's last transaction, never before onboarding
+    repeat = rng.poisson(txn_per_merchant, len(merchants))
+    count = int(repeat.sum())
+    last = np.repeat(merchants['last_transaction_date'].to_numpy(), repeat)
+    first = np.maximum(np.repeat(merchants['onboarding_date'].to_numpy(), repeat), last - np.timedelta64(365, 'D'))
+    ticket = np.repeat(merchants['avg_ticket_size'].to_numpy(), repeat)
+    swipe = np.repeat(merchants['swipe_machine'].to_numpy() == 'Yes', repeat)
+
+    method = np.where(
+        swipe,
+        _choice(rng, PAYMENT_METHODS, PAYMENT_P_SWIPE, count),
+        _choice(rng, PAYMENT_METHODS, PAYMENT_P, count)
+    )
+    return pd.DataFrame({
+        'transaction_id': _ids('T', start, count),
+        'merchant_id': np.repeat(merchants['merchant_id'].to_numpy(), repeat),
+        'transaction_date': _dates_between(rng, first, last).astype('datetime64[ns]'),
+        'amount': np.maximum(rng.gamma(2.0, ticket / 2.0), 1.0).round(2),
+        'payment_method': method
+    })
+
+
+def generate_dataset(output_dir, n_merchants, txn_per_merchant=20, seed=0, tables=TABLES, verbose=True):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {table: os.path.join(output_dir, f'{table}.csv') for table in tables}
+    tmp_paths = {table: f'{path}.tmp' for table, path in paths.items()}
+    handles = {table: open(tmp_paths[table], 'w', encoding='utf-8', newline='') for table in tables}
+    rows = {table: 0 for table in tables}
+    start_time = time.perf_counter()
+
+    def write(table, df):
+        df.to_csv(handles[table], header=rows[table] == 0, index=False, date_format='%Y-%m-%d')
+        rows[table] += len(df)
+
+    try:
+        for block, begin in enumerate(range(0, n_merchants, BLOCK_MERCHANTS)):
+            rng = np.random.default_rng([seed, block])
+            merchants = generate_merchants(rng, begin, min(BLOCK_MERCHANTS, n_merchants - begin))
+            if 'merchants' in tables:
+                write('merchants', merchants)
+            if 'loans' in tables:
+                write('loans', generate_loans(rng, merchants, rows['loans']))
+            if 'interactions' in tables:
+                write('interactions', generate_interactions(rng, merchants, rows['interactions']))
+            if 'feature_usage' in tables:
+                write('feature_usage', generate_feature_usage(rng, merchants))
+            if 'transactions' in tables:
+                per_write = max(1, TXN_ROWS_PER_WRITE // max(int(txn_per_merchant), 1))
+                for part, sub in enumerate(range(0, len(merchants), per_write)):
+                    txn_rng = np.random.default_rng([seed, block, part + 1])
+                    write('transactions', generate_transactions(
+                        txn_rng, merchants.iloc[sub:sub + per_write], rows['transactions'], txn_per_merchant
+                    ))
+            if verbose:
+                print(f"  {begin + len(merchants):,} / {n_merchants:,} merchants, "
+                      f"{rows.get('transactions', 0):,} transactions")
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    for table in tables:
+        os.replace(tmp_paths[table], paths[table])
+
+    manifest = {
+        'n_merchants': n_merchants,
+        'txn_per_merchant': txn_per_merchant,
+        'seed': seed,
+        'rows': rows,
+        'bytes': {table: os.path.getsize(paths[table]) for table in tables},
+        'seconds': round(time.perf_counter() - start_time, 3)
+    }
+    with open(os.path.join(output_dir, 'generator.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic BharatPe data')
+    parser.add_argument('--merchants', type=int, default=10_000)
+    parser.add_argument('--txn-per-merchant', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args(argv)
+
+    manifest = generate_dataset(args.output, args.merchants, args.txn_per_merchant, args.seed)
+    for table, count in manifest['rows'].items():
+        print(f"{table:<15} {count:>12,} rows  {manifest['bytes'][table] / 1e6:10.1f} MB")
+    print(f"Generated in {manifest['seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
+
+# ======= End of BharatPe Synthetic Data Generator =======
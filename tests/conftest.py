@@ -0,0 +1,33 @@
+# Shared fixtures: a small seeded synthetic dataset, read both the way the
+# original scripts do (plain pd.read_csv) and through the typed loader.
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bharatpe_analysis import loader
+from bharatpe_analysis.synthetic import generate_dataset
+
+TABLES = ['merchants', 'transactions', 'interactions', 'loans']
+
+
+@pytest.fixture(scope='session')
+def data_root(tmp_path_factory):
+    root = tmp_path_factory.mktemp('bharatpe_data')
+    generate_dataset(str(root), 400, txn_per_merchant=15, seed=7, verbose=False)
+    return str(root)
+
+
+@pytest.fixture
+def raw(data_root):
+    # Fresh frames per test: several analyses add columns in place
+    return {name: pd.read_csv(os.path.join(data_root, f'{name}.csv')) for name in TABLES}
+
+
+@pytest.fixture
+def typed(data_root):
+    return {name: loader.read_dataset(name, data_root, use_cache=False) for name in TABLES}
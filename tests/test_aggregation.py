@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.aggregation import (
+    group_nunique,
+    product_combo_code,
+    product_combo_counts,
+    product_combo_labels,
+    status_flag
+)
+
+
+def _flags(typed):
+    merchants = typed['merchants'].copy()
+    merchants['loan_taken_bool'] = merchants['loans_taken'] > 0
+    return merchants
+
+
+def test_product_combo_matches_row_apply(typed):
+    merchants = _flags(typed)
+    labels = merchants.apply(
+        lambda x: f"QR: {'Y' if x['qr_displayed'] else 'N'}, "
+                  f"Sound: {'Y' if x['soundbox_adopted'] else 'N'}, "
+                  f"Swipe: {'Y' if x['swipe_machine'] else 'N'}, "
+                  f"Loan: {'Y' if x['loan_taken_bool'] else 'N'}",
+        axis=1
+    )
+    code = product_combo_code(merchants)
+    np.testing.assert_array_equal(product_combo_labels(code), labels.to_numpy())
+
+    want = labels.value_counts().reset_index()
+    want.columns = ['combination', 'count']
+    got = product_combo_counts(code)
+    np.testing.assert_array_equal(got['combination'], want['combination'])
+    np.testing.assert_array_equal(got['count'], want['count'])
+
+
+def test_status_rates_match_group_lambdas(raw, typed):
+    want = raw['loans'].groupby('loan_type')['status'].agg(lambda x: (x == 'Default').mean())
+    loans = typed['loans']
+    got = loans.assign(is_defaulted=status_flag(loans['status'], 'Default')).groupby(
+        'loan_type', observed=True)['is_defaulted'].mean()
+    np.testing.assert_allclose(got.reindex(want.index).to_numpy(), want.to_numpy())
+
+    want = raw['merchants'].groupby('state')['active_status'].agg(lambda x: (x.str.lower() == 'active').mean())
+    got = pd.Series(status_flag(typed['merchants']['active_status'], 'Active', case_sensitive=False)).groupby(
+        typed['merchants']['state'].astype(str).to_numpy()).mean()
+    np.testing.assert_allclose(got.reindex(want.index).to_numpy(), want.to_numpy())
+
+
+def test_group_nunique_matches_lambda(raw, typed):
+    want = raw['transactions'].groupby('merchant_id')['payment_method'].agg(lambda x: x.nunique())
+    transactions = typed['transactions']
+    got = group_nunique(transactions['merchant_id'], transactions['payment_method'])
+    assert got.index.astype(str).tolist() == want.index.astype(str).tolist()
+    np.testing.assert_array_equal(got.to_numpy(), want.to_numpy())
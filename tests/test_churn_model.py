@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bharatpe_analysis.churn_model import ChurnFeatures, score_merchants, train_churn_model
+
+
+def _frame(features):
+    return pd.DataFrame(features.X(), index=features.ids, columns=features.columns)
+
+
+def _usage(data_root):
+    return pd.read_csv(os.path.join(data_root, 'feature_usage.csv'))
+
+
+def test_features_match_groupby(typed, data_root):
+    merchants, interactions, loans = typed['merchants'], typed['interactions'], typed['loans']
+    features = ChurnFeatures.from_frames(merchants, interactions, loans, _usage(data_root))
+    got = _frame(features)
+    ids = merchants['merchant_id'].astype(str)
+    assert list(got.index) == ids.tolist()
+
+    by_merchant = interactions.groupby('merchant_id').agg(
+        num_interactions=('interaction_id', 'count'),
+        avg_resolution_time=('resolution_time_days', 'mean')
+    ).reindex(ids).fillna(0)
+    np.testing.assert_array_equal(got['num_interactions'], by_merchant['num_interactions'])
+    np.testing.assert_allclose(got['avg_resolution_time'], by_merchant['avg_resolution_time'], rtol=1e-5)
+
+    by_loan = loans.groupby('merchant_id').agg(
+        loan_count=('loan_id', 'count'),
+        total_loan_amount=('loan_amount', 'sum'),
+        avg_interest_rate=('interest_rate', 'mean')
+    ).reindex(ids).fillna(0)
+    for column in by_loan.columns:
+        np.testing.assert_allclose(got[column], by_loan[column], rtol=1e-5)
+
+    current = merchants['last_transaction_date'].max()
+    churned = ((current - merchants['last_transaction_date']).dt.days > 30).to_numpy()
+    np.testing.assert_array_equal(features.labels(), churned)
+
+
+def test_incremental_updates_match_one_build(typed, data_root):
+    merchants, interactions, loans = typed['merchants'], typed['interactions'], typed['loans']
+    usage = _usage(data_root)
+    full = _frame(ChurnFeatures.from_frames(merchants, interactions, loans, usage))
+
+    # Second half of the merchants arrives last, after their interactions and
+    # loans; every run passes the cumulative frames again
+    half = len(merchants) // 2
+    features = ChurnFeatures()
+    features.update(merchants.iloc[:half], interactions.iloc[:len(interactions) // 2], loans, usage)
+    features.update(merchants.iloc[:half], interactions, loans, usage)
+    features.update(merchants, interactions, loans, usage)
+    got = _frame(features)
+
+    assert sorted(got.index) == sorted(full.index)
+    assert sorted(got.columns) == sorted(full.columns)
+    got = got.reindex(index=full.index, columns=full.columns)
+    code_columns = [name for name in full.columns if name in features.levels]
+    other = [name for name in full.columns if name not in code_columns]
+    np.testing.assert_allclose(got[other].to_numpy(), full[other].to_numpy(), rtol=1e-6)
+
+
+def test_batched_scores_match_one_predict(typed):
+    pytest.importorskip('sklearn')
+    features = ChurnFeatures.from_frames(typed['merchants'], typed['interactions'], typed['loans'])
+    trained = train_churn_model(features, n_estimators=10, n_jobs=1)
+    scored, stats = score_merchants(trained, features, batch_size=64)
+    assert stats['batches'] == -(-features.size // 64)
+    want = trained['model'].predict_proba(features.X())[:, list(trained['model'].classes_).index(True)]
+    np.testing.assert_allclose(scored['churn_probability'], want, rtol=1e-6)
@@ -0,0 +1,74 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.analysis import churn_analysis
+from bharatpe_analysis.cube import MerchantCube
+
+MEASURES = {
+    'merchant_count': ('merchant_id', 'count'),
+    'txn_value': ('monthly_transaction_value', 'sum'),
+    'avg_ticket': ('avg_ticket_size', 'mean')
+}
+
+
+def _with_gaps(merchants):
+    merchants = merchants.copy()
+    merchants['avg_ticket_size'] = merchants['avg_ticket_size'].astype('float64')
+    merchants.loc[merchants.index[::11], 'avg_ticket_size'] = np.nan
+    merchants['state'] = merchants['state'].astype(object)
+    merchants.loc[merchants.index[::13], 'state'] = None
+    return merchants
+
+
+def _groupby(merchants, dims):
+    return merchants.groupby(dims, observed=True).agg(
+        merchant_count=('merchant_id', 'count'),
+        txn_value=('monthly_transaction_value', 'sum'),
+        avg_ticket=('avg_ticket_size', 'mean')
+    )
+
+
+def test_rollups_match_groupby(typed):
+    merchants = _with_gaps(typed['merchants'])
+    cube = MerchantCube(merchants, ['state', 'tier', 'business_category'], MEASURES)
+    for dims in [['state'], ['tier'], ['state', 'tier'], ['tier', 'business_category']]:
+        got = cube.rollup(dims)
+        want = _groupby(merchants, dims)
+        want = want[want['merchant_count'] > 0]
+        got = got[got['merchant_count'] > 0]
+        assert [tuple(map(str, key)) if isinstance(key, tuple) else str(key) for key in got.index] == \
+               [tuple(map(str, key)) if isinstance(key, tuple) else str(key) for key in want.index]
+        np.testing.assert_array_equal(got['merchant_count'], want['merchant_count'])
+        np.testing.assert_allclose(got['txn_value'], want['txn_value'])
+        np.testing.assert_allclose(got['avg_ticket'], want['avg_ticket'])
+
+    total = cube.rollup([])
+    assert total['merchant_count'].iloc[0] == merchants['merchant_id'].count()
+    assert np.isclose(total['avg_ticket'].iloc[0], merchants['avg_ticket_size'].mean())
+
+
+def test_churn_breakdowns_match_groupby(typed):
+    merchants = typed['merchants'].copy()
+    result = churn_analysis(merchants.copy(), typed['interactions'], verbose=False)
+
+    current_date = merchants['last_transaction_date'].max()
+    merchants['is_churned'] = (current_date - merchants['last_transaction_date']).dt.days > 30
+    for key, dim in [('churn_by_category', 'business_category'), ('churn_by_state', 'state'),
+                     ('churn_by_channel', 'acquisition_channel')]:
+        want = merchants.groupby(dim, observed=True).agg(
+            merchant_count=('merchant_id', 'count'), churn_rate=('is_churned', 'mean'))
+        got = result[key]
+        got = got[got['merchant_count'] > 0]
+        got.index = got.index.astype(str)
+        want.index = want.index.astype(str)
+        got = got.reindex(want.index)
+        np.testing.assert_array_equal(got['merchant_count'], want['merchant_count'])
+        np.testing.assert_allclose(got['churn_rate'], want['churn_rate'])
+
+
+def test_churn_analysis_raises_no_pandas_warnings(typed):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.ChainedAssignmentError)
+        churn_analysis(typed['merchants'].copy(), typed['interactions'], verbose=False)
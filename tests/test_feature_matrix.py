@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.feature_matrix import FeatureMatrix, merchant_outcomes
+
+
+def _usage(data_root):
+    return pd.read_csv(os.path.join(data_root, 'feature_usage.csv'))
+
+
+def _dense(usage, merchant_ids, features):
+    # Dense pandas pivot of the last row per (merchant, feature)
+    usage = usage.drop_duplicates(['merchant_id', 'feature'], keep='last')
+    used = usage[usage['is_used'].str.lower() == 'yes']
+    adoption = pd.crosstab(used['merchant_id'], used['feature']).reindex(
+        index=merchant_ids, columns=features, fill_value=0)
+    frequency = used.pivot(index='merchant_id', columns='feature', values='monthly_frequency').reindex(
+        index=merchant_ids, columns=features).fillna(0)
+    return adoption.clip(upper=1), frequency
+
+
+def test_co_usage_matches_dense_pivot(raw, data_root):
+    usage = _usage(data_root)
+    matrix = FeatureMatrix.from_usage(usage, merchant_ids=raw['merchants']['merchant_id'])
+    adoption, frequency = _dense(usage, matrix.merchants, matrix.features)
+    A = adoption.to_numpy()
+
+    np.testing.assert_array_equal(matrix.co_counts(), A.T @ A)
+    np.testing.assert_array_equal(matrix.adopters(), A.sum(axis=0))
+
+    pairs = matrix.co_usage().set_index(['feature_a', 'feature_b'])
+    frequency_sum = A.T @ frequency.to_numpy()
+    for i, a in enumerate(matrix.features):
+        for j, b in enumerate(matrix.features):
+            if i == j or (A[:, i] & A[:, j]).sum() == 0:
+                continue
+            both = (A[:, i] & A[:, j]).sum()
+            assert pairs.loc[(a, b), 'merchants_both'] == both
+            assert np.isclose(pairs.loc[(a, b), 'avg_frequency_b'], frequency_sum[i, j] / both)
+
+
+def test_chunked_build_matches_one_pass(raw, data_root):
+    usage = _usage(data_root)
+    # Repeat some rows with a changed snapshot: the later one must win
+    changed = usage.iloc[::9].assign(is_used='Yes', monthly_frequency=7)
+    usage = pd.concat([usage, changed], ignore_index=True)
+    whole = FeatureMatrix.from_usage(usage, merchant_ids=raw['merchants']['merchant_id'])
+    chunked = FeatureMatrix.from_usage(usage, merchant_ids=raw['merchants']['merchant_id'], chunksize=333)
+    assert list(whole.merchants) == list(chunked.merchants)
+    assert whole.features == chunked.features
+    assert (whole.frequency != chunked.frequency).nnz == 0
+
+    adoption, _ = _dense(usage, whole.merchants, whole.features)
+    np.testing.assert_array_equal(whole.adoption.toarray(), adoption.to_numpy())
+
+
+def test_feature_outcomes_match_groupby(raw, data_root):
+    usage = _usage(data_root)
+    matrix = FeatureMatrix.from_usage(usage, merchant_ids=raw['merchants']['merchant_id'])
+    outcomes = merchant_outcomes(raw['merchants'], raw['loans'])
+    result = matrix.feature_outcomes(outcomes).set_index('feature')
+
+    adoption, _ = _dense(usage, matrix.merchants, matrix.features)
+    frame = outcomes.reindex(matrix.merchants)
+    for feature in matrix.features:
+        uses = adoption[feature].to_numpy() == 1
+        for column in ['churned', 'has_loan', 'loan_count']:
+            want = frame[column].groupby(uses).mean()
+            if True in want.index:
+                assert np.isclose(result.loc[feature, f'{column}_adopters'], want[True])
+            if False in want.index:
+                assert np.isclose(result.loc[feature, f'{column}_non_adopters'], want[False])
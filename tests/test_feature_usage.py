@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.aggregation import group_mode
+from bharatpe_analysis.analysis import feature_usage_analysis
+
+
+def _alignment(result, flag):
+    frame = result[f'{flag.split("_")[0]}_alignment']
+    frame = frame[frame['merchant_id'] > 0]
+    return {(bool(row[flag]), str(row['primary_payment_method'])): row['merchant_id']
+            for _, row in frame.iterrows()}
+
+
+def _expected_alignment(raw_transactions, merchants, flag):
+    # The original lambda over the CSV's plain strings
+    joined = raw_transactions.merge(merchants[['merchant_id', flag]], on='merchant_id', how='inner')
+    primary = joined.groupby('merchant_id').agg({
+        'payment_method': lambda x: x.value_counts().index[0],
+        flag: 'first'
+    })
+    return primary.groupby([flag, 'payment_method']).size().to_dict()
+
+
+def test_group_mode_breaks_ties_by_first_appearance():
+    keys = pd.Series(['m1', 'm1', 'm1', 'm1', 'm2', 'm2'])
+    values = pd.Series(['upi', 'card', 'card', 'upi', 'cash', 'card'])
+    expected = values.groupby(keys).agg(lambda x: x.value_counts().index[0])
+    for series in [values, values.astype('category')]:
+        got = group_mode(keys, series)
+        assert got.astype(str).to_dict() == expected.to_dict() == {'m1': 'upi', 'm2': 'cash'}
+
+
+def test_primary_method_matches_plain_strings(typed, raw, data_root):
+    expected = {flag: _expected_alignment(raw['transactions'], typed['merchants'], flag)
+                for flag in ['qr_displayed', 'swipe_machine']}
+    assert isinstance(typed['transactions']['payment_method'].dtype, pd.CategoricalDtype)
+
+    in_memory = feature_usage_analysis(typed['merchants'].copy(), typed['transactions'].copy())
+    streamed = feature_usage_analysis(typed['merchants'].copy(), os.path.join(data_root, 'transactions.csv'))
+    for result in [in_memory, streamed]:
+        for flag, want in expected.items():
+            got = _alignment(result, flag)
+            assert got == {(bool(key[0]), key[1]): count for key, count in want.items()}
+            assert np.sum(list(got.values())) == len(typed['merchants'])
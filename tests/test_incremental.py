@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.analysis import churn_analysis
+from bharatpe_analysis.incremental import IncrementalChurn, incremental_churn_analysis
+
+
+def _expected(merchants, transactions=None):
+    merchants = merchants.copy()
+    merchants['last_transaction_date'] = pd.to_datetime(merchants['last_transaction_date'])
+    if transactions is not None:
+        latest = pd.to_datetime(transactions['transaction_date']).groupby(transactions['merchant_id']).max()
+        merchants['last_transaction_date'] = pd.concat(
+            [merchants['last_transaction_date'], merchants['merchant_id'].map(latest)], axis=1
+        ).max(axis=1)
+    return churn_analysis(merchants, pd.DataFrame(columns=['merchant_id', 'interaction_id', 'resolution_time_days']),
+                          verbose=False)
+
+
+def _assert_same(result, expected):
+    assert result['overall_churn_rate'] == expected['overall_churn_rate']
+    for key, dim in [('churn_by_category', 'business_category'), ('churn_by_state', 'state'),
+                     ('churn_by_channel', 'acquisition_channel')]:
+        got = result[key].reset_index()
+        want = expected[key]
+        want = (want.reset_index() if dim not in want.columns else want)
+        got = got.assign(**{dim: got[dim].astype(str)}).set_index(dim).sort_index()
+        want = want.assign(**{dim: want[dim].astype(str)}).set_index(dim).sort_index()
+        assert (got['churn_rate'] <= 1).all()
+        np.testing.assert_array_equal(got['merchant_count'].to_numpy(), want['merchant_count'].to_numpy())
+        np.testing.assert_allclose(got['churn_rate'].to_numpy(), want['churn_rate'].to_numpy())
+
+
+def _later_transactions(merchants, days=20):
+    # A day's batch for every tenth merchant, dated past the current
+    # reference date so other merchants age out
+    current = pd.to_datetime(merchants['last_transaction_date']).max()
+    ids = merchants['merchant_id'].iloc[::10]
+    return pd.DataFrame({
+        'transaction_id': [f'TX{i}' for i in range(len(ids))],
+        'merchant_id': ids.to_numpy(),
+        'transaction_date': (current + pd.Timedelta(days=days)).strftime('%Y-%m-%d'),
+        'amount': 100.0,
+        'payment_method': 'UPI'
+    })
+
+
+def test_checkpoint_rerun_matches_churn_analysis(tmp_path, raw):
+    checkpoint = str(tmp_path / 'churn.pkl')
+    merchants = raw['merchants']
+    transactions = pd.concat([raw['transactions'], _later_transactions(merchants)], ignore_index=True)
+    incremental_churn_analysis(checkpoint, merchants)
+    result = incremental_churn_analysis(checkpoint, merchants, transactions=transactions)
+    _assert_same(result, _expected(merchants, transactions))
+
+
+def test_repeated_merchant_batches_do_not_double_count(raw):
+    merchants = raw['merchants']
+    transactions = _later_transactions(merchants)
+    state = IncrementalChurn.from_frames(merchants)
+    for _ in range(3):
+        state.apply_merchants(merchants)
+    state.apply_transactions(transactions)
+    _assert_same(state.result(verbose=False), _expected(merchants, transactions))
+
+
+def test_second_batch_on_the_watermark_day_is_applied(tmp_path, raw):
+    checkpoint = str(tmp_path / 'churn.pkl')
+    merchants, interactions = raw['merchants'], raw['interactions']
+    last_day = interactions['date'].max()
+    earlier = interactions[interactions['date'] < last_day]
+    on_last_day = interactions[interactions['date'] == last_day]
+    assert len(on_last_day) > 1
+    # The last day arrives in two batches, and the whole history is passed in again each time
+    first, second = on_last_day.iloc[:len(on_last_day) // 2], on_last_day.iloc[len(on_last_day) // 2:]
+    incremental_churn_analysis(checkpoint, merchants, interactions=earlier)
+    incremental_churn_analysis(checkpoint, merchants, interactions=pd.concat([earlier, first]))
+    result = incremental_churn_analysis(checkpoint, merchants, interactions=interactions)
+    result = incremental_churn_analysis(checkpoint, merchants, interactions=interactions)
+
+    expected = interactions.groupby('merchant_id').agg(
+        num_interactions=('interaction_id', 'count'),
+        avg_resolution_time=('resolution_time_days', 'mean')
+    ).reset_index()
+    got = result['merchant_interactions']
+    np.testing.assert_array_equal(got['merchant_id'].to_numpy(), expected['merchant_id'].to_numpy())
+    np.testing.assert_array_equal(got['num_interactions'].to_numpy(), expected['num_interactions'].to_numpy())
+    np.testing.assert_allclose(got['avg_resolution_time'].to_numpy(), expected['avg_resolution_time'].to_numpy())
+
+
+def test_merchant_lookup_matches_known_ids(raw):
+    merchants = raw['merchants']
+    head, tail = merchants.iloc[:200], merchants.iloc[150:]
+    state = IncrementalChurn.from_frames(head)
+    state.apply_merchants(pd.concat([tail, tail.iloc[:5]], ignore_index=True))
+    assert state.ids == merchants['merchant_id'].tolist()
+    np.testing.assert_array_equal(state._lookup(merchants['merchant_id'].iloc[::-1]),
+                                  np.arange(len(merchants))[::-1])
+    assert (state._lookup(['nope']) == -1).all()
+    _assert_same(state.result(verbose=False), _expected(merchants))
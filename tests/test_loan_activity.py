@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.analysis import merchant_activity_around_first_loan
+from bharatpe_analysis.loan_activity import TransactionIndex, loan_activity_windows
+
+
+def _first_loans(loans):
+    first = loans.groupby('merchant_id').agg({'approval_date': 'min'}).reset_index()
+    return first.rename(columns={'approval_date': 'first_loan_date'})
+
+
+def _joined_activity(transactions, merchant_first_loan):
+    # The original join + groupby
+    joined = pd.merge(transactions, merchant_first_loan, on='merchant_id', how='inner')
+    for date_col in ['transaction_date', 'first_loan_date']:
+        joined[date_col] = pd.to_datetime(joined[date_col], errors='coerce')
+    joined['is_after_loan'] = joined['transaction_date'] >= joined['first_loan_date']
+    return joined.groupby(['merchant_id', 'is_after_loan']).agg({
+        'transaction_id': 'count',
+        'amount': 'sum'
+    }).reset_index()
+
+
+def _with_missing_amounts(transactions):
+    transactions = transactions.copy()
+    transactions.loc[transactions.index[::7], 'amount'] = np.nan
+    return transactions
+
+
+def test_first_loan_activity_matches_join(raw):
+    transactions = _with_missing_amounts(raw['transactions'])
+    first = _first_loans(raw['loans'])
+    got = merchant_activity_around_first_loan(transactions, first)
+    want = _joined_activity(transactions, first)
+
+    assert len(got) == len(want)
+    np.testing.assert_array_equal(got['merchant_id'].astype(str), want['merchant_id'].astype(str))
+    np.testing.assert_array_equal(got['is_after_loan'], want['is_after_loan'])
+    np.testing.assert_array_equal(got['transaction_id'], want['transaction_id'])
+    assert not got['amount'].isna().any()
+    np.testing.assert_allclose(got['amount'], want['amount'])
+
+
+def test_windows_skip_missing_amounts(raw):
+    transactions = _with_missing_amounts(raw['transactions'])
+    loans = raw['loans']
+    windows = loan_activity_windows(TransactionIndex.build(transactions, loans['merchant_id']), loans)
+
+    dates = pd.to_datetime(transactions['transaction_date'], errors='coerce')
+    approval = pd.to_datetime(loans['approval_date'], errors='coerce')
+    for row, loan in enumerate(loans.itertuples(index=False)):
+        start = approval.iloc[row] - pd.Timedelta(days=90)
+        mask = (transactions['merchant_id'] == loan.merchant_id) & (dates >= start) & (dates < approval.iloc[row])
+        assert windows['pre_txn_count'].iloc[row] == mask.sum()
+        assert np.isclose(windows['pre_amount'].iloc[row], transactions.loc[mask, 'amount'].sum())
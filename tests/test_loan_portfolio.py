@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.loan_portfolio import PORTFOLIO_MEASURES, SCENARIOS, LoanBook
+
+
+def _loop_projection(frame, horizon, scenario):
+    # One loan and one month at a time
+    totals = np.zeros((len(PORTFOLIO_MEASURES), horizon))
+    for balance, rate, term, hazard in frame[['balance', 'monthly_rate', 'remaining_term', 'hazard']].itertuples(index=False):
+        rate += scenario['rate_shift'] / 1200
+        hazard = min(hazard * scenario['pd_multiplier'], 1.0)
+        installment = balance * rate / (1 - (1 + rate) ** -int(term))
+        survived = 1.0
+        for month in range(int(term)):
+            ead = balance * survived * hazard
+            interest = balance * rate
+            balance = max(balance + interest - installment, 0.0)
+            survived *= 1 - hazard
+            totals[:, month] += [balance * survived, installment * survived, interest * survived, ead, ead * scenario['lgd']]
+    return totals
+
+
+def test_raw_csv_frames_build_the_same_book(raw, typed):
+    from_csv = LoanBook.from_frames(raw['loans'], raw['merchants'])
+    from_typed = LoanBook.from_frames(typed['loans'], typed['merchants'])
+    assert from_csv.as_of == from_typed.as_of
+    assert len(from_csv.frame) == len(from_typed.frame) > 0
+    np.testing.assert_allclose(from_csv.frame['balance'], from_typed.frame['balance'])
+
+    got = from_csv.project(SCENARIOS['severe'], 'severe')
+    want = from_typed.project(SCENARIOS['severe'], 'severe')
+    # interest_rate is float32 in the typed frame
+    np.testing.assert_allclose(got[PORTFOLIO_MEASURES].to_numpy(), want[PORTFOLIO_MEASURES].to_numpy(), rtol=1e-6, atol=1e-6)
+
+    as_of = LoanBook.from_frames(raw['loans'], as_of='2024-06-30').as_of
+    assert as_of == pd.Timestamp('2024-06-30')
+
+
+def test_unparseable_dates_leave_the_book(raw):
+    loans = raw['loans'].copy()
+    active = loans.index[loans['status'].str.lower() == 'active']
+    baseline = len(LoanBook.from_frames(loans).frame)
+    loans.loc[active[:3], 'approval_date'] = 'not a date'
+    assert len(LoanBook.from_frames(loans).frame) == baseline - 3
+
+
+def test_projection_matches_loan_loop(typed):
+    book = LoanBook.from_frames(typed['loans'], typed['merchants'])
+    for name, scenario in SCENARIOS.items():
+        curves = book.project(scenario, name)
+        got = curves[curves['dimension'] == 'all'][PORTFOLIO_MEASURES].to_numpy().T
+        want = _loop_projection(book.frame, book.horizon, scenario)
+        np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-6)
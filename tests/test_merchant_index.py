@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.merchant_index import MerchantIndex, make_server
+
+
+def _churned(merchants):
+    last = pd.to_datetime(merchants['last_transaction_date'])
+    return ((last.max() - last).dt.days > 30).to_numpy()
+
+
+def _ids(result):
+    return [record['merchant_id'] for record in result['merchants']]
+
+
+def test_find_matches_pandas_masks(raw):
+    merchants = raw['merchants']
+    index = MerchantIndex.from_frames(merchants, raw['interactions'])
+    churned = _churned(merchants)
+    district = merchants['district'].iloc[0]
+    cities = merchants['city'].drop_duplicates().iloc[:2].tolist()
+    low, high = merchants['pin_code'].quantile([0.2, 0.5]).astype(int)
+    last = pd.to_datetime(merchants['last_transaction_date'])
+
+    cases = [
+        ({'district': district}, merchants['district'] == district),
+        ({'city': cities, 'churned': False}, merchants['city'].isin(cities) & ~churned),
+        ({'pin_code': (low, high)}, merchants['pin_code'].between(low, high)),
+        ({'state': merchants['state'].iloc[0], 'last_transaction_date': ('2025-04-01', '2025-05-10')},
+         (merchants['state'] == merchants['state'].iloc[0]) & last.between('2025-04-01', '2025-05-10')),
+        ({'district': 'Nowhere'}, np.zeros(len(merchants), dtype=bool))
+    ]
+    for conditions, mask in cases:
+        result = index.find(**conditions)
+        assert _ids(result) == merchants.loc[np.asarray(mask), 'merchant_id'].tolist()
+        assert result['total'] == int(np.asarray(mask).sum())
+
+
+def test_get_and_upsert(raw):
+    merchants = raw['merchants']
+    interactions = raw['interactions']
+    index = MerchantIndex.from_frames(merchants, interactions)
+    merchant_id = merchants['merchant_id'].iloc[5]
+    record = index.get(merchant_id)
+    assert record['district'] == merchants['district'].iloc[5]
+    assert record['interaction_count'] == int((interactions['merchant_id'] == merchant_id).sum())
+    assert record['churned'] == bool(_churned(merchants)[5])
+    assert index.get('missing') is None
+
+    moved = merchants.iloc[[5]].assign(district='Ajmer', city='Ajmer')
+    index.upsert(moved)
+    assert index.get(merchant_id)['district'] == 'Ajmer'
+    assert merchant_id in _ids(index.find(district='Ajmer'))
+
+
+def test_http_front_end(raw):
+    index = MerchantIndex.from_frames(raw['merchants'])
+    server = make_server(index, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        merchant_id = raw['merchants']['merchant_id'].iloc[0]
+        with urllib.request.urlopen(f"{base}/merchant/{merchant_id}") as response:
+            assert json.load(response)['merchant_id'] == merchant_id
+        district = raw['merchants']['district'].iloc[0]
+        with urllib.request.urlopen(f"{base}/merchants?district={urllib.request.quote(district)}&limit=3") as response:
+            payload = json.load(response)
+        assert payload['total'] == int((raw['merchants']['district'] == district).sum())
+        assert len(payload['merchants']) == min(3, payload['total'])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+
+def test_get_waits_for_a_background_refresh(raw, tmp_path):
+    merchants, interactions = raw['merchants'], raw['interactions']
+    root = str(tmp_path)
+    merchants.iloc[:200].to_csv(os.path.join(root, 'merchants.csv'), index=False)
+    interactions.to_csv(os.path.join(root, 'interactions.csv'), index=False)
+    index = MerchantIndex.from_loader(root)
+    merchants.to_csv(os.path.join(root, 'merchants.csv'), index=False)
+
+    # Park the refresh halfway through rewriting the rows
+    writing, release = threading.Event(), threading.Event()
+    store_hashes = index._store_hashes
+
+    def parked(*args):
+        writing.set()
+        release.wait(5)
+        store_hashes(*args)
+
+    index._store_hashes = parked
+    refresh = threading.Thread(target=index.refresh)
+    refresh.start()
+    assert writing.wait(5)
+
+    merchant_id = merchants['merchant_id'].iloc[0]
+    records = []
+    reader = threading.Thread(target=lambda: records.append(index.get(merchant_id)))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()
+    release.set()
+    refresh.join()
+    reader.join()
+
+    assert records[0]['merchant_id'] == merchant_id
+    assert records[0]['interaction_count'] == int((interactions['merchant_id'] == merchant_id).sum())
+    assert len(index) == len(merchants)
@@ -0,0 +1,43 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import BharatPe_pythoncode
+from bharatpe_analysis.analysis import product_adoption_analysis
+from bharatpe_analysis.output import MANIFEST_NAME, ReportWriter
+
+
+def _writer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'bharatpe-report-writer']
+
+
+def test_per_run_writes_manifest(tmp_path):
+    writer = ReportWriter(str(tmp_path), run_id='run_a', echo=False)
+    writer.write_frame('table', pd.DataFrame({'a': [1, 2]}))
+    manifest = writer.close()
+    assert [entry['file'] for entry in manifest['files']] == ['table.csv']
+    assert os.path.exists(tmp_path / 'run_a' / MANIFEST_NAME)
+
+
+def test_shared_output_dir_gets_no_manifest(tmp_path):
+    for run in range(2):
+        writer = ReportWriter(str(tmp_path), echo=False, per_run=False)
+        writer.write_frame(f'table_{run}', pd.DataFrame({'a': [run]}))
+        manifest = writer.close()
+        assert [entry['file'] for entry in manifest['files']] == [f'table_{run}.csv']
+    assert sorted(os.listdir(tmp_path)) == ['table_0.csv', 'table_1.csv']
+
+
+def test_owned_writer_closed_when_analysis_raises(typed, tmp_path):
+    merchants = typed['merchants'].drop(columns=['loans_taken'])
+    before = len(_writer_threads())
+    with pytest.raises(KeyError):
+        product_adoption_analysis(merchants, None, output_dir=str(tmp_path))
+    assert len(_writer_threads()) == before
+
+
+def test_quiet_script_prints_nothing(data_root, tmp_path, capsys):
+    BharatPe_pythoncode.main(['--data-root', data_root, '--output-dir', str(tmp_path), '--quiet'])
+    assert capsys.readouterr().out == ''
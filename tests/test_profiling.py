@@ -0,0 +1,67 @@
+import importlib
+import sys
+import threading
+
+from bharatpe_analysis import profiling
+
+
+def test_imports_and_profiles_without_resource(monkeypatch):
+    # Windows has no resource module
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    module = importlib.reload(profiling)
+    try:
+        assert module.resource is None
+        assert module._max_rss_mb() is None
+        with module.Profiler(memory='rss') as profiler:
+            with module.stage('work', [1, 2, 3]) as s:
+                s.output([1])
+        record = profiler.records[0]
+        assert record['path'] == 'work' and record['rows_out'] == 1
+        assert record['mem_peak_mb'] is None
+    finally:
+        monkeypatch.delitem(sys.modules, 'resource')
+        importlib.reload(profiling)
+
+
+def test_profiled_churn_matches_unprofiled(typed, tmp_path):
+    from bharatpe_analysis.analysis import churn_analysis
+    plain = churn_analysis(typed['merchants'].copy(), typed['interactions'], verbose=False)
+    with profiling.Profiler(memory='tracemalloc') as profiler:
+        profiled = churn_analysis(typed['merchants'].copy(), typed['interactions'], verbose=False)
+    assert not profiling.is_profiling()
+    paths = [record['path'] for record in profiler.records]
+    assert 'churn_analysis' in paths and 'churn_analysis;churn_cube' in paths
+    assert profiled['overall_churn_rate'] == plain['overall_churn_rate']
+
+    jsonl_path, folded_path = profiler.write(str(tmp_path / 'trace'))
+    with open(jsonl_path, encoding='utf-8') as f:
+        assert len(f.readlines()) == len(profiler.records)
+    with open(folded_path, encoding='utf-8') as f:
+        assert all(line.split(' ')[0] in paths for line in f)
+
+
+def test_tracemalloc_peak_is_dropped_for_stages_overlapping_another_thread():
+    entered, release = threading.Event(), threading.Event()
+
+    def background():
+        with profiling.stage('background'):
+            entered.set()
+            release.wait(5)
+
+    with profiling.Profiler(memory='tracemalloc') as profiler:
+        with profiling.stage('alone'):
+            block = bytearray(8 << 20)
+            del block
+        worker = threading.Thread(target=background)
+        with profiling.stage('overlapped'):
+            worker.start()
+            entered.wait(5)
+            release.set()
+        worker.join()
+        with profiling.stage('after'):
+            pass
+
+    peaks = {record['path']: record['mem_peak_mb'] for record in profiler.records}
+    assert peaks['alone'] >= 8
+    assert peaks['overlapped'] is None and peaks['background'] is None
+    assert peaks['after'] is not None
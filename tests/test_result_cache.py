@@ -0,0 +1,45 @@
+import os
+import shutil
+
+from bharatpe_analysis import result_cache
+from bharatpe_analysis.analysis import churn_analysis
+from bharatpe_analysis.result_cache import ResultCache, function_fingerprint
+
+
+def _package_copy(tmp_path):
+    package = os.path.dirname(os.path.abspath(result_cache.__file__))
+    copy = tmp_path / 'bharatpe_analysis'
+    copy.mkdir()
+    for name in os.listdir(package):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(package, name), copy / name)
+    return copy
+
+
+def test_fingerprint_covers_helper_modules(tmp_path, monkeypatch):
+    copy = _package_copy(tmp_path)
+    monkeypatch.setattr(result_cache, '__file__', str(copy / 'result_cache.py'))
+    monkeypatch.setattr(result_cache, '_module_hashes', {})
+    before = function_fingerprint(churn_analysis)
+
+    # churn_analysis lives in analysis.py, but its rollups come from cube.py
+    with open(copy / 'cube.py', 'a', encoding='utf-8') as f:
+        f.write('\n# edited\n')
+    monkeypatch.setattr(result_cache, '_module_hashes', {})
+    after = function_fingerprint(churn_analysis)
+
+    assert before[0] == after[0]
+    assert before[1] != after[1]
+
+
+def test_cached_result_matches_direct_call(typed, tmp_path):
+    cache = ResultCache(path=str(tmp_path / 'results'))
+    direct = churn_analysis(typed['merchants'].copy(), typed['interactions'].copy(), verbose=False)
+    first = cache.call(churn_analysis, typed['merchants'], typed['interactions'], verbose=False)
+    second = cache.call(churn_analysis, typed['merchants'], typed['interactions'], verbose=False)
+
+    assert cache.stats()['hits'] == 1
+    assert 'is_churned' not in typed['merchants'].columns
+    for result in [first, second]:
+        assert result['overall_churn_rate'] == direct['overall_churn_rate']
+        assert result['churn_by_state'].equals(direct['churn_by_state'])
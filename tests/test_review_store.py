@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+import pytest
+
+from bharatpe_analysis import review_store
+from bharatpe_analysis.config import review_path
+from bharatpe_analysis.review_store import ReviewStore, normalize_text
+
+
+@pytest.fixture
+def scrape():
+    path = review_path('bharatpe')
+    if not os.path.exists(path):
+        pytest.skip("bharatpe_reviews.csv not present")
+    return pd.read_csv(path, dtype={'reviewId': str}).head(3000)
+
+
+def test_normalize_text():
+    got = normalize_text(pd.Series(['good\U0001F44Dservice', '  two\n\nlines ', None, 'नमस्ते ❤️']))
+    assert got.tolist() == ['good service', 'two lines', '', 'नमस्ते']
+
+
+def test_incremental_ingest_matches_deduplicated_scrape(scrape, tmp_path):
+    at = pd.to_datetime(scrape['at'])
+    split = at.quantile(0.6)
+    older = scrape[at < split]
+    # The next scrape has everything again, plus a repeated row
+    newer = pd.concat([scrape.iloc[:1], scrape], ignore_index=True)
+    older.to_csv(tmp_path / 'old.csv', index=False)
+    newer.to_csv(tmp_path / 'new.csv', index=False)
+
+    store = ReviewStore(str(tmp_path / 'store'))
+    first = store.ingest(paths={'bharatpe': str(tmp_path / 'old.csv')}, workers=1, chunksize=250)
+    assert first['bharatpe']['new'] == older['reviewId'].nunique()
+    second = store.ingest(paths={'bharatpe': str(tmp_path / 'new.csv')}, workers=1, chunksize=250)
+    assert second['bharatpe']['stopped_early']
+    assert second['bharatpe']['scanned'] < len(newer)
+    again = store.ingest(paths={'bharatpe': str(tmp_path / 'new.csv')}, workers=1, chunksize=250)
+    assert again['bharatpe']['new'] == 0
+
+    want = scrape.drop_duplicates('reviewId')
+    reviews = ReviewStore(str(tmp_path / 'store')).reviews('bharatpe')
+    assert sorted(reviews['reviewId']) == sorted(want['reviewId'])
+    assert store.watermark('bharatpe') == str(at.max())
+
+    merged = reviews.merge(want[['reviewId', 'content', 'score']], on='reviewId', suffixes=('', '_csv'))
+    assert (merged['content'] == merged['content_csv'].fillna('')).all()
+    assert (merged['score'] == merged['score_csv']).all()
+
+    assert store.compact() == 2
+    assert len(store.reviews('bharatpe')) == len(want)
+    exported = store.export_sql_csv('bharatpe', str(tmp_path / 'sql.csv'))
+    assert exported == int((reviews['text'] != '').sum())
+
+
+def test_ingest_skips_parts_older_than_the_window(scrape, tmp_path, monkeypatch):
+    at = pd.to_datetime(scrape['at'])
+    oldest = scrape[at < at.quantile(0.3)]
+    middle = scrape[at < at.quantile(0.6)]
+    # The full scrape also carries one of the oldest reviews, edited today
+    edited = oldest.iloc[[0]].assign(content='edited', at=str(at.max()))
+    full = pd.concat([edited, scrape], ignore_index=True)
+    for name, frame in [('oldest', oldest), ('middle', middle), ('full', full)]:
+        frame.to_csv(tmp_path / f'{name}.csv', index=False)
+
+    store = ReviewStore(str(tmp_path / 'store'))
+    for name in ['oldest', 'middle']:
+        store.ingest(paths={'bharatpe': str(tmp_path / f'{name}.csv')}, workers=1, chunksize=250)
+    oldest_part, middle_part = store.parts('bharatpe')
+
+    opened = []
+    read_part = review_store._read_part
+    monkeypatch.setattr(review_store, '_read_part', lambda path, *args: opened.append(os.path.basename(path))
+                        or read_part(path, *args))
+    summary = store.ingest(paths={'bharatpe': str(tmp_path / 'full.csv')}, workers=1, chunksize=250)
+    assert opened == [middle_part]
+    assert summary['bharatpe']['new'] == full['reviewId'].nunique() - middle['reviewId'].nunique() + 1
+
+    reviews = store.reviews('bharatpe')
+    assert sorted(reviews['reviewId']) == sorted(scrape['reviewId'].unique())
+    first = reviews.set_index('reviewId').loc[edited['reviewId'].iloc[0]]
+    assert first['content'] == oldest['content'].fillna('').iloc[0]
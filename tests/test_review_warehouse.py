@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bharatpe_analysis.config import review_path
+from bharatpe_analysis.review_warehouse import STOP_WORDS, ReviewWarehouse, split_words
+from bharatpe_analysis.reviews import read_reviews, sentiment_category
+
+
+@pytest.fixture
+def loaded(tmp_path):
+    path = review_path('bharatpe')
+    if not os.path.exists(path):
+        pytest.skip("bharatpe_reviews.csv not present")
+    reviews = read_reviews('bharatpe', path).head(1500)
+    warehouse = ReviewWarehouse(str(tmp_path / 'reviews.sqlite'))
+    assert warehouse.load('bharatpe', reviews) == reviews['reviewId'].nunique()
+    assert warehouse.load('bharatpe', reviews) == 0
+    yield warehouse, reviews.drop_duplicates('reviewId')
+    warehouse.close()
+
+
+def test_text_index_matches_substring_scan(loaded):
+    warehouse, reviews = loaded
+    content = reviews['content'].fillna('').str.lower()
+    for keyword in ['refund', 'loan', 'customer care', 'ui', 'लोन', 'vyapari', 'zzzz']:
+        assert warehouse.count_matching('bharatpe', keyword) == content.str.contains(keyword, regex=False).sum()
+    either = content.str.contains('refund', regex=False) | content.str.contains('ui', regex=False)
+    assert warehouse.count_matching('bharatpe', 'refund', 'ui') == either.sum()
+
+
+def test_views_match_pandas(loaded):
+    warehouse, reviews = loaded
+    distribution = warehouse.sentiment_distribution('bharatpe').set_index('sentiment_category')['review_count']
+    want = pd.Series(sentiment_category(reviews['score'].to_numpy())).astype(str).value_counts()
+    assert distribution.sort_index().to_dict() == want.sort_index().to_dict()
+
+    helpful = warehouse.most_helpful_reviews('bharatpe', limit=5)
+    want = reviews.sort_values(['thumbsUpCount', 'score'], ascending=False).head(5)
+    assert helpful['thumbs_up_count'].tolist() == want['thumbsUpCount'].tolist()
+
+    words = [(word, score) for content, score in zip(reviews['content'].dropna(), reviews.loc[reviews['content'].notna(), 'score'])
+             for word in split_words(content, 10) if len(word) >= 4 and word not in STOP_WORDS]
+    counts = pd.DataFrame(words, columns=['word', 'score']).groupby('word')['score'].agg(['size', 'mean'])
+    top = warehouse.word_frequency('bharatpe').set_index('word')
+    assert (top['frequency'] > 1).all()
+    np.testing.assert_array_equal(top['frequency'], counts['size'].reindex(top.index))
+    # SQLite's ROUND goes half away from zero, pandas' half to even
+    np.testing.assert_allclose(top['avg_rating'], counts['mean'].reindex(top.index), atol=0.005 + 1e-9)
+    assert top['frequency'].min() >= counts['size'].drop(top.index).max()
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bharatpe_analysis.config import REVIEW_FILES, review_path
+from bharatpe_analysis.reviews import APP_FEATURES, ISSUE_CATEGORIES, OTHER_ISSUES, get_classifier, read_reviews
+
+TEXTS = [
+    'Loan approval pending for weeks',
+    'LOAN APPROVAL took forever',
+    'the app crashes on login',
+    'voice alert stopped, soundbox speaker dead',
+    'great app',
+    '',
+    None,
+    'refund not received; money stuck',
+    'settlementsettlement',
+    'UPI and QR code both fine'
+]
+
+
+def _like_category(text):
+    # The SQL CASE cascade: first branch with LOWER(content) LIKE '%kw%'
+    text = (text or '').lower()
+    for name, words in ISSUE_CATEGORIES:
+        if any(word.lower() in text for word in words):
+            return name
+    return OTHER_ISSUES
+
+
+def _like_mentions(texts, features):
+    lowered = pd.Series(texts).fillna('').astype(str).str.lower()
+    return pd.DataFrame({feature: [feature.lower() in text for text in lowered] for feature in features})
+
+
+def _assert_matches_like(texts, app):
+    issue, mentions = get_classifier(app).classify(pd.Series(texts))
+    assert list(issue.astype(str)) == [_like_category(text) for text in texts]
+    want = _like_mentions(texts, APP_FEATURES[app])
+    np.testing.assert_array_equal(mentions.to_numpy(), want.to_numpy())
+
+
+def test_classifier_matches_like_cascade_on_edge_cases():
+    _assert_matches_like(TEXTS, 'bharatpe')
+
+
+@pytest.mark.parametrize('app', sorted(REVIEW_FILES))
+def test_classifier_matches_like_cascade_on_reviews(app):
+    if not os.path.exists(review_path(app)):
+        pytest.skip(f"{REVIEW_FILES[app]} not present")
+    reviews = read_reviews(app).head(1500)
+    _assert_matches_like(reviews['content'].tolist(), app)
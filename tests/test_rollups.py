@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.rollups import RollupStore
+
+
+def _transactions(raw):
+    transactions = raw['transactions'].copy()
+    transactions['transaction_date'] = pd.to_datetime(transactions['transaction_date'])
+    return transactions.sort_values('transaction_date', kind='stable', ignore_index=True)
+
+
+def _batches(transactions):
+    days = transactions['transaction_date'].dt.normalize()
+    cuts = days.quantile([0.3, 0.7]).dt.normalize()
+    return [transactions[days < cuts.iloc[0]],
+            transactions[(days >= cuts.iloc[0]) & (days < cuts.iloc[1])],
+            transactions[days >= cuts.iloc[1]]]
+
+
+def test_appends_match_one_build_and_groupby(raw, tmp_path):
+    transactions = _transactions(raw)
+    merchants = raw['merchants']
+    whole = RollupStore(str(tmp_path / 'whole'))
+    whole.append(transactions, merchants)
+
+    batched = RollupStore(str(tmp_path / 'batched'))
+    first, second, third = _batches(transactions)
+    batched.append(first, merchants)
+    batched.append(second, merchants)
+    replay = batched.append(pd.concat([second, third]), merchants)
+    assert replay['rows_skipped'] == len(second)
+    # Reopened from disk
+    batched = RollupStore(str(tmp_path / 'batched'))
+
+    joined = transactions.merge(merchants[['merchant_id', 'state']], on='merchant_id', how='left')
+    want = joined.groupby([joined['transaction_date'].dt.to_period('M').dt.start_time, 'state'])['amount'].sum().unstack(fill_value=0)
+    for store in [whole, batched]:
+        got = store.series('state', freq='M', measure='amount')
+        np.testing.assert_allclose(got[want.columns].to_numpy(), want.to_numpy())
+        weekly = store.series('payment_method', freq='W', measure='txn_count')
+        assert weekly.to_numpy().sum() == len(transactions)
+
+    for freq in ['D', 'W', 'M']:
+        pd.testing.assert_frame_equal(whole.series('segment', freq=freq), batched.series('segment', freq=freq))
+
+
+def test_rolling_matches_pandas_rolling(raw, tmp_path):
+    transactions = _transactions(raw)
+    store = RollupStore(str(tmp_path / 'store'))
+    store.append(transactions, raw['merchants'])
+
+    day = transactions['transaction_date'].dt.normalize()
+    daily = transactions.groupby([day, 'payment_method']).size().unstack(fill_value=0)
+    daily = daily.reindex(pd.date_range(day.min(), day.max(), freq='D'), fill_value=0)
+    for window in [1, 7, 28]:
+        got = store.rolling('payment_method', window, measure='txn_count', how='mean')
+        want = daily.rolling(window).mean()
+        np.testing.assert_allclose(got[want.columns].to_numpy(), want.to_numpy(), equal_nan=True)
+
+    trend = store.method_trend(window=7)
+    np.testing.assert_allclose(trend[[f'{m}_7d_ma' for m in daily.columns]].to_numpy(),
+                               daily.rolling(7).mean().to_numpy(), equal_nan=True)
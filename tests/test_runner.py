@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from bharatpe_analysis.runner import run_reports
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {repo!r})
+    from bharatpe_analysis import loader
+    from bharatpe_analysis.runner import run_reports
+
+    datasets = {{name: loader.read_dataset(name, {root!r}, use_cache=False)
+                 for name in ['merchants', 'transactions', 'interactions', 'loans']}}
+    results, report = run_reports(datasets, workers=2, executor='process', quiet=True)
+    print(results['churn']['overall_churn_rate'])
+""")
+
+
+def test_process_pool_closes_shared_segments(data_root, tmp_path):
+    # The segments are closed at worker exit, so the noise only shows up on
+    # stderr. Tasks write into their default output dirs, hence the cwd.
+    proc = subprocess.run([sys.executable, '-W', 'ignore', '-c', SCRIPT.format(repo=REPO, root=data_root)],
+                          capture_output=True, text=True, timeout=300, cwd=tmp_path)
+    assert proc.returncode == 0, proc.stderr
+    assert 'BufferError' not in proc.stderr
+    assert 'Exception ignored' not in proc.stderr
+
+
+def test_process_results_match_serial(typed, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    serial, _ = run_reports({name: df.copy() for name, df in typed.items()}, executor='serial', quiet=True)
+    pooled, _ = run_reports(typed, workers=2, executor='process', quiet=True)
+    assert sorted(pooled) == sorted(serial)
+    assert pooled['churn']['overall_churn_rate'] == serial['churn']['overall_churn_rate']
+    assert pooled['churn']['churn_by_state'].equals(serial['churn']['churn_by_state'])
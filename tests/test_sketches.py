@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.sketches import ActiveMerchantSketches, HyperLogLog, KLLSketch, ResolutionSketches, dumps, loads
+
+
+def test_kll_quantiles_within_rank_error():
+    values = np.random.default_rng(1).lognormal(1.0, 1.0, 60_000)
+    sketch = KLLSketch()
+    for chunk in np.array_split(values, 7):
+        part = KLLSketch()
+        part.update(chunk)
+        sketch.merge(part)
+    assert sketch.n == len(values)
+    assert sketch.min == values.min() and sketch.max == values.max()
+    ordered = np.sort(values)
+    for q in [0.1, 0.5, 0.9, 0.99]:
+        rank = np.searchsorted(ordered, sketch.quantile(q), side='right') / len(values)
+        assert abs(rank - q) < 0.02
+
+    restored = loads(dumps(sketch))
+    np.testing.assert_array_equal(restored.quantile([0.5, 0.9]), sketch.quantile([0.5, 0.9]))
+
+
+def test_small_groups_are_exact(typed):
+    interactions = typed['interactions']
+    sketches = ResolutionSketches()
+    for start in range(0, len(interactions), 250):
+        sketches.update(interactions.iloc[start:start + 250])
+    got = sketches.quantiles('category').set_index('category')
+
+    times = interactions.dropna(subset=['resolution_time_days'])
+    for category, group in times.groupby('category', observed=True)['resolution_time_days']:
+        row = got.loc[str(category)]
+        assert row['count'] == len(group)
+        assert row['p50'] == np.quantile(group.to_numpy(), 0.5, method='inverted_cdf')
+        assert row['p90'] == np.quantile(group.to_numpy(), 0.9, method='inverted_cdf')
+
+
+def test_hll_distinct_counts(raw):
+    ids = np.array([f'BPM{i}' for i in range(50_000)], dtype=object)
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update(pd.Series(ids[:30_000]))
+    right.update(pd.Series(ids[20_000:]))
+    assert abs(left.merge(right).count() / len(ids) - 1) < 0.05
+
+    transactions = raw['transactions']
+    active = ActiveMerchantSketches().update(transactions, raw['merchants'])
+    active = loads(dumps(active))
+    assert abs(active.distinct() / transactions['merchant_id'].nunique() - 1) < 0.03
+    joined = transactions.merge(raw['merchants'][['merchant_id', 'state']], on='merchant_id')
+    want = joined.groupby('state')['merchant_id'].nunique()
+    got = active.distinct(['state']).set_index('state')['distinct']
+    np.testing.assert_allclose(got.reindex(want.index).to_numpy(), want.to_numpy(), rtol=0.03)
+
+
+def test_empty_distinct_keeps_its_return_type(raw):
+    empty = ActiveMerchantSketches()
+    assert empty.distinct() == 0.0 and isinstance(empty.distinct(), float)
+    assert list(empty.distinct(['state']).columns) == ['state', 'distinct']
+    active = ActiveMerchantSketches().update(raw['transactions'], raw['merchants'])
+    assert isinstance(active.distinct(), float)
+    assert active.distinct(start='2100-01-01') == 0.0
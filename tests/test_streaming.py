@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from bharatpe_analysis.analysis import feature_usage_analysis, summarize_feature_usage
+from bharatpe_analysis.streaming import FeatureUsageAccumulator, iter_chunks, stream_loan_activity
+
+
+def _assert_frames_close(got, want):
+    got = got.reset_index(drop=True)
+    want = want.reset_index(drop=True)
+    assert list(got.columns) == list(want.columns)
+    assert len(got) == len(want)
+    for column in want.columns:
+        if pd.api.types.is_float_dtype(want[column]):
+            np.testing.assert_allclose(got[column].to_numpy(dtype=float), want[column].to_numpy(dtype=float))
+        else:
+            np.testing.assert_array_equal(got[column].astype(str), want[column].astype(str))
+
+
+def test_chunked_feature_usage_matches_in_memory(typed):
+    want = feature_usage_analysis(typed['merchants'].copy(), typed['transactions'].copy())
+    got = feature_usage_analysis(typed['merchants'].copy(), iter_chunks(typed['transactions'], 997))
+    for key in ['payment_method_usage', 'daily_method_usage', 'segment_performance']:
+        _assert_frames_close(got[key], want[key])
+
+
+def test_merged_accumulators_match_one_pass(typed):
+    transactions = typed['transactions']
+    half = len(transactions) // 2
+    first, second = FeatureUsageAccumulator(), FeatureUsageAccumulator()
+    for chunk in iter_chunks(transactions.iloc[:half], 500):
+        first.update(chunk)
+    for chunk in iter_chunks(transactions.iloc[half:], 500):
+        second.update(chunk)
+    merged = summarize_feature_usage(typed['merchants'].copy(), *first.merge(second).finalize(typed['merchants']))
+    want = feature_usage_analysis(typed['merchants'].copy(), transactions.copy())
+    for key in ['payment_method_usage', 'qr_alignment', 'segment_performance']:
+        _assert_frames_close(merged[key], want[key])
+
+
+def test_streamed_loan_activity_matches_join(raw):
+    first = raw['loans'].groupby('merchant_id').agg({'approval_date': 'min'}).reset_index()
+    first = first.rename(columns={'approval_date': 'first_loan_date'})
+    joined = pd.merge(raw['transactions'], first, on='merchant_id', how='inner')
+    joined['is_after_loan'] = (pd.to_datetime(joined['transaction_date'], errors='coerce')
+                               >= pd.to_datetime(joined['first_loan_date'], errors='coerce'))
+    want = joined.groupby(['merchant_id', 'is_after_loan']).agg({'transaction_id': 'count', 'amount': 'sum'}).reset_index()
+
+    got = stream_loan_activity(raw['transactions'], first, chunksize=800)
+    got = got.sort_values(['merchant_id', 'is_after_loan'], ignore_index=True)
+    _assert_frames_close(got[list(want.columns)], want)
@@ -0,0 +1,39 @@
+import filecmp
+import os
+
+import pandas as pd
+import pytest
+
+from bharatpe_analysis.config import REPO_ROOT
+from bharatpe_analysis.synthetic import TABLES, generate_dataset
+
+SAMPLE_DIR = os.path.join(REPO_ROOT, 'Synthetic BharatPe Data')
+
+
+def test_same_seed_gives_same_files(tmp_path):
+    first = generate_dataset(str(tmp_path / 'a'), 120, txn_per_merchant=5, seed=3, verbose=False)
+    second = generate_dataset(str(tmp_path / 'b'), 120, txn_per_merchant=5, seed=3, verbose=False)
+    other = generate_dataset(str(tmp_path / 'c'), 120, txn_per_merchant=5, seed=4, verbose=False)
+    assert first['rows'] == second['rows']
+    for table in TABLES:
+        assert filecmp.cmp(tmp_path / 'a' / f'{table}.csv', tmp_path / 'b' / f'{table}.csv', shallow=False)
+    assert not filecmp.cmp(tmp_path / 'a' / 'merchants.csv', tmp_path / 'c' / 'merchants.csv', shallow=False)
+    assert other['rows']['merchants'] == 120
+
+
+def test_tables_reference_generated_merchants(raw, data_root):
+    merchant_ids = set(raw['merchants']['merchant_id'])
+    assert len(merchant_ids) == len(raw['merchants'])
+    for table in ['transactions', 'interactions', 'loans']:
+        assert set(raw[table]['merchant_id']) <= merchant_ids
+    usage = pd.read_csv(os.path.join(data_root, 'feature_usage.csv'))
+    assert set(usage['merchant_id']) <= merchant_ids
+
+
+@pytest.mark.parametrize('table', ['merchants', 'loans', 'interactions', 'feature_usage'])
+def test_layout_matches_shipped_sample(data_root, table):
+    sample = os.path.join(SAMPLE_DIR, f'{table}.csv')
+    if not os.path.exists(sample):
+        pytest.skip(f"{table}.csv not in the sample data")
+    assert list(pd.read_csv(os.path.join(data_root, f'{table}.csv'), nrows=0).columns) == \
+           list(pd.read_csv(sample, nrows=0).columns)